@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, Request, Body
+from fastapi import APIRouter, Depends, Request, Body, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
 
@@ -16,8 +18,14 @@ from app.schemas.search import (
 )
 from app.schemas.user import User
 
-from app.services.search.search_course_service import SearchCourseService
-from app.integrations.mixpanel.tracking import execute_business_and_track_outcome
+from app.services.search.search_course_service import (
+    SearchCourseService,
+    HISTORY_PAGE_SIZE,
+    MAX_HISTORY_PAGE_SIZE,
+    RecommendStreamOutcome,
+    recommend_stream_with_new_session,
+)
+from app.integrations.mixpanel.tracking import execute_business_and_track_outcome, track_outcome
 from app.integrations.mixpanel.component.events import COURSE_RECOMMENDATION_COMPLETED
 from app.services.search.ai_service_recommendation_service import AIServiceRecommendationService
 from app.integrations.mixpanel.tracking import execute_business_and_track_outcome
@@ -69,14 +77,58 @@ async def recommend_courses(
     return ResponseModel(success=True, data=result)
 
 
+@op("ai_search_recommend_stream", tags=["search"])
+@router.post("/recommend/stream")
+async def recommend_courses_stream(
+    http_request: Request,
+    request_body: CourseRecommendationRequest = Body(...),
+    optional_user: Optional[User] = Depends(get_optional_user),
+):
+    # 스트리밍 중에는 요청 DB 세션이 이미 닫혀 있을 수 있으므로 서비스가 세션을 직접 연다
+    outcome = RecommendStreamOutcome()
+    events = recommend_stream_with_new_session(
+        user_id=optional_user.id if optional_user else None,
+        query=request_body.query,
+        outcome=outcome,
+    )
+
+    async def stream_and_track():
+        async for event in iterate_in_threadpool(events):
+            yield event
+
+        # /recommend와 같은 이벤트를 스트림이 끝난 뒤 보낸다 (게스트, 중간에 끊긴 연결은 트래킹하지 않음)
+        if optional_user is not None and outcome.finished:
+            await track_outcome(
+                request=http_request,
+                user_id=optional_user.id,
+                event_name=COURSE_RECOMMENDATION_COMPLETED,
+                base_event_fields={
+                    "query_length": len(request_body.query or ""),
+                },
+                error_name=outcome.error,
+            )
+
+    return StreamingResponse(
+        stream_and_track(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @op("ai_search_recommend_history", tags=["search"])
 @router.get("/recommend", response_model=ResponseModel[RecommendationHistoryResponse])
 def get_latest_recommendations(
+    before_message_id: Optional[int] = Query(None, ge=1),
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     service = SearchCourseService(db)
-    result = service.get_recommend_courses(user_id=current_user.id)
+    result = service.get_recommend_courses(
+        user_id=current_user.id,
+        before_message_id=before_message_id,
+        limit=limit,
+    )
     return ResponseModel(success=True, data=result)
 
 
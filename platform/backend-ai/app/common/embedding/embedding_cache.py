@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import time
+from array import array
+from typing import List, Optional
+
+from app.core.cache import get_cache_redis
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "emb:v1"
+REDIS_LRU_KEY = f"{REDIS_KEY_PREFIX}:lru"
+
+EMBEDDING_CACHE_TTL_SECONDS = 30 * 24 * 3600
+# 3072차원 float32 = 12KB → 로컬 4096개 ≈ 48MB, Redis 200k개 ≈ 2.4GB 상한
+LOCAL_CACHE_MAX_ITEMS = 4096
+REDIS_CACHE_MAX_ITEMS = 200_000
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def vector_to_bytes(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def bytes_to_vector(data: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(data)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """
+    (model, 정규화된 텍스트) 해시를 키로 하는 2단 임베딩 캐시.
+    - 1단: 프로세스 내 LRU (float32 bytes 보관)
+    - 2단: Redis (float32 bytes, TTL + 최근 사용 순 ZSET으로 개수 상한 유지)
+    Redis 장애 시에는 로컬 캐시만 사용하고 예외를 올리지 않는다.
+    """
+
+    def __init__(
+        self,
+        local_max_items: int = LOCAL_CACHE_MAX_ITEMS,
+        redis_max_items: int = REDIS_CACHE_MAX_ITEMS,
+        ttl_seconds: int = EMBEDDING_CACHE_TTL_SECONDS,
+        redis_client=None,
+    ):
+        self.local = TTLCache(maxsize=local_max_items, ttl_seconds=ttl_seconds)
+        self.redis_max_items = redis_max_items
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_cache_redis()
+        return self._redis
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        digest = hashlib.sha256(f"{model}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+        return f"{REDIS_KEY_PREFIX}:{digest}"
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        keys = [self.make_key(model, text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        missing_idx = []
+
+        for i, key in enumerate(keys):
+            cached = self.local.get(key)
+            if cached is not None:
+                results[i] = bytes_to_vector(cached)
+            else:
+                missing_idx.append(i)
+
+        if not missing_idx:
+            return results
+
+        try:
+            missing_keys = [keys[i] for i in missing_idx]
+            values = self.redis.mget(missing_keys)
+
+            found = {}
+            for i, key, value in zip(missing_idx, missing_keys, values):
+                if value is None:
+                    continue
+                self.local.set(key, value)
+                results[i] = bytes_to_vector(value)
+                found[key] = time.time()
+
+            if found:
+                self.redis.zadd(REDIS_LRU_KEY, found)
+        except Exception as e:
+            logger.warning(f"[EmbeddingCache] Redis 조회 실패: {e}")
+
+        return results
+
+    def set_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        if not texts:
+            return
+
+        now = time.time()
+        payload = {}
+        for text, vector in zip(texts, vectors):
+            key = self.make_key(model, text)
+            data = vector_to_bytes(vector)
+            self.local.set(key, data)
+            payload[key] = data
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, data in payload.items():
+                pipe.set(key, data, ex=self.ttl_seconds)
+            pipe.zadd(REDIS_LRU_KEY, {key: now for key in payload})
+            pipe.zcard(REDIS_LRU_KEY)
+            size = pipe.execute()[-1]
+
+            if size > self.redis_max_items:
+                self._evict(size - self.redis_max_items)
+        except Exception as e:
+            logger.warning(f"[EmbeddingCache] Redis 저장 실패: {e}")
+
+    def _evict(self, count: int):
+        evicted = self.redis.zpopmin(REDIS_LRU_KEY, count)
+        keys = [key for key, _ in evicted]
+        if keys:
+            self.redis.delete(*keys)
+
+
+# 모든 서비스가 공유하는 프로세스 단위 캐시
+embedding_cache = EmbeddingCache()
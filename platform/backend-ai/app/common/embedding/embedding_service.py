@@ -0,0 +1,154 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import tiktoken
+from openai import OpenAI
+
+from app.core.config import get_settings
+from app.common.embedding.embedding_cache import EmbeddingCache, embedding_cache, normalize_text
+from app.utils.rate_limit import AdaptiveConcurrencyLimiter, call_with_retry
+
+settings = get_settings()
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+
+# OpenAI embeddings 요청 한도: 입력 2048개, 요청당 300k 토큰
+MAX_BATCH_SIZE = 2048
+MAX_BATCH_TOKENS = 100_000
+MAX_WORKERS = 8
+MAX_RETRIES = 5
+
+# 재시도/백오프는 call_with_retry가 담당하므로 SDK 자체 재시도는 끈다
+openai_client = OpenAI(api_key=settings.openai.api_key, max_retries=0)
+
+# 프로세스 전체(Celery 스레드 포함)가 공유하는 동시성 한도
+embedding_limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=MAX_WORKERS)
+
+
+class EmbeddingService:
+    def __init__(
+        self,
+        model: str = EMBEDDING_MODEL,
+        max_batch_tokens: int = MAX_BATCH_TOKENS,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_workers: int = MAX_WORKERS,
+        max_retries: int = MAX_RETRIES,
+        client: Optional[OpenAI] = None,
+        limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        cache: Optional[EmbeddingCache] = None,
+        use_cache: bool = True,
+    ):
+        self.model = model
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.client = client or openai_client
+        self.limiter = limiter or embedding_limiter
+        self.cache = (cache or embedding_cache) if use_cache else None
+        self.encoding = tiktoken.encoding_for_model(model)
+
+    def embed_text(self, text: str) -> List[float]:
+        return self.embed_texts([text])[0]
+
+    def embed_texts(
+        self,
+        texts: List[str],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> List[List[float]]:
+        """
+        texts와 같은 순서로 임베딩을 반환한다.
+        캐시에 있는 텍스트는 API를 호출하지 않고, 같은 텍스트는 한 번만 임베딩한다.
+        progress_callback(완료 배치 수, 전체 배치 수)는 배치가 끝날 때마다 호출된다.
+        """
+        if not texts:
+            return []
+
+        if self.cache is None:
+            return self._embed_uncached(texts, progress_callback)
+
+        embeddings = self.cache.get_many(self.model, texts)
+
+        pending: Dict[str, List[int]] = {}
+        for idx, (text, vector) in enumerate(zip(texts, embeddings)):
+            if vector is None:
+                pending.setdefault(normalize_text(text), []).append(idx)
+
+        if not pending:
+            if progress_callback:
+                progress_callback(1, 1)
+            return embeddings
+
+        unique_texts = list(pending.keys())
+        vectors = self._embed_uncached(unique_texts, progress_callback)
+        self.cache.set_many(self.model, unique_texts, vectors)
+
+        for text, vector in zip(unique_texts, vectors):
+            for idx in pending[text]:
+                embeddings[idx] = vector
+
+        return embeddings
+
+    def _embed_uncached(
+        self,
+        texts: List[str],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> List[List[float]]:
+        batches = self.build_batches(texts)
+        total = len(batches)
+        results: List[Optional[List[List[float]]]] = [None] * total
+
+        if total == 1:
+            results[0] = self._embed_batch([texts[i] for i in batches[0]])
+            if progress_callback:
+                progress_callback(1, 1)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, total)) as executor:
+                futures = [
+                    executor.submit(self._embed_batch, [texts[i] for i in batch])
+                    for batch in batches
+                ]
+                # 제출 순서대로 결과를 받아 배치 순서를 보존한다
+                for batch_idx, future in enumerate(futures):
+                    results[batch_idx] = future.result()
+                    if progress_callback:
+                        progress_callback(batch_idx + 1, total)
+
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        for batch, batch_vectors in zip(batches, results):
+            for text_idx, vector in zip(batch, batch_vectors):
+                embeddings[text_idx] = vector
+
+        return embeddings
+
+    def build_batches(self, texts: List[str]) -> List[List[int]]:
+        """토큰 예산과 입력 개수 한도를 넘지 않도록 texts 인덱스를 배치로 나눈다."""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+
+        for idx, text in enumerate(texts):
+            num_tokens = max(1, len(self.encoding.encode(text or " ")))
+            if current and (
+                current_tokens + num_tokens > self.max_batch_tokens
+                or len(current) >= self.max_batch_size
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(idx)
+            current_tokens += num_tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        response = call_with_retry(
+            lambda: self.client.embeddings.create(input=batch, model=self.model),
+            limiter=self.limiter,
+            max_retries=self.max_retries,
+        )
+        # 응답 순서에 의존하지 않고 index 기준으로 정렬
+        data = sorted(response.data, key=lambda r: r.index)
+        return [r.embedding for r in data]
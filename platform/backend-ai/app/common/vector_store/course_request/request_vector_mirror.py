@@ -0,0 +1,380 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+import numpy as np
+from redis.exceptions import WatchError
+
+from app.core.cache import get_mirror_redis
+from app.common.vector_store.local_vector_index import LocalVectorIndex
+from app.common.vector_store.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "course_request_vectors:v1"
+VECTORS_KEY = f"{REDIS_KEY_PREFIX}:values"     # vector_id -> float32 bytes
+METADATA_KEY = f"{REDIS_KEY_PREFIX}:metadata"  # vector_id -> {"request_id", "field", "text"} JSON
+CHANGES_KEY = f"{REDIS_KEY_PREFIX}:changes"    # 쓰기마다 변경된 vector_id 목록을 남기는 stream
+READY_KEY = f"{REDIS_KEY_PREFIX}:ready"        # Pinecone 전체 백필 완료 여부
+BACKFILL_QUEUED_KEY = f"{REDIS_KEY_PREFIX}:backfill_queued"  # 자동 백필 중복 요청 방지
+# 백필이 두 hash에 함께 넣는 표식. ready인데 표식이 없으면 hash가 evict/삭제된 것이므로 믿지 않는다
+SENTINEL_FIELD = "__mirror__"
+
+CHANGES_MAXLEN = 10_000
+MIN_SYNC_INTERVAL_SECONDS = 1.0
+REBUILD_TTL_SECONDS = 24 * 3600
+BACKFILL_QUEUE_TTL_SECONDS = 600  # 백필 작업이 끝내 실패해도 이 시간이 지나면 다시 요청한다
+
+
+def _stream_id(raw) -> Tuple[int, int]:
+    if isinstance(raw, bytes):
+        raw = raw.decode()
+    ms, _, seq = raw.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class CourseRequestVectorMirror:
+    """
+    강의 요청 인덱스(요청당 필드 벡터 6개)를 Redis에 write-through로 복제하고,
+    프로세스 내에서는 LocalVectorIndex로 들고 있다가 변경 stream만 읽어 증분 반영한다.
+    stream이 잘려 놓친 변경이 있을 수 있으면 전체를 다시 읽는다.
+    복제가 준비되지 않았거나 어긋난 것이 보이면 백필 작업을 자동으로 큐에 넣고, 그동안은 Pinecone으로 폴백한다.
+    """
+
+    def __init__(self, redis_client=None, min_sync_interval_seconds: float = MIN_SYNC_INTERVAL_SECONDS):
+        self._redis = redis_client
+        self.min_sync_interval_seconds = min_sync_interval_seconds
+        self._index: Optional[LocalVectorIndex] = None
+        self._last_change_id: Tuple[int, int] = (0, 0)
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_mirror_redis()
+        return self._redis
+
+    # ---- 쓰기 (upsert/delete 시점) ----
+
+    def upsert(self, items: List[dict]):
+        """Pinecone upsert와 같은 형식({"id", "values", "metadata"})의 목록을 반영한다."""
+        if not items:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hset(VECTORS_KEY, mapping={
+                item["id"]: np.asarray(item["values"], dtype=np.float32).tobytes()
+                for item in items
+            })
+            pipe.hset(METADATA_KEY, mapping={
+                item["id"]: json.dumps(item.get("metadata") or {}, ensure_ascii=False)
+                for item in items
+            })
+            self._append_change(pipe, "upsert", [item["id"] for item in items])
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"[CourseRequestVectorMirror] upsert 반영 실패: {e}")
+            self._mark_not_ready()
+
+    def delete(self, vector_ids: List[str]):
+        if not vector_ids:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hdel(VECTORS_KEY, *vector_ids)
+            pipe.hdel(METADATA_KEY, *vector_ids)
+            self._append_change(pipe, "delete", vector_ids)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"[CourseRequestVectorMirror] delete 반영 실패: {e}")
+            self._mark_not_ready()
+
+    @staticmethod
+    def _append_change(pipe, op: str, vector_ids: List[str]):
+        pipe.xadd(
+            CHANGES_KEY,
+            {"op": op, "ids": json.dumps(vector_ids)},
+            maxlen=CHANGES_MAXLEN,
+            approximate=True,
+        )
+
+    def _mark_not_ready(self):
+        # 복제가 어긋났을 수 있으므로 백필이 끝날 때까지 Pinecone 경로를 쓰게 한다
+        try:
+            self.redis.delete(READY_KEY)
+        except Exception:
+            pass
+        self.request_backfill()
+
+    def request_backfill(self):
+        """백필 작업을 큐에 넣는다. 이미 요청된 백필이 있으면 넣지 않는다 (백필 완료 시 또는 TTL 만료 시 해제)"""
+        try:
+            if not self.redis.set(BACKFILL_QUEUED_KEY, 1, nx=True, ex=BACKFILL_QUEUE_TTL_SECONDS):
+                return
+            # tasks 모듈이 이 모듈을 import하므로 순환 import를 피해 여기서 가져온다
+            from app.tasks.course_request.vector_tasks import run_request_vector_mirror_backfill_task
+            run_request_vector_mirror_backfill_task.delay()
+            logger.info("[CourseRequestVectorMirror] 백필 작업 요청")
+        except Exception as e:
+            logger.warning(f"[CourseRequestVectorMirror] 백필 작업 요청 실패: {e}")
+
+    # ---- 백필 ----
+
+    def backfill_from_index(self, index: VectorStore, batch_size: int = 100) -> int:
+        """
+        강의 요청 인덱스의 request-* 벡터 전체로 복제를 다시 만들고 ready로 표시한다.
+        mirror 쓰기가 실패한 뒤의 복구 경로이므로 기존 hash에 덮어쓰지 않고 임시 hash에 새로 만든 뒤
+        RENAME으로 한 번에 바꾼다 (Pinecone에 없는 id, 즉 mirror 삭제가 실패한 벡터가 남지 않도록).
+        """
+        token = uuid.uuid4().hex
+        tmp_vectors_key = f"{VECTORS_KEY}:rebuild:{token}"
+        tmp_metadata_key = f"{METADATA_KEY}:rebuild:{token}"
+
+        # 표식을 먼저 넣어 두면 요청 벡터가 하나도 없어도 임시 hash가 존재한다
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(tmp_vectors_key, SENTINEL_FIELD, 1)
+        pipe.hset(tmp_metadata_key, SENTINEL_FIELD, 1)
+        pipe.expire(tmp_vectors_key, REBUILD_TTL_SECONDS)
+        pipe.expire(tmp_metadata_key, REBUILD_TTL_SECONDS)
+        pipe.execute()
+
+        # 백필 도중의 upsert/delete는 live hash에 쓰이므로, 시작 지점 이후의 변경을 교체 직전에 임시 hash로 옮긴다
+        last_entries = self.redis.xrevrange(CHANGES_KEY, count=1)
+        started_change_id = _stream_id(last_entries[0][0]) if last_entries else (0, 0)
+
+        total = 0
+        try:
+            for ids in index.list(prefix="request-"):
+                for i in range(0, len(ids), batch_size):
+                    batch_ids = ids[i:i + batch_size]
+                    vectors = index.fetch(ids=batch_ids).get("vectors", {})
+                    if not vectors:
+                        continue
+                    pipe = self.redis.pipeline(transaction=True)
+                    pipe.hset(tmp_vectors_key, mapping={
+                        vid: np.asarray(vec["values"], dtype=np.float32).tobytes()
+                        for vid, vec in vectors.items()
+                    })
+                    pipe.hset(tmp_metadata_key, mapping={
+                        vid: json.dumps(dict(vec.get("metadata") or {}), ensure_ascii=False)
+                        for vid, vec in vectors.items()
+                    })
+                    # 중간에 실패하면 임시 hash가 남지 않도록 만료를 걸어 둔다 (교체 후 PERSIST)
+                    pipe.expire(tmp_vectors_key, REBUILD_TTL_SECONDS)
+                    pipe.expire(tmp_metadata_key, REBUILD_TTL_SECONDS)
+                    pipe.execute()
+                    total += len(vectors)
+
+            self._swap_rebuilt(tmp_vectors_key, tmp_metadata_key, started_change_id)
+        except Exception:
+            self.redis.delete(tmp_vectors_key, tmp_metadata_key)
+            raise
+
+        logger.info(f"[CourseRequestVectorMirror] 백필 완료: {total}개")
+        return total
+
+    def _swap_rebuilt(self, tmp_vectors_key: str, tmp_metadata_key: str, started_change_id: Tuple[int, int]):
+        """
+        백필 이후의 변경을 임시 hash에 반영하고, live hash 교체 + 전체 재로드 표시 + ready를 한 트랜잭션으로 실행한다.
+        변경 stream을 WATCH하므로 그 사이 쓰기가 끼어들면 다시 반영한다 (임시 hash 반영은 멱등).
+        """
+        while True:
+            with self.redis.pipeline(transaction=True) as pipe:
+                try:
+                    pipe.watch(CHANGES_KEY)
+                    entries = pipe.xrange(CHANGES_KEY, min="{}-{}".format(*started_change_id))
+                    changed_ids = sorted({
+                        vector_id
+                        for entry_id, fields in entries
+                        if _stream_id(entry_id) > started_change_id
+                        for vector_id in json.loads(fields.get(b"ids", b"[]"))
+                    })
+                    if changed_ids:
+                        raw_vectors = pipe.hmget(VECTORS_KEY, changed_ids)
+                        raw_metadata = pipe.hmget(METADATA_KEY, changed_ids)
+                        # 임시 hash는 이 백필만 쓰므로 WATCH 구간에서 바로 써도 된다
+                        for vector_id, raw_vec, raw_meta in zip(changed_ids, raw_vectors, raw_metadata):
+                            if raw_vec is not None and raw_meta is not None:
+                                self.redis.hset(tmp_vectors_key, vector_id, raw_vec)
+                                self.redis.hset(tmp_metadata_key, vector_id, raw_meta)
+                            else:
+                                self.redis.hdel(tmp_vectors_key, vector_id)
+                                self.redis.hdel(tmp_metadata_key, vector_id)
+
+                    pipe.multi()
+                    pipe.delete(VECTORS_KEY, METADATA_KEY)
+                    pipe.rename(tmp_vectors_key, VECTORS_KEY)
+                    pipe.rename(tmp_metadata_key, METADATA_KEY)
+                    pipe.persist(VECTORS_KEY)
+                    pipe.persist(METADATA_KEY)
+                    # 읽는 쪽은 이 항목을 보면 증분 반영 대신 전체를 다시 읽는다
+                    pipe.xadd(CHANGES_KEY, {"op": "reload"}, maxlen=CHANGES_MAXLEN, approximate=True)
+                    pipe.set(READY_KEY, 1)
+                    pipe.delete(BACKFILL_QUEUED_KEY)
+                    pipe.execute()
+                    return
+                except WatchError:
+                    continue
+
+    # ---- 읽기 ----
+
+    def is_ready(self) -> bool:
+        try:
+            return bool(self.redis.exists(READY_KEY))
+        except Exception:
+            return False
+
+    def query_many(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int,
+        filter: Optional[dict] = None,
+    ) -> Optional[List[List[dict]]]:
+        """
+        질의마다 Pinecone 형식의 matches 목록.
+        복제가 준비되지 않았거나 최신 상태를 확인할 수 없으면 None (호출 측은 Pinecone으로 폴백)
+        """
+        with self._lock:
+            if not self._sync():
+                return None
+            try:
+                return self._index.query_many(query_vectors, top_k, filter)
+            except Exception as e:
+                logger.warning(f"[CourseRequestVectorMirror] 로컬 검색 실패: {e}")
+                return None
+
+    def _sync(self) -> bool:
+        now = time.monotonic()
+        if self._index is not None and now - self._synced_at < self.min_sync_interval_seconds:
+            return True
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.exists(READY_KEY)
+            pipe.hexists(VECTORS_KEY, SENTINEL_FIELD)
+            pipe.hexists(METADATA_KEY, SENTINEL_FIELD)
+            pipe.xrange(CHANGES_KEY, count=1)
+            pipe.xrevrange(CHANGES_KEY, count=1)
+            ready, has_vectors, has_metadata, first_entries, last_entries = pipe.execute()
+            if not ready:
+                self._index = None
+                self.request_backfill()
+                return False
+            if not (has_vectors and has_metadata):
+                # 백필 이후 hash가 evict/삭제됐는데 ready만 남은 경우. 빈 복제로 검색하지 않는다
+                logger.warning("[CourseRequestVectorMirror] 복제 hash 유실 감지, 백필 전까지 Pinecone 사용")
+                self._index = None
+                self._mark_not_ready()
+                return False
+
+            first_id = _stream_id(first_entries[0][0]) if first_entries else None
+            last_id = _stream_id(last_entries[0][0]) if last_entries else (0, 0)
+
+            # 처음 읽거나, 마지막으로 반영한 변경 이후 stream 앞부분이 잘렸으면 전체 로드
+            if self._index is None or (first_id is not None and first_id > self._last_change_id):
+                self._reload(last_id)
+            elif last_id > self._last_change_id:
+                self._apply_changes(last_id)
+        except Exception as e:
+            logger.warning(f"[CourseRequestVectorMirror] 동기화 실패: {e}")
+            self._index = None
+            return False
+
+        self._synced_at = now
+        return True
+
+    def _reload(self, last_id: Tuple[int, int]):
+        # last_id 이후의 변경은 다음 동기화에서 다시 반영되므로(멱등) 로드 도중 쓰기와 겹쳐도 안전하다
+        raw_vectors = self.redis.hgetall(VECTORS_KEY)
+        raw_metadata = self.redis.hgetall(METADATA_KEY)
+
+        index = LocalVectorIndex()
+        index.upsert(
+            _to_item(raw_id.decode(), raw_vec, raw_metadata[raw_id])
+            for raw_id, raw_vec in raw_vectors.items()
+            if raw_id in raw_metadata and raw_id != SENTINEL_FIELD.encode()
+        )
+
+        self._index = index
+        self._last_change_id = last_id
+        logger.info(f"[CourseRequestVectorMirror] 전체 로드: {len(index)}개")
+
+    def _apply_changes(self, last_id: Tuple[int, int]):
+        # 배타 구간 "(" 문법은 Redis 6.2 이상이라, 포함 구간으로 읽고 이미 반영한 항목은 건너뛴다
+        entries = self.redis.xrange(
+            CHANGES_KEY,
+            min="{}-{}".format(*self._last_change_id),
+            max="{}-{}".format(*last_id),
+        )
+
+        new_entries = [(entry_id, fields) for entry_id, fields in entries if _stream_id(entry_id) > self._last_change_id]
+        if any(fields.get(b"op") == b"reload" for _, fields in new_entries):
+            # 백필로 hash 전체가 교체됐으므로 증분이 아니라 전체를 다시 읽는다
+            self._reload(last_id)
+            return
+
+        changed_ids = sorted({
+            vector_id
+            for _, fields in new_entries
+            for vector_id in json.loads(fields.get(b"ids", b"[]"))
+        })
+        if changed_ids:
+            # op와 관계없이 현재 값을 다시 읽어, 있으면 upsert / 없으면 delete 한다
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hmget(VECTORS_KEY, changed_ids)
+            pipe.hmget(METADATA_KEY, changed_ids)
+            raw_vectors, raw_metadata = pipe.execute()
+
+            present = [
+                _to_item(vector_id, raw_vec, raw_meta)
+                for vector_id, raw_vec, raw_meta in zip(changed_ids, raw_vectors, raw_metadata)
+                if raw_vec is not None and raw_meta is not None
+            ]
+            present_ids = {item["id"] for item in present}
+            self._index.upsert(present)
+            self._index.delete(vid for vid in changed_ids if vid not in present_ids)
+
+        self._last_change_id = last_id
+
+
+def _to_item(vector_id: str, raw_vec: bytes, raw_meta: bytes) -> dict:
+    # 옛 벡터는 metadata에 request_id/field가 없을 수 있으므로 id에서 채워 filter가 동작하게 한다
+    metadata = json.loads(raw_meta)
+    request_id, field = parse_request_vector_id(vector_id, metadata)
+    if request_id:
+        metadata["request_id"] = str(request_id)
+        metadata["field"] = field
+    return {"id": vector_id, "values": np.frombuffer(raw_vec, dtype=np.float32), "metadata": metadata}
+
+
+course_request_vector_mirror = CourseRequestVectorMirror()
+
+
+def request_vector_ids(request_id: int, fields: List[str]) -> List[str]:
+    return [f"request-{request_id}-{field}" for field in fields]
+
+
+def parse_request_vector_id(vector_id: str, metadata: dict) -> Tuple[int, str]:
+    """metadata 우선, 없으면 "request-{request_id}-{field}" 형식의 id에서 (request_id, field)를 읽는다. 실패 시 (0, "")"""
+    request_id_str = str(metadata.get("request_id") or "")
+    field = (metadata.get("field") or "").strip()
+    parts = vector_id.split("-")
+
+    if request_id_str.isdigit():
+        request_id = int(request_id_str)
+    elif len(parts) >= 3 and parts[1].isdigit():
+        request_id = int(parts[1])
+    else:
+        return 0, ""
+
+    if not field:
+        if len(parts) < 3:
+            return 0, ""
+        field = parts[2]
+
+    return request_id, field
+
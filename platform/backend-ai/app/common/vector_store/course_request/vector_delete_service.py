@@ -1,19 +1,22 @@
 from app.core.config import get_settings
 from app.core.exceptions import APIException
 from app.core.error_codes import ErrorCode
-
-from pinecone import Pinecone
+from app.common.vector_store.course_request.request_vector_mirror import (
+    course_request_vector_mirror,
+    request_vector_ids,
+)
+from app.common.vector_store.course_request.vector_storage_service import FIELD_ORDER
+from app.common.vector_store.vector_store import get_vector_store
 
 settings = get_settings()
-pc = Pinecone(api_key=settings.pinecone.api_key)
-index = pc.Index(settings.pinecone.index_name_course_request)
 
 class CourseRequestVectorDeleteService:
     def __init__(self):
-        self.index = index
+        self.index = get_vector_store(settings.pinecone.index_name_course_request)
 
     def delete_request_vectors(self, request_id: int):
         try:
             self.index.delete(filter={"request_id": str(request_id)})
+            course_request_vector_mirror.delete(request_vector_ids(request_id, FIELD_ORDER))
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
@@ -1,13 +1,17 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from app.core.config import get_settings
 from app.core.exceptions import APIException
 from app.core.error_codes import ErrorCode
+from app.common.vector_store.course_request.request_vector_mirror import (
+    course_request_vector_mirror,
+    parse_request_vector_id,
+)
+from app.common.vector_store.video.chunk_vector_cache import video_chunk_vector_cache
+from app.common.vector_store.vector_store import get_vector_store
 
-from pinecone import Pinecone
-from openai import OpenAI
+import numpy as np
 
 settings = get_settings()
-pc = Pinecone(api_key=settings.pinecone.api_key)
 
 FIELD_WEIGHTS = {
     "problem_context": 0.30,
@@ -20,8 +24,10 @@ FIELD_WEIGHTS = {
 
 class CourseRequestVectorSearchService:
     def __init__(self):
-        self.request_index = pc.Index(settings.pinecone.index_name_course_request)
-        self.video_index = pc.Index(settings.pinecone.index_name)
+        self.request_index = get_vector_store(settings.pinecone.index_name_course_request)
+        self.video_index = get_vector_store(settings.pinecone.index_name)
+        self.chunk_cache = video_chunk_vector_cache
+        self.request_mirror = course_request_vector_mirror
 
     def search_similar_request_ids_from_video_ids(
         self,
@@ -33,129 +39,188 @@ class CourseRequestVectorSearchService:
             if not video_ids:
                 return {}
 
-            video_vectors = []
-            for video_id in video_ids:
-                video_result = self.video_index.query(
-                    vector=[0.0] * 3072,
-                    top_k=100,
-                    include_values=True,
-                    include_metadata=True,
-                    filter={"video_id": str(video_id)}
-                )
-
-                matches = video_result.get("matches", [])
+            chunk_matrix, chunk_texts = self._load_video_chunk_vectors(video_ids)
+            if not chunk_texts:
+                return {}
 
-                for match in matches:
-                    video_vectors.append({
-                        "vector": match["values"],
-                        "video_text": match["metadata"].get("text", "")
-                    })
+            # 로컬 복제본이 최신이면 모든 청크를 한 번에 행렬곱으로 검색, 아니면 Pinecone
+            request_matches = self._match_requests_locally(
+                chunk_matrix, chunk_texts, top_k, exclude_request_ids
+            )
+            if request_matches is None:
+                request_matches = self._match_requests_with_index(
+                    chunk_matrix, chunk_texts, top_k, exclude_request_ids
+                )
 
-            if not video_vectors:
-                return {}
+            if not request_matches:
+                raise APIException(ErrorCode.NO_VECTOR_MATCHES_FOUND)
 
-            request_matches: Dict[int, Dict[str, Dict]] = {}
+            request_id_to_score = self._score_request_matches(request_matches)
 
-            for item in video_vectors:
-                vector = item["vector"]
-                video_text = item["video_text"]
+            if not request_id_to_score:
+                raise APIException(ErrorCode.NO_VECTOR_MATCHES_FOUND)
+            return request_id_to_score
 
-                # ★ filter에 request_id $nin 추가
-                query_filter = {}
-                if exclude_request_ids:
-                    # Pinecone 필드가 string으로 저장되어 있으므로, str 변환 필요
-                    query_filter["request_id"] = {"$nin": [str(rid) for rid in exclude_request_ids]}
+        except APIException:
+            raise
+        except Exception as e:
+            raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
-                search_result = self.request_index.query(
-                    vector=vector,
-                    top_k=top_k,
-                    include_metadata=True,
-                    filter=query_filter if query_filter else None  # ★
-                )
+    def _load_video_chunk_vectors(self, video_ids: List[int]) -> Tuple[Optional[np.ndarray], List[str]]:
+        """영상 청크 벡터를 캐시에서 읽고, 없는 영상만 Pinecone에서 가져와 캐시를 채운다."""
+        cached = self.chunk_cache.get_many(video_ids)
 
-                matches = search_result.get("matches", [])
-
-                for match in matches:
-                    vector_id = match["id"]
-                    score = match["score"]
-                    metadata = match.get("metadata", {}) or {}
-                    request_id_str = str(metadata.get("request_id") or "")
-                    field = (metadata.get("field") or "").strip()
-
-                    if request_id_str.isdigit():
-                        request_id = int(request_id_str)
-                    else:
-                        parts = vector_id.split("-")
-                        if len(parts) < 3 or not parts[1].isdigit():
-                            continue
-                        request_id = int(parts[1])
-                    if not field:
-                        parts = vector_id.split("-")
-                        if len(parts) < 3:
-                            continue
-                        field = parts[2]
-
-                    if field not in FIELD_WEIGHTS:
-                        continue
+        matrices: List[np.ndarray] = []
+        texts: List[str] = []
 
-                    if request_id not in request_matches:
-                        request_matches[request_id] = {}
+        for video_id in video_ids:
+            entry = cached.get(video_id)
+            if entry is None:
+                entry = self._fetch_video_chunk_vectors(video_id)
+                if entry is None:
+                    continue
+                self.chunk_cache.set(video_id, entry[1], entry[0])
+
+            matrix, chunk_texts = entry
+            matrices.append(matrix)
+            texts.extend(chunk_texts)
+
+        if not matrices:
+            return None, []
+        return np.vstack(matrices), texts
+
+    def _fetch_video_chunk_vectors(self, video_id: int) -> Optional[Tuple[np.ndarray, List[str]]]:
+        video_result = self.video_index.query(
+            vector=[0.0] * 3072,
+            top_k=100,
+            include_values=True,
+            include_metadata=True,
+            filter={"video_id": str(video_id)}
+        )
+
+        matches = video_result.get("matches", [])
+        if not matches:
+            return None
+
+        matches = sorted(matches, key=lambda m: int((m.get("metadata") or {}).get("chunk_index") or 0))
+        matrix = np.asarray([match["values"] for match in matches], dtype=np.float32)
+        texts = [(match.get("metadata") or {}).get("text", "") for match in matches]
+        return matrix, texts
+
+    def _match_requests_locally(
+        self,
+        chunk_matrix: np.ndarray,
+        chunk_texts: List[str],
+        top_k: int,
+        exclude_request_ids: Optional[List[int]] = None,
+    ) -> Optional[Dict[int, Dict[str, Dict]]]:
+        """복제본이 최신이 아니면 None. 결과가 Pinecone 경로와 같도록 filter도 같게 둔다 (필드 제외는 집계 단계에서)"""
+        query_filter = {}
+        if exclude_request_ids:
+            query_filter["request_id"] = {"$nin": [str(rid) for rid in exclude_request_ids]}
+
+        matches_per_chunk = self.request_mirror.query_many(
+            chunk_matrix, top_k, filter=query_filter if query_filter else None
+        )
+        if matches_per_chunk is None:
+            return None
+        return self._collect_request_matches(matches_per_chunk, chunk_texts)
+
+    def _match_requests_with_index(
+        self,
+        chunk_matrix: np.ndarray,
+        chunk_texts: List[str],
+        top_k: int,
+        exclude_request_ids: Optional[List[int]] = None,
+    ) -> Dict[int, Dict[str, Dict]]:
+        # ★ filter에 request_id $nin 추가
+        query_filter = {}
+        if exclude_request_ids:
+            # Pinecone 필드가 string으로 저장되어 있으므로, str 변환 필요
+            query_filter["request_id"] = {"$nin": [str(rid) for rid in exclude_request_ids]}
+
+        matches_per_chunk = []
+        for vector in chunk_matrix.tolist():
+            search_result = self.request_index.query(
+                vector=vector,
+                top_k=top_k,
+                include_metadata=True,
+                filter=query_filter if query_filter else None  # ★
+            )
+            matches_per_chunk.append(search_result.get("matches", []))
+
+        return self._collect_request_matches(matches_per_chunk, chunk_texts)
+
+    def _collect_request_matches(
+        self,
+        matches_per_chunk: List[List[dict]],
+        chunk_texts: List[str],
+    ) -> Dict[int, Dict[str, Dict]]:
+        """청크별 검색 결과에서 (요청, 필드)마다 가장 유사한 청크를 남긴다."""
+        request_matches: Dict[int, Dict[str, Dict]] = {}
 
-                    if field not in request_matches[request_id] or request_matches[request_id][field]["similarity"] < score:
-                        request_text = (metadata.get("text") or "").strip()
-                        if not request_text:
-                            # metadata에 text가 없을 때 안전한 기본값
-                            request_text = "[요청 내용 없음]"
-                        request_matches[request_id][field] = {
-                            "similarity": score,
-                            "request_text": request_text,
-                            "video_text": video_text
-                        }
+        for matches, video_text in zip(matches_per_chunk, chunk_texts):
+            for match in matches:
+                score = match["score"]
+                metadata = match.get("metadata", {}) or {}
+                request_id, field = parse_request_vector_id(match["id"], metadata)
+                if not request_id:
+                    continue
 
-            if not request_matches:
-                raise APIException(ErrorCode.NO_VECTOR_MATCHES_FOUND)
+                if field not in FIELD_WEIGHTS:
+                    continue
 
-            request_id_to_score: Dict[int, Dict] = {}
-            total_weight_all = sum(FIELD_WEIGHTS.values())
+                if request_id not in request_matches:
+                    request_matches[request_id] = {}
 
-            for request_id, field_data in request_matches.items():
-                weighted_sum = 0.0
+                if field not in request_matches[request_id] or request_matches[request_id][field]["similarity"] < score:
+                    request_text = (metadata.get("text") or "").strip()
+                    if not request_text:
+                        # metadata에 text가 없을 때 안전한 기본값
+                        request_text = "[요청 내용 없음]"
+                    request_matches[request_id][field] = {
+                        "similarity": score,
+                        "request_text": request_text,
+                        "video_text": video_text
+                    }
 
-                for field_key, weight in FIELD_WEIGHTS.items():
-                    similarity = field_data.get(field_key, {}).get("similarity", 0.0)
-                    weighted_sum += similarity * weight
+        return request_matches
 
-                final_score = weighted_sum / total_weight_all if total_weight_all > 0 else 0.0
+    def _score_request_matches(self, request_matches: Dict[int, Dict[str, Dict]]) -> Dict[int, Dict]:
+        request_id_to_score: Dict[int, Dict] = {}
+        total_weight_all = sum(FIELD_WEIGHTS.values())
 
-                eligible_items = [(k, v) for k, v in field_data.items() if k in FIELD_WEIGHTS]
-                if not eligible_items:
-                    continue
+        for request_id, field_data in request_matches.items():
+            weighted_sum = 0.0
 
-                best_field, best_info = max(
-                    eligible_items,
-                    key=lambda x: x[1]["similarity"] * FIELD_WEIGHTS.get(x[0], 0.0)
-                )
+            for field_key, weight in FIELD_WEIGHTS.items():
+                similarity = field_data.get(field_key, {}).get("similarity", 0.0)
+                weighted_sum += similarity * weight
 
-                request_id_to_score[request_id] = {
-                    "max_score": final_score,
-                    "details": [
-                        {
-                            "field": best_field,
-                            "similarity": best_info["similarity"],
-                            "request_text": best_info["request_text"],
-                            "video_text": best_info["video_text"]
-                        }
-                    ]
-                }
+            final_score = weighted_sum / total_weight_all if total_weight_all > 0 else 0.0
 
-            if not request_id_to_score:
-                raise APIException(ErrorCode.NO_VECTOR_MATCHES_FOUND)
-            return request_id_to_score
+            eligible_items = [(k, v) for k, v in field_data.items() if k in FIELD_WEIGHTS]
+            if not eligible_items:
+                continue
 
-        except APIException:
-            raise
-        except Exception as e:
-            raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
+            best_field, best_info = max(
+                eligible_items,
+                key=lambda x: x[1]["similarity"] * FIELD_WEIGHTS.get(x[0], 0.0)
+            )
+
+            request_id_to_score[request_id] = {
+                "max_score": final_score,
+                "details": [
+                    {
+                        "field": best_field,
+                        "similarity": best_info["similarity"],
+                        "request_text": best_info["request_text"],
+                        "video_text": best_info["video_text"]
+                    }
+                ]
+            }
+
+        return request_id_to_score
 
     def search_similar_request_ids_from_creator_vectors(
         self,
@@ -179,17 +244,24 @@ class CourseRequestVectorSearchService:
             if exclude_request_ids:
                 query_filter["request_id"] = {"$nin": [str(rid) for rid in exclude_request_ids]}
 
-            try:
-                result = self.request_index.query(
-                    vector=vector,
-                    top_k=top_k,
-                    include_metadata=True,
-                    filter=query_filter  # ★
-                )
-            except Exception as e:
-                raise APIException(ErrorCode.NO_VECTOR_MATCHES_FOUND, details=[f"{field_key} 검색 실패: {str(e)}"])
+            matches = self.request_mirror.query_many(
+                np.asarray([vector], dtype=np.float32), top_k, filter=query_filter
+            )
+            if matches is not None:
+                matches = matches[0]
+            else:
+                # 로컬 복제본이 최신이 아니면 Pinecone으로 폴백
+                try:
+                    result = self.request_index.query(
+                        vector=vector,
+                        top_k=top_k,
+                        include_metadata=True,
+                        filter=query_filter  # ★
+                    )
+                except Exception as e:
+                    raise APIException(ErrorCode.NO_VECTOR_MATCHES_FOUND, details=[f"{field_key} 검색 실패: {str(e)}"])
+                matches = result.get("matches", [])
 
-            matches = result.get("matches", [])
             for match in matches:
                 vector_id = match["id"]
                 score = match["score"]
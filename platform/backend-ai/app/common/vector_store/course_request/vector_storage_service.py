@@ -4,18 +4,14 @@ from typing import List, Dict
 from app.core.config import get_settings
 from app.core.exceptions import APIException
 from app.core.error_codes import ErrorCode
+from app.common.embedding.embedding_service import EmbeddingService
+from app.common.vector_store.course_request.request_vector_mirror import course_request_vector_mirror
+from app.common.vector_store.vector_store import get_vector_store
 
-from pinecone import Pinecone
-from openai import OpenAI
 import tiktoken
 
 settings = get_settings()
 
-# Initialize clients
-openai_client = OpenAI(api_key=settings.openai.api_key)
-pc = Pinecone(api_key=settings.pinecone.api_key)
-index = pc.Index(settings.pinecone.index_name_course_request)
-
 FIELD_ORDER = [
     "problem_context",
     "goal",
@@ -28,16 +24,13 @@ FIELD_ORDER = [
 
 class CourseRequestVectorStorageService:
     def __init__(self):
-        self.index = index
+        self.index = get_vector_store(settings.pinecone.index_name_course_request)
         self.encoding = tiktoken.encoding_for_model("text-embedding-3-large")
+        self.embedding_service = EmbeddingService()
 
     def _embed_texts(self, texts: List[str]) -> List[List[float]]:
         try:
-            response = openai_client.embeddings.create(
-                input=texts,
-                model="text-embedding-3-large"
-            )
-            return [r.embedding for r in response.data]
+            return self.embedding_service.embed_texts(texts)
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
@@ -72,6 +65,7 @@ class CourseRequestVectorStorageService:
                 })
 
             self.index.upsert(vectors=items)
+            course_request_vector_mirror.upsert(items)
             return [item["id"] for item in items]
 
         except Exception as e:
@@ -0,0 +1,223 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_INITIAL_CAPACITY = 1024
+SEARCH_BLOCK_ROWS = 256  # 질의가 많아도 점수 행렬 메모리가 일정하도록 나눠 계산
+
+
+class LocalVectorIndex:
+    """
+    메모리 내 exact cosine 검색 인덱스.
+    - 행렬(float32, L2 정규화), id 배열, metadata 컬럼 배열을 같은 행 순서로 유지한다.
+    - upsert/delete는 증분 반영(삭제는 마지막 행을 빈자리로 옮기는 swap-remove)
+    - Pinecone 스타일 metadata filter($eq/$ne/$in/$nin, 값 직접 비교)를 벡터화된 마스크로 처리한다.
+    스레드 안전하지 않으므로 공유 시 호출 측에서 잠금을 건다.
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = DEFAULT_INITIAL_CAPACITY):
+        self.dim = dim
+        self._capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+        self._ids: List[str] = []
+        self._metadata: List[dict] = []
+        self._row_of: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, vector_id: str) -> bool:
+        return vector_id in self._row_of
+
+    @property
+    def ids(self) -> List[str]:
+        return self._ids
+
+    @property
+    def metadata(self) -> List[dict]:
+        return self._metadata
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._matrix is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    def get(self, vector_id: str) -> Optional[Tuple[np.ndarray, dict]]:
+        row = self._row_of.get(vector_id)
+        if row is None:
+            return None
+        return self._matrix[row], self._metadata[row]
+
+    # ---- 쓰기 ----
+
+    def upsert(self, items: Iterable[dict]):
+        """Pinecone upsert 형식({"id", "values", "metadata"})의 목록을 반영한다."""
+        for item in items:
+            vector = np.asarray(item["values"], dtype=np.float32)
+            self._ensure_matrix(vector.shape[0])
+            norm = float(np.linalg.norm(vector))
+            vector = vector / norm if norm > 0 else vector
+
+            metadata = dict(item.get("metadata") or {})
+            vector_id = item["id"]
+            row = self._row_of.get(vector_id)
+
+            if row is None:
+                row = self._size
+                self._grow_if_needed(row + 1)
+                self._size += 1
+                self._ids.append(vector_id)
+                self._metadata.append(metadata)
+                self._row_of[vector_id] = row
+            else:
+                self._metadata[row] = metadata
+
+            self._matrix[row] = vector
+            self._set_metadata_columns(row, metadata)
+
+    def delete(self, vector_ids: Iterable[str]) -> int:
+        deleted = 0
+        for vector_id in vector_ids:
+            row = self._row_of.pop(vector_id, None)
+            if row is None:
+                continue
+
+            last = self._size - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = moved_id
+                self._metadata[row] = self._metadata[last]
+                for column in self._columns.values():
+                    column[row] = column[last]
+                self._row_of[moved_id] = row
+
+            self._ids.pop()
+            self._metadata.pop()
+            for column in self._columns.values():
+                column[last] = None
+            self._size -= 1
+            deleted += 1
+        return deleted
+
+    def clear(self):
+        self.__init__(dim=self.dim, initial_capacity=self._capacity)
+
+    # ---- 검색 ----
+
+    def filter_mask(self, filter: Optional[dict] = None) -> np.ndarray:
+        mask = np.ones(self._size, dtype=bool)
+        for key, condition in (filter or {}).items():
+            column = self._columns.get(key)
+            values = column[:self._size] if column is not None else np.full(self._size, None, dtype=object)
+
+            if isinstance(condition, dict):
+                for op, operand in condition.items():
+                    if op == "$eq":
+                        mask &= values == operand
+                    elif op == "$ne":
+                        mask &= values != operand
+                    elif op == "$in":
+                        mask &= _isin(values, operand)
+                    elif op == "$nin":
+                        mask &= ~_isin(values, operand)
+                    else:
+                        raise ValueError(f"지원하지 않는 filter 연산자: {op}")
+            else:
+                mask &= values == condition
+        return mask
+
+    def search(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int,
+        filter: Optional[dict] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        질의 행렬(m×d)에 대해 (scores m×k, rows m×k)를 점수 내림차순으로 반환한다.
+        filter를 통과한 행이 k개보다 적으면 k가 그만큼 줄어든다.
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        mask = self.filter_mask(filter)
+        candidates = np.nonzero(mask)[0]
+
+        k = min(top_k, len(candidates))
+        if k <= 0:
+            empty = np.zeros((queries.shape[0], 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
+
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.maximum(norms, 1e-12)
+        candidate_matrix = self._matrix[candidates]
+
+        top_scores = np.empty((queries.shape[0], k), dtype=np.float32)
+        top_rows = np.empty((queries.shape[0], k), dtype=np.int64)
+        for start in range(0, queries.shape[0], SEARCH_BLOCK_ROWS):
+            block = slice(start, start + SEARCH_BLOCK_ROWS)
+            scores = queries[block] @ candidate_matrix.T
+            if k < len(candidates):
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.tile(np.arange(len(candidates)), (scores.shape[0], 1))
+
+            block_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-block_scores, axis=1)
+            top_scores[block] = np.take_along_axis(block_scores, order, axis=1)
+            top_rows[block] = candidates[np.take_along_axis(top, order, axis=1)]
+
+        return top_scores, top_rows
+
+    def query_many(self, query_vectors: np.ndarray, top_k: int, filter: Optional[dict] = None) -> List[List[dict]]:
+        """질의마다 Pinecone query 결과와 같은 형태의 matches 목록"""
+        scores, rows = self.search(query_vectors, top_k, filter)
+        return [
+            [
+                {"id": self._ids[row], "score": float(score), "metadata": self._metadata[row]}
+                for score, row in zip(row_scores, row_ids)
+            ]
+            for row_scores, row_ids in zip(scores, rows)
+        ]
+
+    def query(self, vector: List[float], top_k: int, filter: Optional[dict] = None) -> List[dict]:
+        return self.query_many(np.asarray(vector, dtype=np.float32), top_k, filter)[0]
+
+    # ---- 내부 ----
+
+    def _ensure_matrix(self, dim: int):
+        if self.dim is None:
+            self.dim = dim
+        elif self.dim != dim:
+            raise ValueError(f"벡터 차원 불일치: {dim} (인덱스 {self.dim})")
+
+        if self._matrix is None:
+            self._matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+
+    def _grow_if_needed(self, required: int):
+        if required <= self._capacity:
+            return
+        new_capacity = max(required, self._capacity * 2)
+        matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+        for key, column in self._columns.items():
+            grown = np.full(new_capacity, None, dtype=object)
+            grown[:self._size] = column[:self._size]
+            self._columns[key] = grown
+        self._capacity = new_capacity
+
+    def _set_metadata_columns(self, row: int, metadata: dict):
+        for key in set(self._columns) | set(metadata):
+            column = self._columns.get(key)
+            if column is None:
+                column = np.full(self._capacity, None, dtype=object)
+                self._columns[key] = column
+            column[row] = metadata.get(key)
+
+
+def _isin(values: np.ndarray, operand) -> np.ndarray:
+    # object 배열에 np.isin을 쓰면 정렬 비교가 일어나 느리므로 set 조회로 처리
+    targets = set(operand)
+    return np.fromiter((value in targets for value in values), dtype=bool, count=len(values))
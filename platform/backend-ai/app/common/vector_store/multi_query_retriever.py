@@ -0,0 +1,198 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RRF_K = 60
+SIMILARITY_THRESHOLD = 0.3
+MAX_PARALLEL_QUERIES = 16
+MAX_PARALLEL_EXPANSIONS = 8
+
+# 요청마다 스레드를 만들지 않도록 프로세스 단위로 공유하는 bounded pool
+_query_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_QUERIES, thread_name_prefix="vector-query")
+# 질의 확장(LLM 호출)은 검색 pool을 점유하지 않도록 따로 둔다
+_expansion_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_EXPANSIONS, thread_name_prefix="query-expansion")
+
+
+@dataclass
+class RetrievalResult:
+    video_scores: Dict[int, float] = field(default_factory=dict)  # video_id -> RRF 점수
+    video_texts: Dict[int, str] = field(default_factory=dict)     # video_id -> 대표 청크 텍스트
+    latencies_ms: List[float] = field(default_factory=list)       # 질의별 응답 시간
+
+    def ranked_video_ids(self) -> List[int]:
+        return [vid for vid, _ in sorted(self.video_scores.items(), key=lambda x: x[1], reverse=True)]
+
+
+class MultiQueryRetriever:
+    """
+    여러 질의 벡터를 동시에 검색하고 video_id 기준 RRF(Reciprocal Rank Fusion)로 합친다.
+    """
+
+    def __init__(
+        self,
+        index,
+        rrf_k: int = RRF_K,
+        similarity_threshold: float = SIMILARITY_THRESHOLD,
+    ):
+        self.index = index
+        self.rrf_k = rrf_k
+        self.similarity_threshold = similarity_threshold
+
+    def search(
+        self,
+        query_vectors: List[List[float]],
+        top_k: int,
+        filter: Optional[dict] = None,
+    ) -> RetrievalResult:
+        result = RetrievalResult()
+        if not query_vectors:
+            return result
+
+        started = time.perf_counter()
+        futures = [
+            _query_executor.submit(self._timed_query, vector, top_k, filter)
+            for vector in query_vectors
+        ]
+
+        # 질의 순서대로 합쳐 대표 텍스트 선택이 순차 실행과 동일하게 유지되도록 한다
+        for future in futures:
+            response, latency_ms = future.result()
+            result.latencies_ms.append(latency_ms)
+            self.fuse(result, response.get("matches", []))
+
+        logger.info(
+            f"[MultiQueryRetriever] queries={len(query_vectors)} top_k={top_k} "
+            f"total={(time.perf_counter() - started) * 1000:.0f}ms "
+            f"per_query={[round(ms) for ms in result.latencies_ms]}"
+        )
+        return result
+
+    def search_many(
+        self,
+        query_vector_groups: List[List[List[float]]],
+        top_ks: List[int],
+        filter: Optional[dict] = None,
+    ) -> List[RetrievalResult]:
+        """
+        질의 그룹별로 RRF 결과를 만든다. 모든 그룹의 질의를 한꺼번에 공유 pool에 넣으므로
+        전체 시간은 그룹 수가 아니라 가장 느린 질의에 가깝다. 그룹별 결과는 search()와 같다.
+        """
+        started = time.perf_counter()
+        group_futures = [
+            [_query_executor.submit(self._timed_query, vector, top_k, filter) for vector in vectors]
+            for vectors, top_k in zip(query_vector_groups, top_ks)
+        ]
+
+        results = []
+        for futures in group_futures:
+            result = RetrievalResult()
+            for future in futures:
+                response, latency_ms = future.result()
+                result.latencies_ms.append(latency_ms)
+                self.fuse(result, response.get("matches", []))
+            results.append(result)
+
+        logger.info(
+            f"[MultiQueryRetriever] groups={len(query_vector_groups)} "
+            f"queries={sum(len(vectors) for vectors in query_vector_groups)} "
+            f"total={(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return results
+
+    def search_speculative(
+        self,
+        query: str,
+        expand_fn: Callable[[str], List[str]],
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        search_k: int,
+        latency_budget_seconds: float,
+        filter: Optional[dict] = None,
+    ) -> RetrievalResult:
+        """
+        원본 질의 검색과 질의 확장을 동시에 시작한다.
+        - 원본 질의는 search_k개를 미리 받아 두고, 확장 결과가 오면 질의당 search_k // (1 + 확장 수)개로 잘라 RRF에 합친다
+          (순차 실행과 같은 결과)
+        - latency_budget_seconds 안에 확장이 끝나지 않거나 실패하면 원본 질의 결과만으로 반환한다
+        """
+        started = time.perf_counter()
+        result = RetrievalResult()
+        expansion_future = _expansion_executor.submit(expand_fn, query)
+
+        raw_vector = embed_fn([query])[0]
+        raw_future = _query_executor.submit(self._timed_query, raw_vector, search_k, filter)
+
+        expanded: List[str] = []
+        try:
+            remaining = latency_budget_seconds - (time.perf_counter() - started)
+            expanded = expansion_future.result(timeout=max(0.0, remaining))
+        except FutureTimeoutError:
+            # 늦게 끝난 확장 결과는 확장 캐시에 남아 다음 요청에서 쓰인다
+            logger.info(f"[MultiQueryRetriever] 질의 확장이 {latency_budget_seconds}s 안에 끝나지 않아 원본 질의만 사용")
+        except Exception as e:
+            logger.warning(f"[MultiQueryRetriever] 질의 확장 실패, 원본 질의만 사용: {e}")
+
+        per_query_k = max(1, search_k // (1 + len(expanded)))
+        expansion_futures = []
+        if expanded:
+            expansion_futures = [
+                _query_executor.submit(self._timed_query, vector, per_query_k, filter)
+                for vector in embed_fn(expanded)
+            ]
+
+        response, latency_ms = raw_future.result()
+        result.latencies_ms.append(latency_ms)
+        self.fuse(result, response.get("matches", [])[:per_query_k])
+
+        for future in expansion_futures:
+            response, latency_ms = future.result()
+            result.latencies_ms.append(latency_ms)
+            self.fuse(result, response.get("matches", []))
+
+        logger.info(
+            f"[MultiQueryRetriever] speculative queries={1 + len(expanded)} per_query_k={per_query_k} "
+            f"total={(time.perf_counter() - started) * 1000:.0f}ms "
+            f"per_query={[round(ms) for ms in result.latencies_ms]}"
+        )
+        return result
+
+    def fuse(
+        self,
+        result: RetrievalResult,
+        matches: list,
+        weight: float = 1.0,
+        apply_threshold: bool = True,
+    ):
+        """
+        한 질의의 검색 결과를 rank 기반 RRF 점수로 누적한다.
+        cosine 유사도가 아닌 점수(BM25 등)의 결과는 apply_threshold=False로 넘긴다.
+        """
+        for rank, match in enumerate(matches, start=1):
+            metadata = match.get("metadata") or {}
+            score = match.get("score", 0.0)
+
+            try:
+                vid = int(metadata.get("video_id"))
+            except (ValueError, TypeError):
+                continue
+
+            chunk_text = metadata.get("text")
+            if not chunk_text or (apply_threshold and score < self.similarity_threshold):
+                continue
+
+            result.video_scores[vid] = result.video_scores.get(vid, 0.0) + weight / (self.rrf_k + rank)
+            if vid not in result.video_texts:
+                result.video_texts[vid] = chunk_text
+
+    def _timed_query(self, vector: List[float], top_k: int, filter: Optional[dict]):
+        started = time.perf_counter()
+        response = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=True,
+            filter=filter,
+        )
+        return response, (time.perf_counter() - started) * 1000
@@ -0,0 +1,318 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pinecone import Pinecone
+
+from app.core.config import get_settings
+from app.common.vector_store.local_vector_index import LocalVectorIndex
+
+logger = logging.getLogger(__name__)
+
+LIST_PAGE_SIZE = 100
+
+
+class VectorStore(ABC):
+    """
+    벡터 저장소 공통 인터페이스. 응답은 Pinecone 응답과 같은 모양의 dict로 돌려준다.
+    - query  -> {"matches": [{"id", "score", "metadata", "values"?}]}
+    - fetch  -> {"vectors": {id: {"id", "values", "metadata"}}}
+    """
+
+    @abstractmethod
+    def upsert(self, vectors: List[dict]):
+        ...
+
+    @abstractmethod
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        filter: Optional[dict] = None,
+        include_values: bool = False,
+        include_metadata: bool = True,
+    ) -> dict:
+        ...
+
+    @abstractmethod
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[dict] = None):
+        ...
+
+    @abstractmethod
+    def fetch(self, ids: List[str]) -> dict:
+        ...
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> Iterator[List[str]]:
+        """prefix로 시작하는 id를 페이지 단위로 돌려준다."""
+        ...
+
+
+class PineconeVectorStore(VectorStore):
+    def __init__(self, index):
+        self.index = index
+
+    def upsert(self, vectors: List[dict]):
+        self.index.upsert(vectors=vectors)
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        filter: Optional[dict] = None,
+        include_values: bool = False,
+        include_metadata: bool = True,
+    ) -> dict:
+        response = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            filter=filter,
+            include_values=include_values,
+            include_metadata=include_metadata,
+        )
+        return _to_dict(response)
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[dict] = None):
+        if ids:
+            self.index.delete(ids=ids)
+        elif filter:
+            self.index.delete(filter=filter)
+
+    def fetch(self, ids: List[str]) -> dict:
+        return _to_dict(self.index.fetch(ids=ids))
+
+    def list(self, prefix: str = "") -> Iterator[List[str]]:
+        for ids in self.index.list(prefix=prefix):
+            yield list(ids)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    디스크에 저장되는 로컬 벡터 저장소 (네트워크 없는 부하 테스트/소규모 배포용).
+    - {path}/vectors-{세대}.npy : float32 행렬 (읽을 때 memmap으로 열어 복사)
+    - {path}/meta-{세대}.json   : 행 순서대로의 id, metadata
+    - {path}/current.json       : 현재 세대 번호와 행 수
+    검색은 LocalVectorIndex의 exact cosine top-k를 쓴다.
+    쓰기는 파일 잠금 아래에서 최신 파일을 다시 읽고 반영한 뒤 새 세대 파일 두 개를 쓰고
+    current.json 하나만 원자적으로 교체하므로, 중간에 죽어도 행렬과 metadata의 행이 어긋나지 않는다.
+    API 서버와 Celery 워커가 같은 경로를 공유해도 된다.
+    쓰기마다 전체 행렬을 새로 쓰므로(O(N)) 수십만 행 이상이나 잦은 소량 쓰기에는 Pinecone을 쓴다.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._current_path = self.path / "current.json"
+        self._lock_path = self.path / ".lock"
+
+        self._index = LocalVectorIndex()
+        self._loaded_version: Optional[Tuple[int, int]] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: List[dict]):
+        if not vectors:
+            return
+        with self._write_lock():
+            self._index.upsert(vectors)
+            self._save()
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        filter: Optional[dict] = None,
+        include_values: bool = False,
+        include_metadata: bool = True,
+    ) -> dict:
+        with self._lock:
+            self._reload_if_changed()
+            scores, rows = self._index.search(np.asarray(vector, dtype=np.float32), top_k, filter)
+
+            matches = []
+            for score, row in zip(scores[0], rows[0]):
+                match = {"id": self._index.ids[row], "score": float(score)}
+                if include_metadata:
+                    match["metadata"] = dict(self._index.metadata[row])
+                if include_values:
+                    match["values"] = self._index.vectors[row].tolist()
+                matches.append(match)
+            return {"matches": matches}
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[dict] = None):
+        with self._write_lock():
+            if ids:
+                targets = list(ids)
+            elif filter:
+                mask = self._index.filter_mask(filter)
+                targets = [self._index.ids[row] for row in np.nonzero(mask)[0]]
+            else:
+                return
+            if self._index.delete(targets):
+                self._save()
+
+    def fetch(self, ids: List[str]) -> dict:
+        with self._lock:
+            self._reload_if_changed()
+            vectors: Dict[str, dict] = {}
+            for vector_id in ids:
+                entry = self._index.get(vector_id)
+                if entry is not None:
+                    values, metadata = entry
+                    vectors[vector_id] = {"id": vector_id, "values": values.tolist(), "metadata": dict(metadata)}
+            return {"vectors": vectors}
+
+    def list(self, prefix: str = "") -> Iterator[List[str]]:
+        with self._lock:
+            self._reload_if_changed()
+            ids = [vid for vid in self._index.ids if vid.startswith(prefix)]
+        for i in range(0, len(ids), LIST_PAGE_SIZE):
+            yield ids[i:i + LIST_PAGE_SIZE]
+
+    # ---- 파일 입출력 ----
+
+    @contextmanager
+    def _write_lock(self):
+        """프로세스 내(threading.Lock) + 프로세스 간(flock) 쓰기 잠금. 진입 시 최신 파일을 다시 읽는다."""
+        with self._lock, open(self._lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._reload_if_changed(locked=True)
+                yield
+            except Exception:
+                # 메모리에만 반영되고 저장되지 않은 변경을 버리고, 다음 접근 때 디스크에서 다시 읽는다
+                self._index = LocalVectorIndex()
+                self._loaded_version = None
+                self._generation = 0
+                raise
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reload_if_changed(self, locked: bool = False):
+        try:
+            version = self._file_version()
+        except FileNotFoundError:
+            return
+        if version == self._loaded_version:
+            return
+
+        if locked:
+            self._load(version)
+            return
+
+        # 파일을 읽는 사이에 교체·정리되지 않도록 공유 잠금을 건다
+        with open(self._lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            try:
+                self._load(self._file_version())
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self, version: Tuple[int, int]):
+        with open(self._current_path, encoding="utf-8") as f:
+            current = json.load(f)
+        generation = current["generation"]
+        with open(self._meta_path(generation), encoding="utf-8") as f:
+            meta = json.load(f)
+        matrix = np.load(self._vectors_path(generation), mmap_mode="r")
+
+        rows = current["rows"]
+        if not (matrix.shape[0] == len(meta["ids"]) == len(meta["metadata"]) == rows):
+            raise ValueError(
+                f"로컬 벡터 저장소 파일이 손상되었습니다: {self.path} (세대 {generation}, "
+                f"행렬 {matrix.shape[0]}행, id {len(meta['ids'])}개, 기대값 {rows})"
+            )
+
+        index = LocalVectorIndex(initial_capacity=max(len(meta["ids"]), 1))
+        index.upsert(
+            {"id": vector_id, "values": matrix[row], "metadata": metadata}
+            for row, (vector_id, metadata) in enumerate(zip(meta["ids"], meta["metadata"]))
+        )
+        self._index = index
+        self._generation = generation
+        self._loaded_version = version
+
+    def _save(self):
+        # 저장된 행은 이미 정규화되어 있다 (cosine 검색 결과는 동일)
+        # 쓰기 잠금 진입 시 최신 세대를 다시 읽었으므로 다음 세대 번호가 겹치지 않는다
+        generation = self._generation + 1
+        vectors = np.ascontiguousarray(self._index.vectors)
+
+        with open(self._vectors_path(generation), "wb") as f:
+            np.save(f, vectors)
+            _fsync(f)
+        with open(self._meta_path(generation), "w", encoding="utf-8") as f:
+            json.dump({"ids": self._index.ids, "metadata": self._index.metadata}, f, ensure_ascii=False)
+            _fsync(f)
+
+        # 이 교체 한 번이 커밋 지점: 그 전에 죽으면 이전 세대가 그대로 읽힌다
+        tmp_current = self.path / "current.tmp.json"
+        with open(tmp_current, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation, "rows": vectors.shape[0]}, f)
+            _fsync(f)
+        os.replace(tmp_current, self._current_path)
+
+        self._generation = generation
+        self._loaded_version = self._file_version()
+        self._remove_old_generations(generation)
+
+    def _remove_old_generations(self, generation: int):
+        # 읽기는 공유 잠금 아래에서만 하므로 쓰기 잠금 중에는 이전 세대를 읽는 프로세스가 없다
+        keep = {self._vectors_path(generation).name, self._meta_path(generation).name}
+        for pattern in ("vectors-*.npy", "meta-*.json"):
+            for old_path in self.path.glob(pattern):
+                if old_path.name not in keep:
+                    old_path.unlink(missing_ok=True)
+
+    def _vectors_path(self, generation: int) -> Path:
+        return self.path / f"vectors-{generation}.npy"
+
+    def _meta_path(self, generation: int) -> Path:
+        return self.path / f"meta-{generation}.json"
+
+    def _file_version(self) -> Tuple[int, int]:
+        # os.replace로 교체될 때마다 inode가 바뀌므로 mtime 해상도가 낮아도 변경을 놓치지 않는다
+        stat = self._current_path.stat()
+        return stat.st_ino, stat.st_mtime_ns
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _to_dict(response) -> dict:
+    if isinstance(response, dict):
+        return response
+    return response.to_dict()
+
+
+@lru_cache()
+def _pinecone_client() -> Pinecone:
+    return Pinecone(api_key=get_settings().pinecone.api_key)
+
+
+@lru_cache()
+def get_vector_store(index_name: str) -> VectorStore:
+    """설정(vector_store.backend)에 따라 인덱스 이름별 저장소를 한 번만 만든다."""
+    settings = get_settings()
+    backend = settings.vector_store.backend
+
+    if backend == "pinecone":
+        return PineconeVectorStore(_pinecone_client().Index(index_name))
+    if backend == "local":
+        path = Path(settings.vector_store.local_path)
+        if not path.is_absolute():
+            path = Path(settings.base_dir) / path
+        logger.info(f"[VectorStore] 로컬 저장소 사용: {path / index_name}")
+        return LocalVectorStore(str(path / index_name))
+
+    raise ValueError(f"지원하지 않는 vector_store.backend: {backend}")
@@ -0,0 +1,92 @@
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.cache import get_cache_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "video_chunks:v1"
+CHUNK_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+
+class VideoChunkVectorCache:
+    """
+    영상별 청크 벡터를 Redis에 float32 행렬 한 덩어리로 보관한다.
+    - upsert 시점에 채우고(VectorStorageService), 삭제 시 무효화한다(VectorDeleteService).
+    - 캐시가 없거나 Redis 장애면 None을 돌려주고, 호출 측이 Pinecone으로 폴백한다.
+    """
+
+    def __init__(self, redis_client=None, ttl_seconds: int = CHUNK_CACHE_TTL_SECONDS):
+        self._redis = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_cache_redis()
+        return self._redis
+
+    @staticmethod
+    def _key(video_id: int) -> str:
+        return f"{REDIS_KEY_PREFIX}:{video_id}"
+
+    def set(self, video_id: int, texts: List[str], vectors: List[List[float]]):
+        if not texts:
+            return
+        try:
+            matrix = np.asarray(vectors, dtype=np.float32)
+            key = self._key(video_id)
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(key)
+            pipe.hset(key, mapping={
+                "dim": matrix.shape[1],
+                "vectors": matrix.tobytes(),
+                "texts": json.dumps(texts, ensure_ascii=False),
+            })
+            pipe.expire(key, self.ttl_seconds)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"[VideoChunkVectorCache] 저장 실패 video_id={video_id}: {e}")
+
+    def get_many(self, video_ids: List[int]) -> Dict[int, Optional[Tuple[np.ndarray, List[str]]]]:
+        """video_id -> (청크 행렬, 청크 텍스트 목록). 캐시에 없으면 None."""
+        result: Dict[int, Optional[Tuple[np.ndarray, List[str]]]] = {vid: None for vid in video_ids}
+        if not video_ids:
+            return result
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for video_id in video_ids:
+                pipe.hgetall(self._key(video_id))
+            rows = pipe.execute()
+        except Exception as e:
+            logger.warning(f"[VideoChunkVectorCache] 조회 실패: {e}")
+            return result
+
+        for video_id, row in zip(video_ids, rows):
+            if not row:
+                continue
+            try:
+                dim = int(row[b"dim"])
+                matrix = np.frombuffer(row[b"vectors"], dtype=np.float32).reshape(-1, dim)
+                texts = json.loads(row[b"texts"])
+                if len(texts) == matrix.shape[0]:
+                    result[video_id] = (matrix, texts)
+            except Exception as e:
+                logger.warning(f"[VideoChunkVectorCache] 손상된 캐시 video_id={video_id}: {e}")
+
+        return result
+
+    def delete(self, video_ids: List[int]):
+        if not video_ids:
+            return
+        try:
+            self.redis.delete(*[self._key(vid) for vid in video_ids])
+        except Exception as e:
+            logger.warning(f"[VideoChunkVectorCache] 무효화 실패 video_ids={video_ids}: {e}")
+
+
+video_chunk_vector_cache = VideoChunkVectorCache()
@@ -0,0 +1,298 @@
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from redis.exceptions import WatchError
+
+from app.core.cache import get_cache_redis
+from app.core.config import get_settings
+from app.common.vector_store.vector_store import VectorStore, get_vector_store
+
+logger = logging.getLogger(__name__)
+
+FETCH_BATCH_SIZE = 100
+
+COURSE_LOCK_PREFIX = "course_vector_lock:v1"
+COURSE_LOCK_TTL_SECONDS = 30       # 잠금을 쥔 워커가 죽어도 이 시간 뒤에 풀린다
+COURSE_LOCK_WAIT_SECONDS = 60
+COURSE_LOCK_POLL_SECONDS = 0.1
+
+
+def _normalize(vector: np.ndarray) -> Optional[np.ndarray]:
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else None
+
+
+def video_centroid(chunk_vectors: np.ndarray) -> Optional[np.ndarray]:
+    """청크 벡터를 각각 단위 길이로 맞춘 뒤 평균낸 영상 대표 벡터"""
+    matrix = np.asarray(chunk_vectors, dtype=np.float32)
+    if matrix.ndim != 2 or not len(matrix):
+        return None
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return _normalize((matrix / norms).mean(axis=0))
+
+
+class CourseVectorIndex:
+    """
+    강의 단위 대표 벡터 인덱스 (영상 청크 인덱스와 별도).
+    - video-{video_id}  : 영상 청크 벡터의 centroid (metadata: course_id, chunk_count)
+    - course-{course_id}: 소속 영상 centroid를 청크 수로 가중 평균한 벡터 (metadata: video_ids)
+    영상 벡터가 upsert/삭제될 때마다 해당 영상과 강의 벡터를 다시 계산한다.
+    - 강의 벡터 갱신은 course 레코드의 video_ids를 읽고 다시 쓰므로, 같은 강의의 갱신은 Redis 잠금으로 한 번에 하나만 한다
+    - Pinecone 읽기는 최종 일관성이므로 방금 쓴 영상 레코드는 다시 읽지 않고 계산한 centroid를 그대로 넘긴다
+    """
+
+    def __init__(self, index: VectorStore, redis_client=None):
+        self.index = index
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_cache_redis()
+        return self._redis
+
+    @staticmethod
+    def video_record_id(video_id: int) -> str:
+        return f"video-{video_id}"
+
+    @staticmethod
+    def course_record_id(course_id: int) -> str:
+        return f"course-{course_id}"
+
+    # ---- 쓰기 ----
+
+    def update_video(self, video_id: int, course_id: int, chunk_vectors: np.ndarray):
+        centroid = video_centroid(chunk_vectors)
+        if centroid is None:
+            return
+
+        previous = self._fetch([self.video_record_id(video_id)]).get(self.video_record_id(video_id))
+        previous_course_id = _course_id_of(previous)
+
+        record = {
+            "id": self.video_record_id(video_id),
+            "values": centroid.tolist(),
+            "metadata": {
+                "type": "video",
+                "video_id": str(video_id),
+                "course_id": str(course_id),
+                "chunk_count": len(chunk_vectors),
+            },
+        }
+        self.index.upsert(vectors=[record])
+
+        self._refresh_course(course_id, known_videos={video_id: record})
+        if previous_course_id is not None and previous_course_id != course_id:
+            self._refresh_course(previous_course_id, remove_video_ids=[video_id])
+
+    def delete_videos(self, video_ids: List[int]):
+        record_ids = [self.video_record_id(video_id) for video_id in video_ids]
+        records = self._fetch(record_ids)
+        if not records:
+            return
+
+        removed_by_course: Dict[int, List[int]] = {}
+        for video_id, record_id in zip(video_ids, record_ids):
+            course_id = _course_id_of(records.get(record_id))
+            if course_id is not None:
+                removed_by_course.setdefault(course_id, []).append(video_id)
+
+        self.index.delete(ids=list(records))
+        for course_id, removed in removed_by_course.items():
+            self._refresh_course(course_id, remove_video_ids=removed)
+
+    def backfill(self, chunk_index: VectorStore, videos: Iterable[Tuple[int, int]]) -> int:
+        """(video_id, course_id) 목록의 청크 벡터를 영상 청크 인덱스에서 읽어 전부 다시 만든다."""
+        from app.common.vector_store.video.vector_delete_service import VectorDeleteService
+
+        delete_service = VectorDeleteService(chunk_index)
+        total = 0
+        for video_id, course_id in videos:
+            ids = delete_service.collect_vector_ids([video_id])
+            vectors = []
+            for i in range(0, len(ids), FETCH_BATCH_SIZE):
+                fetched = chunk_index.fetch(ids=ids[i:i + FETCH_BATCH_SIZE]).get("vectors", {})
+                vectors.extend(list(vector["values"]) for vector in fetched.values())
+            if vectors:
+                self.update_video(video_id, course_id, np.asarray(vectors, dtype=np.float32))
+                total += 1
+
+        logger.info(f"[CourseVectorIndex] 백필 완료: 영상 {total}개")
+        return total
+
+    def _refresh_course(
+        self,
+        course_id: int,
+        known_videos: Optional[Dict[int, dict]] = None,
+        remove_video_ids: Iterable[int] = (),
+    ):
+        """
+        known_videos: 방금 쓴 영상 레코드 (video_id → 레코드). 다시 읽지 않고 이 값으로 계산하고 video_ids에 더한다.
+        """
+        known_videos = known_videos or {}
+        with self._course_lock(course_id):
+            self._refresh_course_locked(course_id, known_videos, remove_video_ids)
+
+    def _refresh_course_locked(
+        self,
+        course_id: int,
+        known_videos: Dict[int, dict],
+        remove_video_ids: Iterable[int],
+    ):
+        course_record_id = self.course_record_id(course_id)
+        course = self._fetch([course_record_id]).get(course_record_id)
+        video_ids = {int(vid) for vid in ((course or {}).get("metadata") or {}).get("video_ids", [])}
+        video_ids |= set(known_videos)
+        video_ids -= {int(vid) for vid in remove_video_ids}
+
+        videos = self._fetch([
+            self.video_record_id(video_id) for video_id in sorted(video_ids) if video_id not in known_videos
+        ])
+        videos.update(
+            (self.video_record_id(video_id), record)
+            for video_id, record in known_videos.items()
+            if video_id in video_ids
+        )
+        weighted = []
+        live_video_ids = []
+        for record in videos.values():
+            if _course_id_of(record) != course_id:
+                continue
+            metadata = record.get("metadata") or {}
+            weight = float(metadata.get("chunk_count") or 1)
+            weighted.append(np.asarray(record["values"], dtype=np.float32) * weight)
+            live_video_ids.append(int(metadata["video_id"]))
+
+        # 조회되지 않은 영상은 삭제된 것이 아니라 아직 읽기에 반영되지 않은 것일 수 있으므로 목록에 남긴다
+        # (삭제는 remove_video_ids로만 뺀다). centroid에는 읽힌 영상만 반영한다
+        unread_video_ids = [
+            video_id for video_id in video_ids if self.video_record_id(video_id) not in videos
+        ]
+        live_video_ids.extend(unread_video_ids)
+
+        course_vector = _normalize(np.sum(weighted, axis=0)) if weighted else None
+        if course_vector is None:
+            if not unread_video_ids:
+                self.index.delete(ids=[course_record_id])
+            return
+
+        self.index.upsert(vectors=[{
+            "id": course_record_id,
+            "values": course_vector.tolist(),
+            "metadata": {
+                "type": "course",
+                "course_id": str(course_id),
+                "video_ids": [str(vid) for vid in sorted(live_video_ids)],
+            },
+        }])
+
+    @contextmanager
+    def _course_lock(self, course_id: int):
+        """같은 강의의 갱신을 워커 간에 직렬화한다. Redis 장애 시에는 잠금 없이 진행한다."""
+        key = f"{COURSE_LOCK_PREFIX}:{course_id}"
+        token = uuid.uuid4().hex
+        try:
+            deadline = time.monotonic() + COURSE_LOCK_WAIT_SECONDS
+            while not self.redis.set(key, token, nx=True, ex=COURSE_LOCK_TTL_SECONDS):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"강의 벡터 잠금 대기 시간 초과 course_id={course_id}")
+                time.sleep(COURSE_LOCK_POLL_SECONDS)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            logger.warning(f"[CourseVectorIndex] 잠금 실패, 잠금 없이 갱신 course_id={course_id}: {e}")
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            self._release_lock(key, token)
+
+    def _release_lock(self, key: str, token: str):
+        # 잠금이 만료되어 다른 워커가 가져간 경우 그 잠금은 지우지 않는다
+        try:
+            with self.redis.pipeline() as pipe:
+                pipe.watch(key)
+                if pipe.get(key) == token.encode():
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.execute()
+        except WatchError:
+            pass
+        except Exception as e:
+            logger.warning(f"[CourseVectorIndex] 잠금 해제 실패 {key}: {e}")
+
+    def _fetch(self, ids: List[str]) -> Dict[str, dict]:
+        records: Dict[str, dict] = {}
+        for i in range(0, len(ids), FETCH_BATCH_SIZE):
+            records.update(self.index.fetch(ids=ids[i:i + FETCH_BATCH_SIZE]).get("vectors", {}))
+        return records
+
+    # ---- 읽기 ----
+
+    def query_courses(self, vector: List[float], top_k: int) -> List[Tuple[int, float, List[int]]]:
+        """(course_id, score, 소속 video_id 목록)을 점수 순으로"""
+        response = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            filter={"type": {"$eq": "course"}},
+            include_metadata=True,
+        )
+        courses = []
+        for match in response.get("matches", []):
+            metadata = match.get("metadata") or {}
+            try:
+                course_id = int(metadata["course_id"])
+                video_ids = [int(vid) for vid in metadata.get("video_ids", [])]
+            except (KeyError, TypeError, ValueError):
+                continue
+            courses.append((course_id, match.get("score", 0.0), video_ids))
+        return courses
+
+
+def _course_id_of(record: Optional[dict]) -> Optional[int]:
+    try:
+        return int(((record or {}).get("metadata") or {})["course_id"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+@lru_cache()
+def get_course_vector_index() -> Optional[CourseVectorIndex]:
+    """pinecone.index_name_course가 설정된 경우에만 만든다. 없으면 None (청크 검색만 사용)."""
+    settings = get_settings()
+    if not settings.pinecone.index_name_course:
+        return None
+    return CourseVectorIndex(get_vector_store(settings.pinecone.index_name_course))
+
+
+if __name__ == "__main__":
+    # 기존 영상 백필: poetry run python -m app.common.vector_store.video.course_vector_index
+    from app.core.db import get_db_session
+    from app.models.video import VideoCourse
+
+    logging.basicConfig(level=logging.INFO)
+    course_vector_index = get_course_vector_index()
+    if course_vector_index is None:
+        raise SystemExit("pinecone.index_name_course가 설정되지 않았습니다.")
+
+    db = get_db_session()
+    try:
+        videos = (
+            db.query(VideoCourse.id, VideoCourse.course_id)
+            .filter(VideoCourse.course_id.isnot(None), VideoCourse.is_deleted == False)
+            .all()
+        )
+    finally:
+        db.close()
+    course_vector_index.backfill(
+        get_vector_store(get_settings().pinecone.index_name),
+        [(video_id, course_id) for video_id, course_id in videos],
+    )
@@ -0,0 +1,251 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# rowid = video_id * ROWID_STRIDE + chunk_index → 영상 단위 삭제를 rowid 범위 조건으로 처리
+ROWID_STRIDE = 100_000
+
+# 전체 청크 중 이 비율 이하에만 나오는 영문/숫자 키워드를 도구 이름 같은 "희귀 키워드"로 본다
+RARE_TERM_MAX_DF_RATIO = 0.02
+RARE_TERM_MAX_DF_FLOOR = 20
+
+_LATIN_TOKEN = re.compile(r"[0-9a-z]+(?:[.+#][0-9a-z]+)*[+#]*")
+_HANGUL_RUN = re.compile(r"[가-힣]+")
+_KEYWORD_STOPWORDS = {
+    "the", "and", "for", "with", "how", "what", "to", "of", "in", "on", "is", "are", "an", "or", "vs",
+}
+
+_SCHEMA = [
+    # tokens: tokenize()로 만든 토큰을 공백으로 이은 문자열 (FTS5는 공백 기준으로만 다시 나눈다)
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+        tokens, text UNINDEXED, tokenize="unicode61 tokenchars '.+#'"
+    )
+    """,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_vocab USING fts5vocab(chunks, 'row')",
+    "CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO stats (key, value) VALUES ('chunk_count', 0)",
+]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    영문/숫자는 단어 단위(make.com, c++, node.js는 통째로 + 점 기준 조각), 한글은 음절 bigram.
+    조사/어미가 붙은 한글 어절도 부분 일치하도록 형태소 분석 없이 bigram을 쓴다.
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    tokens: List[str] = []
+    for match in _LATIN_TOKEN.finditer(text):
+        token = match.group()
+        tokens.append(token)
+        if "." in token:
+            tokens.extend(part for part in token.split(".") if part)
+    for match in _HANGUL_RUN.finditer(text):
+        word = match.group()
+        if len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def keyword_tokens(text: str) -> List[str]:
+    """질의에 들어 있는 영문/숫자 키워드 (도구 이름, 버전 등). 질의 확장으로는 보완되지 않는 정확 일치 신호"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    seen: List[str] = []
+    for match in _LATIN_TOKEN.finditer(text):
+        token = match.group()
+        if len(token) >= 2 and token not in _KEYWORD_STOPWORDS and token not in seen:
+            seen.append(token)
+    return seen
+
+
+def _match_expression(tokens: Iterable[str], operator: str) -> str:
+    # 토큰에는 따옴표가 들어갈 수 없으므로 그대로 감싼다
+    return f" {operator} ".join(f'"{token}"' for token in dict.fromkeys(tokens))
+
+
+@dataclass
+class LexicalSearchResult:
+    matches: List[dict] = field(default_factory=list)  # Pinecone 응답과 같은 모양 (score는 클수록 관련)
+    strong: bool = False  # 질의의 희귀 키워드가 모두 그대로 들어 있는 영상이 충분히 많은지
+
+
+class ChunkLexicalIndex:
+    """
+    영상 전사 청크의 BM25 역색인 (SQLite FTS5, 디스크에 저장).
+    VectorStorageService.upsert_text가 영상 단위로 갱신하고, 검색 서버는 같은 파일을 읽는다.
+    여러 프로세스가 함께 쓰므로 WAL 모드로 열고, 연결은 스레드마다 따로 둔다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    # ---- 쓰기 ----
+
+    def upsert_video(self, video_id: int, chunks: List[str]):
+        """영상의 청크 전체를 교체한다 (청크 수가 줄어든 경우도 포함)."""
+        with self.conn:
+            self._delete_video(video_id)
+            self._insert([(video_id, i, chunk) for i, chunk in enumerate(chunks)])
+
+    def delete_videos(self, video_ids: List[int]):
+        with self.conn:
+            for video_id in video_ids:
+                self._delete_video(int(video_id))
+
+    def upsert_chunks(self, rows: List[Tuple[int, int, str]]):
+        """(video_id, chunk_index, text) 단위 반영 (백필용)"""
+        with self.conn:
+            removed = 0
+            for video_id, chunk_index, _ in rows:
+                rowid = video_id * ROWID_STRIDE + chunk_index
+                removed += self.conn.execute("DELETE FROM chunks WHERE rowid = ?", (rowid,)).rowcount
+            self._add_chunk_count(-removed)
+            self._insert(rows)
+
+    def backfill_from_index(self, index, batch_size: int = 100) -> int:
+        """영상 청크 벡터 인덱스의 metadata text로 전체를 다시 채운다."""
+        total = 0
+        for ids in index.list(prefix=""):
+            for i in range(0, len(ids), batch_size):
+                vectors = index.fetch(ids=ids[i:i + batch_size]).get("vectors", {})
+                rows = []
+                for vector in vectors.values():
+                    metadata = vector.get("metadata") or {}
+                    try:
+                        rows.append((int(metadata["video_id"]), int(metadata["chunk_index"]), metadata["text"]))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                self.upsert_chunks(rows)
+                total += len(rows)
+
+        logger.info(f"[ChunkLexicalIndex] 백필 완료: {total}개")
+        return total
+
+    def _delete_video(self, video_id: int):
+        start = video_id * ROWID_STRIDE
+        removed = self.conn.execute(
+            "DELETE FROM chunks WHERE rowid >= ? AND rowid < ?",
+            (start, start + ROWID_STRIDE),
+        ).rowcount
+        self._add_chunk_count(-removed)
+
+    def _insert(self, rows: List[Tuple[int, int, str]]):
+        self.conn.executemany(
+            "INSERT INTO chunks (rowid, tokens, text) VALUES (?, ?, ?)",
+            [
+                (video_id * ROWID_STRIDE + chunk_index, " ".join(tokenize(text)), text)
+                for video_id, chunk_index, text in rows
+            ],
+        )
+        self._add_chunk_count(len(rows))
+
+    def _add_chunk_count(self, delta: int):
+        if delta:
+            self.conn.execute("UPDATE stats SET value = value + ? WHERE key = 'chunk_count'", (delta,))
+
+    # ---- 읽기 ----
+
+    def search(self, query: str, top_k: int, min_videos_for_strong: int = 3) -> LexicalSearchResult:
+        result = LexicalSearchResult()
+        tokens = tokenize(query)
+        if not tokens:
+            return result
+
+        rows = self.conn.execute(
+            "SELECT rowid, text, bm25(chunks) FROM chunks WHERE chunks MATCH ? ORDER BY bm25(chunks) LIMIT ?",
+            (_match_expression(tokens, "OR"), top_k),
+        ).fetchall()
+
+        for rowid, text, rank in rows:
+            video_id, chunk_index = divmod(rowid, ROWID_STRIDE)
+            result.matches.append({
+                "id": f"{video_id}-{chunk_index}",
+                "score": -rank,  # FTS5 bm25()는 관련도가 높을수록 작은 값
+                "metadata": {"video_id": str(video_id), "chunk_index": chunk_index, "text": text},
+            })
+
+        result.strong = self._has_strong_keywords(query, min_videos_for_strong)
+        return result
+
+    def _has_strong_keywords(self, query: str, min_videos: int) -> bool:
+        keywords = keyword_tokens(query)
+        if not keywords:
+            return False
+
+        chunk_count = self.conn.execute("SELECT value FROM stats WHERE key = 'chunk_count'").fetchone()[0]
+        max_df = max(RARE_TERM_MAX_DF_FLOOR, int(chunk_count * RARE_TERM_MAX_DF_RATIO))
+        placeholders = ",".join("?" * len(keywords))
+        doc_freq = dict(self.conn.execute(
+            f"SELECT term, doc FROM chunks_vocab WHERE term IN ({placeholders})", keywords
+        ).fetchall())
+        # 색인에 없는 키워드가 있으면 다른 표현으로 찾아야 하므로 확장이 필요하다. 흔한 키워드(ai 등)는 근거로 보지 않는다
+        if any(doc_freq.get(keyword, 0) == 0 for keyword in keywords):
+            return False
+        rare_keywords = [keyword for keyword in keywords if doc_freq[keyword] <= max_df]
+        if not rare_keywords:
+            return False
+
+        video_count = self.conn.execute(
+            "SELECT COUNT(*) FROM (SELECT DISTINCT rowid / ? FROM chunks WHERE chunks MATCH ? LIMIT ?)",
+            (ROWID_STRIDE, _match_expression(rare_keywords, "AND"), min_videos),
+        ).fetchone()[0]
+        return video_count >= min_videos
+
+
+@lru_cache()
+def get_lexical_index() -> Optional[ChunkLexicalIndex]:
+    """lexical_index.enabled일 때만 만든다. 비활성화면 None (벡터 검색만 사용)."""
+    settings = get_settings()
+    if not settings.lexical_index.enabled:
+        return None
+
+    path = Path(settings.lexical_index.path)
+    if not path.is_absolute():
+        path = Path(settings.base_dir) / path
+    logger.info(f"[ChunkLexicalIndex] 로컬 BM25 인덱스 사용: {path}")
+    return ChunkLexicalIndex(str(path))
+
+
+if __name__ == "__main__":
+    # 기존 영상 청크 백필: poetry run python -m app.common.vector_store.video.lexical_index
+    from app.common.vector_store.vector_store import get_vector_store
+
+    logging.basicConfig(level=logging.INFO)
+    lexical_index = get_lexical_index()
+    if lexical_index is None:
+        raise SystemExit("lexical_index.enabled=false")
+    lexical_index.backfill_from_index(get_vector_store(get_settings().pinecone.index_name))
@@ -0,0 +1,174 @@
+import hashlib
+from typing import List, Optional, Tuple
+
+import tiktoken
+
+DEFAULT_MAX_TOKENS = 1000
+DEFAULT_OVERLAP_TOKENS = 100
+
+SENTENCE_ENDINGS = (".", "!", "?", "。", "！", "？", "…")
+
+# 경계 앞뒤 이 글자 수만큼의 내용으로 '자를 지점인지'를 정한다 (앞쪽 위치와 무관하게)
+ANCHOR_CONTEXT_CHARS = 32
+
+
+class TokenTextChunker:
+    """
+    전사 텍스트를 한 번만 토큰화한 뒤 토큰 오프셋 기준으로 분할한다.
+    청크 끝은 문장 경계(없으면 단어 경계) 중 주변 내용의 해시로 고른 지점에 맞추고,
+    다음 청크는 overlap 토큰만큼 겹쳐 시작한다.
+    자를 지점이 앞에서부터 센 토큰 수가 아니라 경계 주변 내용으로 정해지므로, 전사 일부를 고쳐도
+    수정 위치 근처 청크만 바뀌고 나머지 청크 텍스트(= text_hash)는 그대로 유지된다.
+    """
+
+    def __init__(
+        self,
+        encoding: Optional[tiktoken.Encoding] = None,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+        min_fill_ratio: float = 0.6,
+    ):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens는 1 이상이어야 합니다.")
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens는 0 이상, max_tokens 미만이어야 합니다.")
+
+        self.encoding = encoding or tiktoken.encoding_for_model("text-embedding-3-large")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        # 경계를 찾을 때 청크가 이 비율보다 짧아지지 않도록 제한
+        self.min_tokens = max(1, int(max_tokens * min_fill_ratio))
+        # min_tokens 이후 평균 이 토큰 수마다 자를 지점이 나오도록 잡는다 (max_tokens까지 못 찾을 확률 ≈ e^-4)
+        self.anchor_spacing = max(1, (max_tokens - self.min_tokens) // 4)
+
+    def chunk(self, text: str) -> List[str]:
+        return [chunk_text for chunk_text, _, _ in self.chunk_with_spans(text)]
+
+    def chunk_with_spans(self, text: str) -> List[Tuple[str, int, int]]:
+        """(청크 텍스트, 시작 토큰 인덱스, 끝 토큰 인덱스) 목록을 반환한다."""
+        if not text or not text.strip():
+            return []
+
+        tokens = self.encoding.encode(text)
+        total = len(tokens)
+        if total == 0:
+            return []
+
+        decoded, offsets = self.encoding.decode_with_offsets(tokens)
+        char_offsets = offsets + [len(decoded)]
+        word_starts, sentence_starts = self._boundary_flags(decoded, offsets)
+        boundaries = [
+            (sentence_starts, self._gaps(sentence_starts)),
+            (word_starts, self._gaps(word_starts)),
+        ]
+
+        spans = []
+        start = 0
+
+        while start < total:
+            end = total
+            if total - start > self.max_tokens:
+                end = self._anchored_end(start, decoded, char_offsets, boundaries)
+
+            chunk_text = decoded[char_offsets[start]:char_offsets[end]].strip()
+            if chunk_text:
+                spans.append((chunk_text, start, end))
+
+            if end >= total:
+                break
+
+            next_start = max(end - self.overlap_tokens, start + 1)
+            # overlap 시작점을 단어 경계로 맞춤 (end를 넘지 않는 범위에서)
+            while next_start < end and not word_starts[next_start]:
+                next_start += 1
+            start = next_start
+
+        return spans
+
+    def _anchored_end(
+        self,
+        start: int,
+        decoded: str,
+        char_offsets: List[int],
+        boundaries: List[Tuple[List[bool], List[int]]],
+    ) -> int:
+        """
+        (start + min_tokens, start + max_tokens] 안에서 문장 경계 → 단어 경계 순으로 자를 지점을 고른다.
+        - 경계 i는 주변 내용 해시 h(0~1)가 h * anchor_spacing < (직전 같은 종류 경계와의 토큰 거리)이면 자를 지점이다.
+          거리로 나누므로 경계가 촘촘한 텍스트(단어 경계)든 드문 텍스트(문장 경계)든 토큰 기준 빈도가 같다
+        - 창 안에 그런 지점이 없으면 h / 거리가 가장 작은 경계에서 자른다 (이 역시 내용으로 정해진다)
+        """
+        lower = start + self.min_tokens
+        hard_end = start + self.max_tokens
+
+        for starts, gaps in boundaries:
+            best = None
+            for i in range(lower + 1, hard_end + 1):
+                if not starts[i]:
+                    continue
+                score = self._anchor_hash(decoded, char_offsets[i])
+                if score * self.anchor_spacing < gaps[i]:
+                    return i
+                ratio = score / gaps[i]
+                if best is None or ratio < best[0]:
+                    best = (ratio, i)
+            if best is not None:
+                return best[1]
+
+        return hard_end
+
+    @staticmethod
+    def _anchor_hash(decoded: str, char_offset: int) -> float:
+        context = decoded[max(0, char_offset - ANCHOR_CONTEXT_CHARS):char_offset + ANCHOR_CONTEXT_CHARS]
+        digest = hashlib.blake2b(context.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2 ** 64
+
+    @staticmethod
+    def _gaps(flags: List[bool]) -> List[int]:
+        """각 위치에서 직전 경계(자기 자신 제외)까지의 토큰 거리"""
+        gaps = []
+        previous = 0
+        for i, flag in enumerate(flags):
+            gaps.append(max(1, i - previous))
+            if flag:
+                previous = i
+        return gaps
+
+    @staticmethod
+    def _boundary_flags(decoded: str, offsets: List[int]) -> Tuple[List[bool], List[bool]]:
+        """토큰 i 앞이 단어 경계인지, 문장 경계인지를 한 번에 계산한다."""
+        word_starts = []
+        sentence_starts = []
+        prev_offset = -1
+
+        for offset in offsets:
+            # 멀티바이트 문자가 여러 토큰으로 쪼개진 경우 같은 오프셋이 반복된다
+            if offset == prev_offset or offset == 0:
+                is_first = prev_offset == -1
+                word_starts.append(is_first)
+                sentence_starts.append(is_first)
+                prev_offset = offset
+                continue
+
+            current_char = decoded[offset] if offset < len(decoded) else " "
+            prev_char = decoded[offset - 1]
+            is_word = current_char.isspace() or prev_char.isspace()
+
+            is_sentence = False
+            if is_word:
+                if prev_char == "\n" or current_char == "\n":
+                    is_sentence = True
+                else:
+                    last = prev_char
+                    if last.isspace() and offset >= 2:
+                        last = decoded[offset - 2]
+                    is_sentence = last in SENTENCE_ENDINGS
+
+            word_starts.append(is_word)
+            sentence_starts.append(is_sentence)
+            prev_offset = offset
+
+        # 마지막 토큰 뒤(텍스트 끝)는 항상 경계
+        word_starts.append(True)
+        sentence_starts.append(True)
+        return word_starts, sentence_starts
@@ -1,49 +1,102 @@
+import logging
+from typing import Dict, List
+
 from app.core.exceptions import APIException
 from app.core.error_codes import ErrorCode
+from app.common.vector_store.video.chunk_vector_cache import video_chunk_vector_cache
+from app.common.vector_store.video.lexical_index import get_lexical_index
+from app.common.vector_store.video.course_vector_index import get_course_vector_index
+
+logger = logging.getLogger(__name__)
+
+FETCH_BATCH_SIZE = 100    # Pinecone fetch 한 번에 조회할 id 수
+DELETE_BATCH_SIZE = 1000  # Pinecone delete 한 번에 보낼 수 있는 최대 id 수
+
+
+def video_vector_ids(video_id: int, chunk_count: int) -> List[str]:
+    """upsert_text가 쓰는 결정적 id: "{video_id}-{chunk_index}" """
+    return [f"{video_id}-{i}" for i in range(chunk_count)]
 
 
 class VectorDeleteService:
     def __init__(self, index=None):
         self.index = index
 
-    def delete_by_video_id(self, video_id: int):
-        if self.index is None:
+    def delete_by_video_id(self, video_id: int) -> int:
+        return self.delete_by_video_ids([video_id])
+
+    def delete_by_video_ids(self, video_ids: list[int]) -> int:
+        if self.index is None or not video_ids:
             return 0
 
+        video_chunk_vector_cache.delete(video_ids)
+        self._delete_from_lexical_index(video_ids)
+        self._delete_from_course_vector_index(video_ids)
+
         try:
-            fake_vector = [0.0] * 3072  # Just for query API requirement
-            response = self.index.query(
-                vector=fake_vector,
-                top_k=1000,
-                filter={"video_id": str(video_id)},
-                include_metadata=True
-            )
-            ids_to_delete = [match["id"] for match in response.get("matches", [])]
-            if ids_to_delete:
-                self.index.delete(ids=ids_to_delete)
+            ids_to_delete = self.collect_vector_ids(video_ids)
+            self.delete_ids(ids_to_delete)
             return len(ids_to_delete)
+
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
-    def delete_by_video_ids(self, video_ids: list[int]) -> int:
-        if self.index is None or not video_ids:
-            return 0
+    @staticmethod
+    def _delete_from_lexical_index(video_ids: List[int]):
+        lexical_index = get_lexical_index()
+        if lexical_index is None:
+            return
+        try:
+            lexical_index.delete_videos(video_ids)
+        except Exception as e:
+            logger.warning(f"[VectorDeleteService] BM25 인덱스 삭제 실패 video_ids={video_ids}: {e}")
 
+    @staticmethod
+    def _delete_from_course_vector_index(video_ids: List[int]):
+        course_vector_index = get_course_vector_index()
+        if course_vector_index is None:
+            return
         try:
-            fake_vector = [0.0] * 3072
+            course_vector_index.delete_videos(video_ids)
+        except Exception as e:
+            logger.warning(f"[VectorDeleteService] 강의 벡터 갱신 실패 video_ids={video_ids}: {e}")
 
-            response = self.index.query(
-                vector=fake_vector,
-                top_k=1000,
-                filter={"video_id": {"$in": [str(v_id) for v_id in video_ids]}},
-                include_metadata=True
-            )
+    def delete_ids(self, ids: List[str]):
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            self.index.delete(ids=ids[i:i + DELETE_BATCH_SIZE])
 
-            ids_to_delete = [match["id"] for match in response.get("matches", [])]
-            if ids_to_delete:
-                self.index.delete(ids=ids_to_delete)
+    def collect_vector_ids(self, video_ids: List[int]) -> List[str]:
+        """
+        각 영상의 첫 청크({video_id}-0) metadata에 기록된 chunk_count로 전체 id를 만든다.
+        chunk_count가 없는 이전 벡터는 id를 순서대로 fetch해 존재하는 것만 모은다.
+        """
+        heads: Dict[str, dict] = {}
+        head_ids = [f"{video_id}-0" for video_id in video_ids]
+        for i in range(0, len(head_ids), FETCH_BATCH_SIZE):
+            heads.update(self.index.fetch(ids=head_ids[i:i + FETCH_BATCH_SIZE]).get("vectors", {}))
 
-            return len(ids_to_delete)
+        ids: List[str] = []
+        for video_id, head_id in zip(video_ids, head_ids):
+            head = heads.get(head_id)
+            if head is None:
+                continue
 
-        except Exception as e:
-            raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
+            chunk_count = (head.get("metadata") or {}).get("chunk_count")
+            if chunk_count:
+                ids.extend(video_vector_ids(video_id, int(chunk_count)))
+            else:
+                ids.extend(self._probe_vector_ids(video_id))
+
+        return ids
+
+    def _probe_vector_ids(self, video_id: int) -> List[str]:
+        # 청크 id는 0부터 연속이므로 한 페이지가 다 차지 않으면 끝
+        found: List[str] = []
+        start = 0
+        while True:
+            page = [f"{video_id}-{i}" for i in range(start, start + FETCH_BATCH_SIZE)]
+            vectors = self.index.fetch(ids=page).get("vectors", {})
+            found.extend(vector_id for vector_id in page if vector_id in vectors)
+            if len(vectors) < FETCH_BATCH_SIZE:
+                return found
+            start += FETCH_BATCH_SIZE
@@ -3,20 +3,17 @@ from app.core.config import get_settings
 from app.core.exceptions import APIException
 from app.core.error_codes import ErrorCode
 from app.repositories.video.video_course_repository import VideoCourseRepository
-from pinecone import Pinecone
-from openai import OpenAI
+from app.common.embedding.embedding_service import EmbeddingService
+from app.common.vector_store.vector_store import get_vector_store
 
 settings = get_settings()
 
-openai_client = OpenAI(api_key=settings.openai.api_key)
-pc = Pinecone(api_key=settings.pinecone.api_key)
-index = pc.Index(settings.pinecone.index_name)
-
 
 class VectorSearchService:
     def __init__(self, video_course_repo: VideoCourseRepository):
-        self.index = index
+        self.index = get_vector_store(settings.pinecone.index_name)
         self.video_course_repo = video_course_repo
+        self.embedding_service = EmbeddingService()
 
     def search_similar_chunks(self, course_id: int, query: str, top_k: int = 5) -> List[str]:
         try:
@@ -26,11 +23,7 @@ class VectorSearchService:
 
             video_id = video_course.id
 
-            embedding_response = openai_client.embeddings.create(            # 임베딩 생성
-                input=query,
-                model="text-embedding-3-large"
-            )
-            query_vector = embedding_response.data[0].embedding
+            query_vector = self.embedding_service.embed_text(query)            # 임베딩 생성 (캐시 우선)
 
             search_result = self.index.query(            # 벡터 검색
                 vector=query_vector,
@@ -39,7 +32,7 @@ class VectorSearchService:
                 filter={"video_id": str(video_id)}
             )
 
-            chunks = [match.metadata.get("text", "") for match in search_result.get("matches", [])]
+            chunks = [(match.get("metadata") or {}).get("text", "") for match in search_result.get("matches", [])]
             return chunks
 
         except Exception as e:
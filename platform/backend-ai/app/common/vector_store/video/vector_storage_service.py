@@ -1,81 +1,70 @@
-from typing import List, Callable, Optional
+import hashlib
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Callable, Optional, Set, Tuple
 from app.core.config import get_settings
 from app.core.exceptions import APIException
 from app.core.error_codes import ErrorCode
+from app.common.vector_store.video.text_chunker import TokenTextChunker
+from app.common.embedding.embedding_service import EmbeddingService
+from app.common.vector_store.video.chunk_vector_cache import video_chunk_vector_cache
+from app.common.vector_store.video.lexical_index import get_lexical_index
+from app.common.vector_store.video.course_vector_index import get_course_vector_index
+from app.common.vector_store.video.vector_delete_service import (
+    FETCH_BATCH_SIZE,
+    VectorDeleteService,
+    video_vector_ids,
+)
+from app.common.vector_store.vector_store import get_vector_store
 
-from pinecone import Pinecone
-from openai import OpenAI
+import numpy as np
 import tiktoken
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
-# Initialize OpenAI and Pinecone clients
-openai_client = OpenAI(api_key=settings.openai.api_key)
-pc = Pinecone(api_key=settings.pinecone.api_key)
-index = pc.Index(settings.pinecone.index_name)
+CHUNK_OVERLAP_TOKENS = 100
 
+# Pinecone upsert 요청 한도(2MB)를 넘지 않도록 3072차원 벡터 + 청크 텍스트 기준으로 잡은 배치 크기
+UPSERT_BATCH_SIZE = 50
+MAX_IN_FLIGHT_BATCHES = 2
 
-class VectorStorageService:
-    def __init__(self):
-        self.index = index
-        self.encoding = tiktoken.encoding_for_model("text-embedding-3-large")
 
-    def _chunk_text(self, text: str, max_tokens: int = 1000) -> List[str]:
-        words = text.split()
-        chunks = []
-        current_chunk = []
-
-        for word in words:
-            current_chunk.append(word)
-            try:
-                if len(self.encoding.encode(" ".join(current_chunk))) > max_tokens:
-                    current_chunk.pop()
-                    chunks.append(" ".join(current_chunk))
-                    current_chunk = [word]
-            except Exception as e:
-                raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
-
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
-
-        return chunks
-
-    def _embed_texts(
-        self,
-        texts: List[str],
-        batch_size: int = 100,
-        max_workers: int = 4,
-        progress_callback: Optional[Callable[[str, int], None]] = None
-    ) -> List[List[float]]:
-        def embed_batch(batch: List[str]) -> List[List[float]]:
-            response = openai_client.embeddings.create(
-                input=batch,
-                model="text-embedding-3-large"
-            )
-            return [r.embedding for r in response.data]
+def chunk_text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-        try:
-            chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
-            total_chunks = len(chunks)
-            embeddings = []
 
-            if progress_callback:
-                progress_callback("임베딩 시작", 20)
+def _same_metadata(stored: dict, metadata: dict) -> bool:
+    return all(stored.get(key) == value for key, value in metadata.items())
 
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = {executor.submit(embed_batch, batch): idx for idx, batch in enumerate(chunks)}
-                completed = 0
 
-                for future in as_completed(futures):
-                    result = future.result()
-                    embeddings.extend(result)
-                    completed += 1
-                    if progress_callback:
-                        progress_callback("임베딩 진행 중", 20 + int(30 * completed / total_chunks))
+class VectorStorageService:
+    def __init__(
+        self,
+        upsert_batch_size: int = UPSERT_BATCH_SIZE,
+        max_in_flight: int = MAX_IN_FLIGHT_BATCHES,
+    ):
+        self.index = get_vector_store(settings.pinecone.index_name)
+        self.upsert_batch_size = upsert_batch_size
+        self.max_in_flight = max_in_flight
+        self.encoding = tiktoken.encoding_for_model("text-embedding-3-large")
+        self.embedding_service = EmbeddingService()
+        self.delete_service = VectorDeleteService(self.index)
 
-            return embeddings
+    def _chunk_text(self, text: str, max_tokens: int = 1000) -> List[str]:
+        try:
+            chunker = TokenTextChunker(
+                encoding=self.encoding,
+                max_tokens=max_tokens,
+                overlap_tokens=min(CHUNK_OVERLAP_TOKENS, max_tokens // 2),
+            )
+            return chunker.chunk(text)
+        except Exception as e:
+            raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        try:
+            return self.embedding_service.embed_texts(texts)
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
@@ -83,8 +72,21 @@ class VectorStorageService:
         self,
         video_id: int,
         text: str,
-        progress_callback: Optional[Callable[[str, int], None]] = None
+        progress_callback: Optional[Callable[[str, int], None]] = None,
+        course_id: Optional[int] = None,
     ) -> List[str]:
+        """
+        기존 청크의 text_hash → id 목록을 만든 뒤, 청크를 upsert_batch_size개씩
+        (재사용할 기존 벡터만 조회 → 새 텍스트만 임베딩 → upsert) 하는 배치로 나눠,
+        최대 max_in_flight개 배치를 동시에 처리한다. 진행률은 실제로 저장이 끝난 청크 수 기준이다.
+        벡터는 배치가 끝날 때마다 float32 행렬 하나에 모으고, 기존 벡터 값은 배치에서 필요한 만큼만 읽는다.
+
+        첫 청크({video_id}-0)의 chunk_count가 삭제 시 id 목록(manifest)이므로, 중간에 실패해도
+        manifest 밖에 남는 벡터가 없도록 순서를 정한다.
+        - 청크 수가 늘면(처음 색인 포함) 첫 청크를 먼저 써서 manifest부터 늘린다
+        - 그대로거나 줄면 나머지 배치가 모두 성공하고 남는 id를 지운 뒤에 첫 청크를 쓴다
+        course_id가 있으면 강의 단위 대표 벡터도 다시 계산한다.
+        """
         if not text:
             raise APIException(ErrorCode.BAD_REQUEST_BODY, details=["Empty text"])
 
@@ -94,39 +96,180 @@ class VectorStorageService:
 
             chunks = self._chunk_text(text)
             total = len(chunks)
+            ids = video_vector_ids(video_id, total)
 
             if progress_callback:
                 progress_callback("텍스트 분할 완료", 10)
 
-            embeddings = self._embed_texts(chunks, progress_callback=progress_callback)
-
-            items = []
-            ids = []
+            # 수정으로 청크 위치가 밀려도 같은 텍스트는 재사용하도록 기존 청크의 text_hash → id만 모은다
+            # (벡터 값은 들고 있지 않고, 배치마다 실제로 재사용할 것만 다시 읽는다)
+            previous_ids = self.delete_service.collect_vector_ids([video_id])
+            reusable_ids = self._collect_text_hashes(previous_ids)
+            previous_id_set = set(previous_ids)
+            head_first = total > len(previous_ids)
 
-            for i, (chunk, vector) in enumerate(zip(chunks, embeddings)):
-                doc_id = f"{video_id}-{i}"
-                ids.append(doc_id)
+            matrix: Optional[np.ndarray] = None
+            persisted = embedded = upserted = 0
 
-                items.append({
-                    "id": doc_id,
-                    "values": vector,
-                    "metadata": {
-                        "video_id": str(video_id),
-                        "chunk_index": i,
-                        "text": chunk
-                    }
-                })
+            def collect(result: Tuple[int, np.ndarray, int, int]):
+                nonlocal matrix, persisted, embedded, upserted
+                start, vectors, batch_embedded, batch_upserted = result
+                if matrix is None:
+                    matrix = np.empty((total, vectors.shape[1]), dtype=np.float32)
+                matrix[start:start + len(vectors)] = vectors
+                persisted += len(vectors)
+                embedded += batch_embedded
+                upserted += batch_upserted
 
                 if progress_callback:
-                    percent = 50 + int((i + 1) / total * 40)  # 50~90%
-                    progress_callback(f"벡터 저장 중 ({i + 1}/{total})", percent)
+                    percent = 10 + int(persisted / total * 85)  # 10~95%
+                    progress_callback(f"벡터 저장 중 ({persisted}/{total})", percent)
 
-            self.index.upsert(vectors=items)
+            if head_first:
+                collect(self._store_batch(video_id, chunks, 0, 1, previous_id_set, reusable_ids))
+
+            batch_starts = list(range(1, total, self.upsert_batch_size))
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+                pending = set()
+                next_batch = 0
+
+                while next_batch < len(batch_starts) or pending:
+                    while next_batch < len(batch_starts) and len(pending) < self.max_in_flight:
+                        start = batch_starts[next_batch]
+                        end = min(start + self.upsert_batch_size, total)
+                        pending.add(executor.submit(
+                            self._store_batch, video_id, chunks, start, end, previous_id_set, reusable_ids
+                        ))
+                        next_batch += 1
+
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+
+            # 줄어든 청크 id는 다른 위치에서 재사용될 수 있으므로 모든 배치가 끝난 뒤 지운다
+            current_ids = set(ids)
+            stale_ids = [vid for vid in previous_ids if vid not in current_ids]
+            if stale_ids:
+                self.delete_service.delete_ids(stale_ids)
+
+            if not head_first:
+                collect(self._store_batch(video_id, chunks, 0, 1, previous_id_set, reusable_ids))
+
+            logger.info(
+                f"[VectorStorageService] video_id={video_id} chunks={total} "
+                f"embedded={embedded} upserted={upserted} deleted={len(stale_ids)}"
+            )
+
+            # 강의 요청 매칭에서 Pinecone 재조회 없이 쓰도록 청크 벡터 캐시
+            video_chunk_vector_cache.set(video_id, chunks, matrix)
+
+            self._update_lexical_index(video_id, chunks)
+            if course_id is not None:
+                self._update_course_vector_index(video_id, course_id, matrix)
 
             if progress_callback:
                 progress_callback("벡터 업서트 완료", 100)
 
             return ids
 
+        except APIException:
+            raise
+        except Exception as e:
+            raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
+
+    @staticmethod
+    def _update_lexical_index(video_id: int, chunks: List[str]):
+        # BM25 인덱스는 검색 보조용이므로 실패해도 벡터 저장은 성공으로 둔다
+        lexical_index = get_lexical_index()
+        if lexical_index is None:
+            return
+        try:
+            lexical_index.upsert_video(video_id, chunks)
+        except Exception as e:
+            logger.warning(f"[VectorStorageService] BM25 인덱스 갱신 실패 video_id={video_id}: {e}")
+
+    @staticmethod
+    def _update_course_vector_index(video_id: int, course_id: int, matrix: np.ndarray):
+        course_vector_index = get_course_vector_index()
+        if course_vector_index is None:
+            return
+        try:
+            course_vector_index.update_video(video_id, course_id, matrix)
         except Exception as e:
-            raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
\ No newline at end of file
+            logger.warning(f"[VectorStorageService] 강의 벡터 갱신 실패 video_id={video_id} course_id={course_id}: {e}")
+
+    def _fetch_existing(self, ids: List[str]) -> Dict[str, dict]:
+        existing: Dict[str, dict] = {}
+        for i in range(0, len(ids), FETCH_BATCH_SIZE):
+            existing.update(self.index.fetch(ids=ids[i:i + FETCH_BATCH_SIZE]).get("vectors", {}))
+        return existing
+
+    def _collect_text_hashes(self, ids: List[str]) -> Dict[str, str]:
+        """기존 청크의 text_hash → vector id. fetch 한 번 분량씩 읽고 벡터 값은 바로 버린다."""
+        reusable_ids: Dict[str, str] = {}
+        for i in range(0, len(ids), FETCH_BATCH_SIZE):
+            fetched = self.index.fetch(ids=ids[i:i + FETCH_BATCH_SIZE]).get("vectors", {})
+            for vector_id, stored in fetched.items():
+                text_hash = (stored.get("metadata") or {}).get("text_hash")
+                if text_hash:
+                    reusable_ids.setdefault(text_hash, vector_id)
+        return reusable_ids
+
+    def _store_batch(
+        self,
+        video_id: int,
+        chunks: List[str],
+        start: int,
+        end: int,
+        previous_ids: Set[str],
+        reusable_ids: Dict[str, str],
+    ) -> Tuple[int, np.ndarray, int, int]:
+        """chunks[start:end]를 저장하고 (start, float32 벡터 행렬, 임베딩 수, upsert 수)를 반환한다."""
+        total = len(chunks)
+        batch_ids = [f"{video_id}-{i}" for i in range(start, end)]
+        hashes = [chunk_text_hash(chunks[i]) for i in range(start, end)]
+
+        # 이 배치 id의 기존 레코드(그대로면 다시 쓰지 않기 위해) + 이 배치가 재사용할 기존 벡터만 읽는다
+        fetch_ids = {vid for vid in batch_ids if vid in previous_ids}
+        fetch_ids.update(reusable_ids[text_hash] for text_hash in hashes if text_hash in reusable_ids)
+        existing = self._fetch_existing(sorted(fetch_ids))
+
+        # 위치와 상관없이 기존 청크 중 같은 텍스트가 있으면 그 벡터를 재사용하고, 새 텍스트만 임베딩한다.
+        # 다른 배치가 먼저 그 id를 덮어썼으면 text_hash가 달라지므로 임베딩으로 넘어간다
+        vectors: List[Optional[List[float]]] = [None] * len(batch_ids)
+        for offset, text_hash in enumerate(hashes):
+            stored = existing.get(reusable_ids.get(text_hash))
+            if stored and (stored.get("metadata") or {}).get("text_hash") == text_hash:
+                vectors[offset] = list(stored["values"])
+
+        changed = [offset for offset, vector in enumerate(vectors) if vector is None]
+        if changed:
+            embedded = self._embed_texts([chunks[start + offset] for offset in changed])
+            for offset, vector in zip(changed, embedded):
+                vectors[offset] = vector
+
+        items = []
+        for offset, (doc_id, vector) in enumerate(zip(batch_ids, vectors)):
+            i = start + offset
+            metadata = {
+                "video_id": str(video_id),
+                "chunk_index": i,
+                "chunk_count": total,  # 삭제 시 id 목록을 만드는 manifest
+                "text_hash": hashes[offset],
+                "text": chunks[i]
+            }
+            # 벡터와 metadata가 모두 그대로인 청크는 다시 쓰지 않는다
+            stored = existing.get(doc_id)
+            if offset not in changed and stored and _same_metadata(stored.get("metadata") or {}, metadata):
+                continue
+
+            items.append({
+                "id": doc_id,
+                "values": vector,
+                "metadata": metadata
+            })
+
+        if items:
+            self.index.upsert(vectors=items)
+
+        return start, np.asarray(vectors, dtype=np.float32), len(changed), len(items)
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Callable
+
+from app.core.cache import get_cache_redis
+from app.common.embedding.embedding_cache import normalize_text
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+LOCAL_CACHE_MAX_ITEMS = 1024
+
+_MISSING = object()
+
+
+class ExternalSearchCache:
+    """
+    외부 검색(SerpAPI, Wikipedia 등)과 그 후처리(번역, GPT 필터링) 결과 캐시.
+    (engine, 정규화된 질의, locale, 추가 파라미터) 해시를 키로 프로세스 내 LRU → Redis 순으로 조회한다.
+    - 빈 결과는 negative_ttl_seconds 동안만 보관한다 (같은 질의로 곧바로 다시 호출하지 않되, 새 결과는 빨리 반영)
+    - fetch가 예외를 던지면 저장하지 않는다 (일시 장애를 빈 결과로 굳히지 않도록)
+    Redis 장애 시에는 로컬 캐시만 사용하고 예외를 올리지 않는다.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        ttl_seconds: int,
+        negative_ttl_seconds: int,
+        maxsize: int = LOCAL_CACHE_MAX_ITEMS,
+        redis_client=None,
+    ):
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.local = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self._redis = redis_client
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_cache_redis()
+        return self._redis
+
+    def make_key(self, engine: str, query: str, locale: str = "", **params) -> str:
+        normalized = normalize_text(query).casefold()
+        extra = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(f"{engine}\n{locale}\n{extra}\n{normalized}".encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{engine}:{digest}"
+
+    def get_or_fetch(
+        self,
+        engine: str,
+        query: str,
+        fetch: Callable[[], Any],
+        locale: str = "",
+        **params,
+    ) -> Any:
+        key = self.make_key(engine, query, locale, **params)
+        cached = self.get(key)
+        if cached is not _MISSING:
+            return cached
+
+        value = fetch()
+        self.set(key, value)
+        return value
+
+    def get(self, key: str) -> Any:
+        """없으면 _MISSING (빈 결과도 유효한 캐시 값이므로 None과 구분한다)"""
+        cached = self.local.get(key, _MISSING)
+        if cached is _MISSING:
+            cached = self._get_redis(key)
+            if cached is not _MISSING:
+                self.local.set(key, cached, ttl_seconds=self._ttl_for(cached))
+
+        self._count("misses" if cached is _MISSING else "hits")
+        return cached
+
+    def set(self, key: str, value: Any):
+        ttl = self._ttl_for(value)
+        self.local.set(key, value, ttl_seconds=ttl)
+        try:
+            self.redis.set(key, json.dumps(value, ensure_ascii=False), ex=ttl)
+        except Exception as e:
+            logger.warning(f"[ExternalSearchCache] Redis 저장 실패: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.local),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+    def _ttl_for(self, value: Any) -> int:
+        return self.ttl_seconds if value else self.negative_ttl_seconds
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _get_redis(self, key: str) -> Any:
+        try:
+            raw = self.redis.get(key)
+        except Exception as e:
+            logger.warning(f"[ExternalSearchCache] Redis 조회 실패: {e}")
+            return _MISSING
+        return json.loads(raw) if raw is not None else _MISSING
+
+
+# 외부 검색 API 응답 (검색 결과는 자주 바뀌지 않으므로 수 시간 단위로 재사용)
+web_search_cache = ExternalSearchCache(
+    prefix="websearch:v1",
+    ttl_seconds=6 * 3600,
+    negative_ttl_seconds=10 * 60,
+)
+
+# 검색 질의 번역, GPT로 거른 서비스 목록 등 LLM 후처리 결과
+search_llm_cache = ExternalSearchCache(
+    prefix="websearch_llm:v1",
+    ttl_seconds=24 * 3600,
+    negative_ttl_seconds=10 * 60,
+)
@@ -0,0 +1,62 @@
+from typing import Dict, List, Optional
+
+import requests
+
+from app.core.config import get_settings
+from app.common.web_search.external_search_cache import web_search_cache
+
+settings = get_settings()
+
+REQUEST_TIMEOUT_SECONDS = 15
+
+
+def search_google(query: str, num: int, gl: Optional[str] = None, hl: Optional[str] = None) -> List[Dict]:
+    """
+    SerpAPI Google 검색의 organic 결과 (title, link, snippet).
+    요청이 실패하면 예외를 그대로 올린다 (실패는 캐시하지 않는다).
+    """
+    def fetch() -> List[Dict]:
+        params = {
+            "q": query,
+            "num": num,
+            "engine": "google",
+            "api_key": settings.serpapi.api_key,
+        }
+        if gl:
+            params["gl"] = gl
+        if hl:
+            params["hl"] = hl
+
+        resp = requests.get("https://serpapi.com/search", params=params, timeout=REQUEST_TIMEOUT_SECONDS)
+        resp.raise_for_status()
+        data = resp.json() or {}
+        return [
+            {"title": item.get("title"), "link": item.get("link"), "snippet": item.get("snippet")}
+            for item in data.get("organic_results", []) or []
+        ]
+
+    return web_search_cache.get_or_fetch("google", query, fetch, locale=f"{gl or ''}-{hl or ''}", num=num)
+
+
+def search_wikipedia(query: str, limit: int) -> List[Dict]:
+    """영문 Wikipedia 검색 결과 (title, snippet). 요청이 실패하면 예외를 그대로 올린다."""
+    def fetch() -> List[Dict]:
+        resp = requests.get(
+            "https://en.wikipedia.org/w/api.php",
+            params={
+                "action": "query",
+                "list": "search",
+                "srsearch": query,
+                "format": "json",
+                "srlimit": limit,
+            },
+            timeout=REQUEST_TIMEOUT_SECONDS,
+        )
+        resp.raise_for_status()
+        data = resp.json() or {}
+        return [
+            {"title": item.get("title"), "snippet": item.get("snippet")}
+            for item in (data.get("query", {}) or {}).get("search", []) or []
+        ]
+
+    return web_search_cache.get_or_fetch("wikipedia", query, fetch, locale="en", limit=limit)
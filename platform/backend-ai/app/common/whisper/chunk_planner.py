@@ -0,0 +1,193 @@
+import re
+import subprocess
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from app.utils.media_source import ffmpeg_input_args
+from app.utils.video_duration import get_video_duration_seconds
+
+# 청크 하나의 최대 길이. 파일 크기(25MB)로는 32kbps에서 1시간 반 이상도 가능하지만,
+# 요청 하나가 너무 길면 타임아웃 위험이 커지고 긴 영상도 병렬로 전사할 수 없으므로 10분으로 제한한다
+MAX_CHUNK_SECONDS = 10 * 60
+# 분할 지점은 [시작 + MAX_CHUNK_SECONDS * MIN_CHUNK_RATIO, 시작 + MAX_CHUNK_SECONDS] 안의 무음 구간에서 고른다
+MIN_CHUNK_RATIO = 0.5
+# 무음 구간을 찾지 못해 말하는 도중에 자를 때만 앞뒤 청크를 이만큼 겹친다
+OVERLAP_SECONDS = 2.0
+SIZE_SAFETY_RATIO = 0.9
+
+SILENCE_NOISE_DB = -35
+SILENCE_MIN_SECONDS = 0.5
+# 이보다 긴 무음은 청크 안에 남기지 않고 잘라낸다 (업로드·전사 비용을 줄이고, 긴 무음에서 Whisper가 문장을 지어내는 것도 막는다)
+LONG_SILENCE_SECONDS = 30.0
+
+# 겹친 구간 텍스트 중복 제거: 앞 청크 끝과 뒤 청크 앞에서 일치하는 단어 열을 찾는다
+MIN_OVERLAP_WORDS = 2
+MAX_OVERLAP_WORDS = 40
+# 잘린 지점 양쪽 끝 단어는 반쯤 잘려 잘못 인식될 수 있으므로 몇 단어까지는 건너뛰고 비교한다
+MAX_EDGE_SKIP_WORDS = 2
+
+_SILENCE_START = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+
+@dataclass
+class ChunkPlan:
+    index: int
+    start_seconds: float
+    end_seconds: float
+    overlap_seconds: float = 0.0  # 앞 청크와 겹치는 길이 (무음이 아닌 지점에서 강제로 자른 경우만 > 0)
+
+
+def max_chunk_seconds_for(bitrate_kbps: int, max_file_size: int, max_chunk_seconds: float = MAX_CHUNK_SECONDS) -> float:
+    """API 파일 크기 한도 안에 들어가는 가장 긴 청크 길이"""
+    by_size = max_file_size * SIZE_SAFETY_RATIO / (bitrate_kbps * 1000 / 8)
+    return min(max_chunk_seconds, by_size)
+
+
+def detect_silences(
+    input_path: str,
+    noise_db: int = SILENCE_NOISE_DB,
+    min_silence_seconds: float = SILENCE_MIN_SECONDS,
+    audio_output_args: Optional[List[str]] = None,
+) -> Tuple[float, List[Tuple[float, float]]]:
+    """
+    (전체 길이, [(무음 시작, 무음 끝), ...]).
+    ffmpeg silencedetect로 디코딩만 한 번 한다 (인코딩 없음, 모노 16kHz로 줄여서 분석).
+    audio_output_args(인코딩 옵션 + 출력 경로)를 주면 같은 패스에서 분석한 오디오를 파일로도 쓴다
+    (원격 입력을 두 번 읽지 않도록).
+    """
+    duration = get_video_duration_seconds(input_path)
+    cmd = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-nostats",
+        *ffmpeg_input_args(input_path),
+        "-vn", "-ac", "1", "-ar", "16000",
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence_seconds}",
+        *(audio_output_args or ["-f", "null", "-"]),
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+
+    silences: List[Tuple[float, float]] = []
+    start: Optional[float] = None
+    for line in result.stderr.splitlines():
+        match = _SILENCE_START.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = _SILENCE_END.search(line)
+        if match and start is not None:
+            silences.append((start, min(duration, float(match.group(1)))))
+            start = None
+    if start is not None:
+        # 파일 끝까지 이어지는 무음은 silence_end가 찍히지 않는다
+        silences.append((start, duration))
+    return duration, silences
+
+
+def plan_chunks(
+    duration: float,
+    silences: List[Tuple[float, float]],
+    max_chunk_seconds: float = MAX_CHUNK_SECONDS,
+    overlap_seconds: float = OVERLAP_SECONDS,
+    long_silence_seconds: float = LONG_SILENCE_SECONDS,
+) -> List[ChunkPlan]:
+    """
+    long_silence_seconds 이상인 무음으로 나눈 말소리 구간마다, 가능한 한 긴 청크가 되도록 최대 길이 직전의 무음 구간 가운데에서 자른다.
+    - 긴 무음은 앞 청크를 무음 시작에서 끝내고 다음 청크를 무음 끝에서 시작해 통째로 빼낸다
+    - 무음 구간에서 자르면 단어가 잘리지 않으므로 겹치지 않는다
+    - 찾지 못하면 최대 길이에서 자르고 다음 청크를 overlap_seconds만큼 앞에서 시작한다
+    - 통째로 무음인 청크는 만들지 않는다 (Whisper가 무음에서 없는 문장을 만들어내는 것도 막는다)
+    """
+    plans: List[ChunkPlan] = []
+    for region_start, region_end in _speech_regions(duration, silences, long_silence_seconds):
+        start = region_start
+        overlap = 0.0
+        while region_end - start > 0.1:
+            end = region_end
+            next_overlap = 0.0
+            if region_end - start > max_chunk_seconds:
+                window_start = start + max_chunk_seconds * MIN_CHUNK_RATIO
+                window_end = start + max_chunk_seconds
+                cuts = [
+                    (silence_start + silence_end) / 2
+                    for silence_start, silence_end in silences
+                    if window_start <= (silence_start + silence_end) / 2 <= window_end
+                ]
+                if cuts:
+                    end = max(cuts)
+                else:
+                    end = window_end
+                    next_overlap = overlap_seconds
+
+            start, end = round(start, 3), round(end, 3)
+            silent = _is_silent(start, end, silences)
+            if not silent:
+                plans.append(ChunkPlan(len(plans), start, end, overlap))
+            start = end - next_overlap
+            overlap = 0.0 if silent else next_overlap
+    return plans
+
+
+def _speech_regions(
+    duration: float,
+    silences: List[Tuple[float, float]],
+    long_silence_seconds: float,
+) -> List[Tuple[float, float]]:
+    """[0, duration]에서 long_silence_seconds 이상인 무음을 뺀 나머지 구간들"""
+    regions: List[Tuple[float, float]] = []
+    start = 0.0
+    for silence_start, silence_end in sorted(silences):
+        if silence_end - silence_start < long_silence_seconds or silence_end <= start:
+            continue
+        if silence_start > start:
+            regions.append((start, silence_start))
+        start = max(start, silence_end)
+    if duration > start:
+        regions.append((start, duration))
+    return regions
+
+
+def _is_silent(start: float, end: float, silences: List[Tuple[float, float]]) -> bool:
+    return any(silence_start <= start and end <= silence_end for silence_start, silence_end in silences)
+
+
+def merge_chunk_texts(texts: List[str], plans: List[ChunkPlan]) -> str:
+    """청크 순서대로 이어 붙이되, 겹쳐서 자른 청크는 앞 청크와 중복된 앞부분을 지운다."""
+    merged: List[str] = []
+    previous_index = None
+    for text, plan in zip(texts, plans):
+        text = (text or "").strip()
+        if not text:
+            continue
+        if plan.overlap_seconds > 0 and previous_index == plan.index - 1:
+            merged[-1], text = dedupe_overlap(merged[-1], text)
+        merged.append(text)
+        previous_index = plan.index
+    return "\n".join(t for t in merged if t).strip()
+
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.casefold())
+
+
+def dedupe_overlap(previous: str, current: str) -> Tuple[str, str]:
+    """
+    previous 끝과 current 앞에서 가장 긴 공통 단어 열을 찾아 current에서 지운다.
+    경계에 걸친 단어(양쪽 최대 MAX_EDGE_SKIP_WORDS개)는 뒤 청크 쪽 인식 결과를 쓴다.
+    """
+    prev_words, cur_words = previous.split(), current.split()
+    prev_norm = [_normalize_word(w) for w in prev_words]
+    cur_norm = [_normalize_word(w) for w in cur_words]
+
+    limit = min(MAX_OVERLAP_WORDS, len(prev_norm), len(cur_norm))
+    for size in range(limit, MIN_OVERLAP_WORDS - 1, -1):
+        for prev_skip in range(MAX_EDGE_SKIP_WORDS + 1):
+            prev_end = len(prev_norm) - prev_skip
+            if prev_end - size < 0:
+                break
+            tail = prev_norm[prev_end - size:prev_end]
+            if not all(tail):
+                continue
+            for cur_skip in range(MAX_EDGE_SKIP_WORDS + 1):
+                if cur_norm[cur_skip:cur_skip + size] == tail:
+                    return " ".join(prev_words[:prev_end]), " ".join(cur_words[cur_skip + size:])
+    return previous, current
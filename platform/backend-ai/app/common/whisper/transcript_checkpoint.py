@@ -0,0 +1,71 @@
+import hashlib
+import logging
+from typing import Optional
+
+from app.core.cache import get_cache_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "whisper_checkpoint:v1"
+CHECKPOINT_TTL_SECONDS = 3 * 24 * 3600
+HASH_READ_SIZE = 1024 * 1024
+
+
+def chunk_hash(path: str, model_name: str) -> str:
+    """청크 오디오 내용 + 모델 이름의 해시. 같은 입력이면 ffmpeg 출력도 같으므로 재시도 간에 그대로 맞는다."""
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TranscriptCheckpointStore:
+    """
+    영상별 청크 전사 결과를 Redis hash 하나(field = 청크 해시)에 보관한다.
+    - 전사에 성공한 청크만 저장하고, 작업이 재시도되면 저장된 청크는 Whisper를 다시 호출하지 않는다
+    - 전사 결과를 DB에 저장했거나 더 시도할 필요가 없으면 clear로 지운다
+    - Redis 장애 시에는 체크포인트 없이 동작하고 예외를 올리지 않는다
+    """
+
+    def __init__(self, redis_client=None, ttl_seconds: int = CHECKPOINT_TTL_SECONDS):
+        self._redis = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_cache_redis()
+        return self._redis
+
+    @staticmethod
+    def _key(video_id: int) -> str:
+        return f"{REDIS_KEY_PREFIX}:{video_id}"
+
+    def get(self, video_id: int, chunk_hash: str) -> Optional[str]:
+        """저장된 전사 텍스트. 없으면 None (빈 문자열은 '말소리 없는 청크'로 저장된 값)"""
+        try:
+            raw = self.redis.hget(self._key(video_id), chunk_hash)
+        except Exception as e:
+            logger.warning(f"[TranscriptCheckpoint] 조회 실패 video_id={video_id}: {e}")
+            return None
+        return raw.decode("utf-8") if raw is not None else None
+
+    def set(self, video_id: int, chunk_hash: str, text: str):
+        try:
+            key = self._key(video_id)
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hset(key, chunk_hash, text)
+            pipe.expire(key, self.ttl_seconds)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"[TranscriptCheckpoint] 저장 실패 video_id={video_id}: {e}")
+
+    def clear(self, video_id: int):
+        try:
+            self.redis.delete(self._key(video_id))
+        except Exception as e:
+            logger.warning(f"[TranscriptCheckpoint] 삭제 실패 video_id={video_id}: {e}")
+
+
+transcript_checkpoint_store = TranscriptCheckpointStore()
@@ -1,18 +1,51 @@
+import csv
 import tempfile
 import os
 import subprocess
-from concurrent.futures import ThreadPoolExecutor
-from typing import Optional, Callable
-import openai
-from pydub import AudioSegment
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Callable
 from langdetect import detect
-
+from openai import OpenAI
+
+from app.common.whisper.chunk_planner import (
+    ChunkPlan,
+    detect_silences,
+    max_chunk_seconds_for,
+    merge_chunk_texts,
+    plan_chunks,
+)
+from app.common.whisper.transcript_checkpoint import (
+    TranscriptCheckpointStore,
+    chunk_hash,
+    transcript_checkpoint_store,
+)
 from app.core.config import get_settings
 from app.core.exceptions import APIException
 from app.core.error_codes import ErrorCode
+from app.utils.media_source import ffmpeg_input_args, is_remote_source, source_extension
+from app.utils.rate_limit import AdaptiveConcurrencyLimiter, call_with_retry
+
+settings = get_settings()
 
 MAX_API_FILE_SIZE = 25 * 1024 * 1024  # 25MB
-CHUNK_DURATION_MS = 60 * 1000  # 1분
+
+# 음성 인식에 충분한 저용량 포맷 (모노 16kHz, 32kbps → 1분에 약 240KB)
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_BITRATE_KBPS = 32
+SUPPORTED_EXTENSIONS = [".mp4", ".mov", ".m4v", ".mp3", ".wav", ".flac"]
+
+SEGMENT_LIST_NAME = "segments.csv"
+SEGMENT_POLL_INTERVAL_SECONDS = 0.2
+
+# 재시도/백오프는 call_with_retry가 담당하므로 SDK 자체 재시도는 끈다
+openai_client = OpenAI(api_key=settings.openai.api_key, max_retries=0)
+
+# 프로세스 전체(Celery 스레드 포함)가 공유하는 동시성 한도와 청크 전사 pool.
+# pool 크기는 상한이고, 실제 동시 요청 수는 limiter가 429에 맞춰 줄이고 늘린다
+whisper_limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=settings.whisper.max_concurrency)
+_chunk_executor = ThreadPoolExecutor(max_workers=settings.whisper.max_concurrency, thread_name_prefix="whisper-chunk")
 
 
 def _notify(cb: Optional[Callable[[str, int], None]], step: str, percent: int):
@@ -21,117 +54,344 @@ def _notify(cb: Optional[Callable[[str, int], None]], step: str, percent: int):
     cb(step, percent)
 
 
-class WhisperService:
-    def __init__(self):
-        settings = get_settings()
-        openai.api_key = settings.openai.api_key
-        self.model_name = "whisper-1"
-
-    def transcribe_video(self, video_path: str, progress_callback: Optional[Callable[[str, int], None]] = None) -> dict:
-        audio_path = self.extract_audio(video_path, progress_callback)
+@dataclass
+class SegmentFile:
+    """segment muxer가 쓴 오디오 파일 하나"""
+    index: int
+    path: str
+    start_seconds: float
+    end_seconds: float
+
+
+@dataclass
+class AudioChunk:
+    """Whisper에 한 번에 보내는 오디오 (ChunkPlan 하나에 대응)"""
+    index: int
+    path: str
+    start_seconds: float
+    end_seconds: float
+
+
+@dataclass
+class ChunkTranscript:
+    index: int
+    text: str
+    succeeded: bool
+    from_checkpoint: bool = False
+
+
+def iter_audio_segments(
+    input_path: str,
+    output_dir: str,
+    segment_times: List[float],
+    copy_audio: bool = False,
+) -> Iterator[SegmentFile]:
+    """
+    ffmpeg 한 번으로 오디오를 추출하면서 segment muxer로 segment_times 지점마다 잘라 output_dir에 쓴다.
+    ffmpeg는 세그먼트 하나를 다 쓸 때마다 segment list(csv)에 한 줄을 추가하므로,
+    그 줄을 읽는 즉시 완성된 세그먼트를 넘겨 추출이 끝나기 전에 전사를 시작할 수 있다.
+    copy_audio=True면 input_path가 이미 전사용 포맷(모노 16kHz mp3)이므로 다시 인코딩하지 않고 자르기만 한다.
+    """
+    list_path = os.path.join(output_dir, SEGMENT_LIST_NAME)
+    if segment_times:
+        split_args = ["-segment_times", ",".join(f"{t:.3f}" for t in segment_times)]
+    else:
+        # 자를 지점이 없으면 세그먼트 하나로 쓴다 (segment_time 기본값은 2초)
+        split_args = ["-segment_time", str(24 * 3600)]
+    if copy_audio:
+        codec_args = ["-c:a", "copy"]
+    else:
+        codec_args = [
+            "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE),
+            "-acodec", "libmp3lame", "-b:a", f"{AUDIO_BITRATE_KBPS}k",
+        ]
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        *ffmpeg_input_args(input_path),
+        "-vn", *codec_args,
+        "-f", "segment",
+        *split_args,
+        "-reset_timestamps", "1",
+        "-segment_list", list_path,
+        "-segment_list_type", "csv",
+        "-y", os.path.join(output_dir, "chunk_%05d.mp3"),
+    ]
+
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=stderr)
         try:
-            return self.transcribe(audio_path, progress_callback)
+            read_offset = 0
+            index = 0
+            while True:
+                # 종료 여부를 먼저 확인해야 종료 직전에 추가된 줄까지 읽는다
+                finished = process.poll() is not None
+                lines, read_offset = _read_complete_lines(list_path, read_offset)
+                for row in csv.reader(lines):
+                    name, start, end = row[0], float(row[1]), float(row[2])
+                    yield SegmentFile(index, os.path.join(output_dir, name), start, end)
+                    index += 1
+                if finished:
+                    break
+                time.sleep(SEGMENT_POLL_INTERVAL_SECONDS)
+
+            if process.returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode("utf-8", errors="replace").strip()
+                print(f"[DEBUG] ffmpeg 실패: {message[-500:]}")
+                raise APIException(ErrorCode.FAILED_NOT_FOUND_VOICE, details=["ffmpeg 처리 실패"])
         finally:
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+
+def _read_complete_lines(path: str, offset: int) -> tuple[List[str], int]:
+    """offset 이후에 추가된, 줄바꿈까지 다 써진 줄만 읽는다."""
+    if not os.path.exists(path):
+        return [], offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n")
+    if end < 0:
+        return [], offset
+    return data[:end + 1].decode("utf-8").splitlines(), offset + end + 1
+
+
+class ChunkAssembler:
+    """
+    segment muxer가 쓴 세그먼트를 청크 계획대로 묶는다.
+    - 모든 청크의 시작/끝 지점에서 자르므로 청크는 연속된 세그먼트 몇 개로 이루어진다
+      (겹치는 구간은 별도 세그먼트가 되어 앞뒤 청크에 함께 들어간다)
+    - 청크에 필요한 세그먼트가 다 나오면 바로 만든다. 여러 개면 concat demuxer로 재인코딩 없이 잇는다
+    - 어느 청크에도 속하지 않는 세그먼트(건너뛴 무음 구간)와 다 쓴 세그먼트는 바로 지운다
+    - 마지막 청크는 파일 끝까지 포함한다. 단, duration을 주고 그보다 앞에서 끝나면(끝부분 긴 무음) 거기서 자른다
+    """
+
+    def __init__(self, plans: List[ChunkPlan], output_dir: str, duration: Optional[float] = None):
+        self.plans = plans
+        self.output_dir = output_dir
+
+        ends = plans if duration is not None and plans and plans[-1].end_seconds < duration else plans[:-1]
+        points = {plan.start_seconds for plan in plans} | {plan.end_seconds for plan in ends}
+        self.segment_times = sorted(point for point in points if point > 0)
+        segment_starts = {point: i for i, point in enumerate([0.0] + self.segment_times)}
+        last_segment = len(self.segment_times)
+
+        self.segment_ranges: List[range] = []
+        self.refcounts: Dict[int, int] = {}
+        for plan in plans:
+            first = segment_starts[plan.start_seconds]
+            last = segment_starts[plan.end_seconds] - 1 if plan.end_seconds in segment_starts else last_segment
+            self.segment_ranges.append(range(first, last + 1))
+            for i in range(first, last + 1):
+                self.refcounts[i] = self.refcounts.get(i, 0) + 1
+
+        self.segments: Dict[int, SegmentFile] = {}
+        self.next_plan = 0
+
+    def add(self, segment: SegmentFile) -> List[AudioChunk]:
+        self.segments[segment.index] = segment
+        if not self.refcounts.get(segment.index):
+            _remove_file(segment.path)
+
+        ready = []
+        while self.next_plan < len(self.plans) and self.segment_ranges[self.next_plan][-1] <= segment.index:
+            chunk = self._build(self.next_plan)
+            if chunk:
+                ready.append(chunk)
+            self.next_plan += 1
+        return ready
+
+    def flush(self) -> List[AudioChunk]:
+        """ffmpeg가 끝난 뒤 남은 청크를 만든다 (오디오가 영상 길이보다 짧아 세그먼트가 덜 나온 경우)"""
+        ready = []
+        while self.next_plan < len(self.plans):
+            chunk = self._build(self.next_plan)
+            if chunk:
+                ready.append(chunk)
+            self.next_plan += 1
+        return ready
+
+    def _build(self, plan_index: int) -> Optional[AudioChunk]:
+        plan = self.plans[plan_index]
+        indexes = [i for i in self.segment_ranges[plan_index] if i in self.segments]
+        if not indexes:
+            return None
+
+        if len(indexes) == 1 and self.refcounts[indexes[0]] == 1:
+            # 세그먼트 하나로 된 청크는 파일을 그대로 넘긴다 (전사 후 삭제)
+            path = self.segments[indexes[0]].path
+        else:
+            path = os.path.join(self.output_dir, f"merged_{plan.index:05d}.mp3")
+            _concat_segments([self.segments[i].path for i in indexes], path)
+            for i in indexes:
+                self.refcounts[i] -= 1
+                if self.refcounts[i] == 0:
+                    _remove_file(self.segments[i].path)
+
+        return AudioChunk(plan.index, path, plan.start_seconds, plan.end_seconds)
+
+
+def _concat_segments(paths: List[str], output_path: str):
+    list_path = f"{output_path}.txt"
+    with open(list_path, "w") as f:
+        f.writelines(f"file '{path}'\n" for path in paths)
+    try:
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-v", "error", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", "-y", output_path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True,
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"[DEBUG] ffmpeg concat 실패: {e.stderr.decode('utf-8', errors='replace')[-500:]}")
+        raise APIException(ErrorCode.FAILED_NOT_FOUND_VOICE, details=["ffmpeg 처리 실패"])
+    finally:
+        _remove_file(list_path)
+
+
+def _remove_file(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def transcript_coverage(plans: List[ChunkPlan], transcripts: Dict[int, ChunkTranscript]) -> float:
+    """계획한 오디오 길이 중 전사에 성공한 청크가 차지하는 비율 (0~1)"""
+    total = sum(plan.end_seconds - plan.start_seconds for plan in plans)
+    if total <= 0:
+        return 0.0
+    covered = sum(
+        plan.end_seconds - plan.start_seconds
+        for plan in plans
+        if plan.index in transcripts and transcripts[plan.index].succeeded
+    )
+    return covered / total
 
-    def extract_audio(self, video_path: str, progress_callback: Optional[Callable[[str, int], None]] = None) -> str:
-        _notify(progress_callback, "오디오 추출 중", 30)
 
-        ext = video_path.lower().split('.')[-1]
-        if f".{ext}" not in [".mp4", ".mov", ".m4v", ".mp3", ".wav", ".flac"]:
+class WhisperService:
+    def __init__(
+        self,
+        client: Optional[OpenAI] = None,
+        limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        max_retries: int = settings.whisper.max_retries,
+        min_coverage: float = settings.whisper.min_coverage,
+        checkpoints: Optional[TranscriptCheckpointStore] = None,
+    ):
+        self.model_name = "whisper-1"
+        self.client = client or openai_client
+        self.limiter = limiter or whisper_limiter
+        self.max_retries = max_retries
+        self.min_coverage = min_coverage
+        self.checkpoints = checkpoints or transcript_checkpoint_store
+
+    def transcribe_video(
+        self,
+        video_path: str,
+        progress_callback: Optional[Callable[[str, int], None]] = None,
+        video_id: Optional[int] = None,
+    ) -> dict:
+        """
+        무음 구간을 기준으로 청크를 계획한 뒤, 저용량 세그먼트로 추출하면서 완성된 청크부터 바로 전사한다.
+        전체 오디오를 메모리에 올리거나 다시 인코딩하지 않으므로 길이와 무관하게 메모리 사용량이 일정하다.
+        video_id를 넘기면 청크별 결과를 체크포인트로 남기고, 재시도 시 이미 전사한 청크는 다시 요청하지 않는다.
+
+        video_path는 로컬 경로 또는 presigned URL. URL이면 무음 분석 패스에서 저용량 오디오를 함께 로컬에 써 두고
+        세그먼트는 그 파일에서 잘라, 원본 영상은 한 번만 읽는다.
+        """
+        if source_extension(video_path) not in SUPPORTED_EXTENSIONS:
             raise APIException(ErrorCode.BAD_REQUEST_BODY)
 
-        try:
-            temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-            cmd = [
-                "ffmpeg", "-i", video_path,
-                "-vn", "-acodec", "libmp3lame",
-                "-y", temp_audio.name
-            ]
-            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-            return temp_audio.name
-        except Exception as e:
-            print(f"[DEBUG] ffmpeg 실패: {str(e)}")
-            raise APIException(
-                ErrorCode.FAILED_NOT_FOUND_VOICE,
-                details=["ffmpeg 처리 실패"]
-            )
+        with tempfile.TemporaryDirectory(prefix="whisper-") as segment_dir:
+            _notify(progress_callback, "무음 구간 분석 중", 25)
 
-    def transcribe(self, audio_path: str, progress_callback: Optional[Callable[[str, int], None]] = None) -> dict:
-        _notify(progress_callback, "오디오 분석 중", 40)
-
-        try:
-            file_size = os.path.getsize(audio_path)
-        except Exception as e:
-            print(f"[DEBUG] 오디오 파일 크기 조회 실패: {str(e)}")
-            raise APIException(ErrorCode.BAD_REQUEST_BODY)
-
-        if file_size <= MAX_API_FILE_SIZE:
-            _notify(progress_callback, "AI가 파일을 분석 중", 50)
+            segment_source = video_path
+            audio_output_args = None
+            if is_remote_source(video_path):
+                segment_source = os.path.join(segment_dir, "audio.mp3")
+                audio_output_args = ["-acodec", "libmp3lame", "-b:a", f"{AUDIO_BITRATE_KBPS}k", "-y", segment_source]
 
             try:
-                result = self._transcribe_single_file(audio_path)
+                duration, silences = detect_silences(video_path, audio_output_args=audio_output_args)
             except Exception as e:
-                print(f"[DEBUG] Whisper 전사 실패: {str(e)}")
-                raise APIException(ErrorCode.INTERNAL_ERROR)
-
-            text = result["text"].strip()
+                print(f"[DEBUG] 무음 구간 분석 실패: {str(e)}")
+                raise APIException(ErrorCode.FAILED_NOT_FOUND_VOICE, details=["ffmpeg 처리 실패"])
 
-            if not text or len(text.split()) < 2:
+            plans = plan_chunks(duration, silences, max_chunk_seconds_for(AUDIO_BITRATE_KBPS, MAX_API_FILE_SIZE))
+            if not plans:
                 raise APIException(ErrorCode.AUDIO_NO_SPEECH_DETECTED)
+            total_chunks = len(plans)
 
-            _notify(progress_callback, "언어 감지 중", 80)
+            _notify(progress_callback, "오디오 추출 중", 30)
 
-            try:
-                language = detect(text)
-                if not language or len(language) != 2:
-                    raise ValueError()
-            except Exception:
-                raise APIException(ErrorCode.AUDIO_NO_SPEECH_DETECTED)
+            futures: Dict[int, Future] = {}
 
-            _notify(progress_callback, "완료", 100)
+            def submit(chunks: List[AudioChunk]):
+                for chunk in chunks:
+                    futures[chunk.index] = _chunk_executor.submit(self._transcribe_chunk, chunk, video_id)
+                    progress = 30 + int(len(futures) / total_chunks * 20)
+                    _notify(progress_callback, f"청크 {chunk.index + 1}/{total_chunks} 추출 완료", progress)
+
+            assembler = ChunkAssembler(plans, segment_dir, duration)
+            try:
+                segments = iter_audio_segments(
+                    segment_source, segment_dir, assembler.segment_times,
+                    copy_audio=segment_source != video_path,
+                )
+                for segment in segments:
+                    submit(assembler.add(segment))
+                submit(assembler.flush())
+            finally:
+                # 추출이 실패해도 이미 넘긴 청크가 끝난 뒤에 임시 디렉터리를 지운다
+                transcripts: Dict[int, ChunkTranscript] = {}
+                for done, plan in enumerate([plan for plan in plans if plan.index in futures], start=1):
+                    transcripts[plan.index] = futures[plan.index].result()
+                    progress = 50 + int(done / total_chunks * 40)
+                    _notify(progress_callback, f"청크 {plan.index + 1}/{total_chunks} 전사 완료", progress)
+
+        coverage = transcript_coverage(plans, transcripts)
+        failed = [plan.index for plan in plans if not (plan.index in transcripts and transcripts[plan.index].succeeded)]
+        reused = sum(1 for transcript in transcripts.values() if transcript.from_checkpoint)
+        print(f"[DEBUG] Whisper 전사 커버리지 {coverage:.1%} (청크 {total_chunks}개, 체크포인트 재사용 {reused}, 실패 {failed})")
+        if coverage < self.min_coverage:
+            raise APIException(
+                ErrorCode.INTERNAL_ERROR,
+                details=[f"전사 커버리지 {coverage:.1%} < 기준 {self.min_coverage:.0%} (실패 청크 {failed})"],
+            )
 
-            return {
-                "text": text,
-                "language_code": language,
-                "model_version": self.model_name
-            }
+        texts = [transcripts[plan.index].text if plan.index in transcripts else "" for plan in plans]
+        full_text = merge_chunk_texts(texts, plans)
+        result = self._build_result(full_text, progress_callback)
+        result["coverage"] = coverage
+        return result
 
-        # 긴 오디오 → 청크 분할 전사
-        _notify(progress_callback, "청크 분할 중", 50)
+    def transcribe(self, audio_path: str, progress_callback: Optional[Callable[[str, int], None]] = None) -> dict:
+        """이미 추출된 오디오 파일도 같은 방식(세그먼트 단위)으로 전사한다."""
+        return self.transcribe_video(audio_path, progress_callback)
 
+    def _transcribe_chunk(self, chunk: AudioChunk, video_id: Optional[int] = None) -> ChunkTranscript:
+        """실패해도 예외를 올리지 않고 succeeded=False로 돌려준다 (커버리지로 전체 성공 여부를 판단)"""
         try:
-            audio = AudioSegment.from_file(audio_path)
+            if os.path.getsize(chunk.path) > MAX_API_FILE_SIZE:
+                print(f"[DEBUG] 청크 {chunk.index} 크기 초과: {os.path.getsize(chunk.path)} bytes")
+                return ChunkTranscript(chunk.index, "", False)
+
+            checkpoint_hash = chunk_hash(chunk.path, self.model_name) if video_id is not None else None
+            if checkpoint_hash:
+                cached = self.checkpoints.get(video_id, checkpoint_hash)
+                if cached is not None:
+                    return ChunkTranscript(chunk.index, cached, True, from_checkpoint=True)
+
+            text = self._transcribe_single_file(chunk.path)["text"].strip()
+            if checkpoint_hash:
+                self.checkpoints.set(video_id, checkpoint_hash, text)
+            return ChunkTranscript(chunk.index, text, True)
         except Exception as e:
-            print(f"[DEBUG] 청크 분할 실패: {str(e)}")
-            raise APIException(ErrorCode.BAD_REQUEST_BODY)
-
-        chunks = [audio[i:i + CHUNK_DURATION_MS] for i in range(0, len(audio), CHUNK_DURATION_MS)]
-        total_chunks = len(chunks)
-
-        def process_chunk(idx_chunk):
-            idx, chunk = idx_chunk
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as f:
-                chunk.export(f.name, format="mp3", bitrate="64k")
-                if os.path.getsize(f.name) > MAX_API_FILE_SIZE:
-                    return ""
-                try:
-                    return self._transcribe_single_file(f.name)["text"].strip()
-                except Exception:
-                    return ""
-                finally:
-                    os.remove(f.name)
-
-        texts = []
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            for idx, text in enumerate(executor.map(process_chunk, enumerate(chunks))):
-                texts.append(text)
-                progress = 50 + int((idx + 1) / total_chunks * 70)
-                _notify(progress_callback, f"청크 {idx + 1}/{total_chunks} 전사 중", progress)
-
-        full_text = "\n".join([t for t in texts if t]).strip()
+            print(f"[DEBUG] 청크 {chunk.index} 전사 실패 ({chunk.start_seconds:.0f}s~{chunk.end_seconds:.0f}s): {str(e)}")
+            return ChunkTranscript(chunk.index, "", False)
+        finally:
+            # 전사가 끝난 청크는 바로 지워 디스크 사용량도 일정하게 유지한다
+            _remove_file(chunk.path)
 
+    def _build_result(self, full_text: str, progress_callback: Optional[Callable[[str, int], None]]) -> dict:
         if not full_text or len(full_text.split()) < 2:
             raise APIException(ErrorCode.AUDIO_NO_SPEECH_DETECTED)
 
@@ -153,13 +413,11 @@ class WhisperService:
         }
 
     def _transcribe_single_file(self, path: str) -> dict:
-        try:
+        """limiter 슬롯 안에서 요청하고 429/5xx/네트워크 오류는 지수 백오프로 max_retries번까지 재시도한다."""
+        def request():
+            # 재시도마다 파일을 처음부터 다시 읽어야 하므로 매번 연다
             with open(path, "rb") as f:
-                response = openai.audio.transcriptions.create(
-                    model=self.model_name,
-                    file=f
-                )
-            return {"text": response.text}
-        except Exception as e:
-            print(f"[DEBUG] OpenAI Whisper API 실패: {str(e)}")
-            raise APIException(ErrorCode.INTERNAL_ERROR)
+                return self.client.audio.transcriptions.create(model=self.model_name, file=f)
+
+        response = call_with_retry(request, limiter=self.limiter, max_retries=self.max_retries)
+        return {"text": response.text}
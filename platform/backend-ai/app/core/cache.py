@@ -0,0 +1,31 @@
+from functools import lru_cache
+
+import redis
+
+from app.core.config import get_settings
+
+
+@lru_cache()
+def get_cache_redis() -> redis.Redis:
+    """캐시 전용 Redis 클라이언트 (진행 상태 알림용 db=2와 분리)"""
+    settings = get_settings()
+    return redis.Redis(
+        host=settings.redis.host,
+        port=settings.redis.port,
+        db=settings.redis.cache_db,
+        socket_timeout=settings.redis.socket_timeout_seconds,
+        socket_connect_timeout=settings.redis.socket_timeout_seconds,
+    )
+
+
+@lru_cache()
+def get_mirror_redis() -> redis.Redis:
+    """강의 요청 벡터 복제 전용 Redis 클라이언트 (캐시 db와 분리해 캐시 정리에 휩쓸리지 않게 한다)"""
+    settings = get_settings()
+    return redis.Redis(
+        host=settings.redis.host,
+        port=settings.redis.port,
+        db=settings.redis.mirror_db,
+        socket_timeout=settings.redis.socket_timeout_seconds,
+        socket_connect_timeout=settings.redis.socket_timeout_seconds,
+    )
@@ -39,6 +39,27 @@ class PineconeModel(BaseModel):
     environment: str
     index_name: str 
     index_name_course_request: str  
+    index_name_course: Optional[str] = None  # 설정 시 강의 단위 대표 벡터 인덱스를 유지하고 강의 추천에 사용
+
+class VectorStoreModel(BaseModel):
+    backend: str = "pinecone"  # pinecone | local
+    local_path: str = "data/vector_store"  # backend=local일 때 인덱스별 하위 디렉터리에 저장 (base_dir 기준 상대 경로)
+
+class LexicalIndexModel(BaseModel):
+    enabled: bool = False  # 영상 청크 BM25 인덱스를 벡터 검색과 함께 사용 (API 서버와 워커가 같은 경로를 공유해야 함)
+    path: str = "data/lexical_index/video_chunks.sqlite3"  # base_dir 기준 상대 경로
+
+class WhisperModel(BaseModel):
+    max_concurrency: int = 8  # 프로세스 전체(Celery 스레드 포함)의 Whisper 동시 요청 상한
+    max_retries: int = 4  # 청크별 재시도 횟수 (429/5xx/네트워크 오류, 지수 백오프)
+    min_coverage: float = 0.95  # 전사에 성공한 오디오 길이 비율이 이보다 낮으면 작업을 실패로 처리
+
+class RedisModel(BaseModel):
+    host: str = "redis"
+    port: int = 6379
+    cache_db: int = 3
+    mirror_db: int = 4  # 강의 요청 벡터 복제 전용 (TTL 없는 키만 두므로 maxmemory-policy가 allkeys-*이면 안 된다)
+    socket_timeout_seconds: float = 0.5
 
 class MixpanelModel(BaseModel):
     token: Optional[str] = None
@@ -57,6 +78,10 @@ class Settings(BaseSettings):
     pinecone: PineconeModel
     serpapi: SerpapiModel 
     mixpanel: MixpanelModel = MixpanelModel()
+    redis: RedisModel = RedisModel()
+    vector_store: VectorStoreModel = VectorStoreModel()
+    lexical_index: LexicalIndexModel = LexicalIndexModel()
+    whisper: WhisperModel = WhisperModel()
 
     ENVIRONMENT: str  # local | dev | staging | production
     PROJECT_NAME: str = "Insty AI Service"
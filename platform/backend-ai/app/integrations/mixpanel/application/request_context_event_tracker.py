@@ -88,6 +88,28 @@ class MixpanelRequestEventTracker:
             )
             raise
 
+    async def publish_event_outcome_with_request_context(
+        self,
+        event_name: str,
+        distinct_user_id: str,
+        base_event_fields: Dict[str, Any],
+        error_name: Optional[str] = None,
+    ) -> None:
+        """
+        이미 끝난 작업의 성공/실패 결과를 이벤트로 전송한다 (스트리밍 응답처럼 결과가 나중에 정해지는 경우).
+        - error_name이 없으면 is_success=True
+        - 있으면 is_success=False + error 필드로 추가
+        """
+        event_fields = dict(base_event_fields)
+        if error_name is not None:
+            event_fields["error"] = error_name
+        await self.publisher.publish_event_with_outcome(
+            event_name=event_name,
+            distinct_id=distinct_user_id,
+            fields=build_default_event_fields_from_request(self.request, event_fields),
+            is_success=error_name is None,
+        )
+
     @asynccontextmanager
     async def track_event_outcome_within_async_block_using_request_context(
         self,
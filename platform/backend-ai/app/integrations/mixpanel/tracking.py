@@ -21,4 +21,21 @@ async def execute_business_and_track_outcome(
         distinct_user_id=str(user_id),
         base_event_fields=base_event_fields,
         business_operation_coroutine=business_operation,
-    )
\ No newline at end of file
+    )
+
+
+# 스트리밍 응답처럼 비즈니스 루틴이 응답을 보내는 동안 끝나는 경우, 끝난 뒤 결과를 직접 트래킹
+async def track_outcome(
+    request: Request,
+    user_id: int,
+    event_name: str,
+    base_event_fields: Dict[str, Any],
+    error_name: Optional[str] = None,
+) -> None:
+    tracker = get_mixpanel_request_event_tracker(request)
+    await tracker.publish_event_outcome_with_request_context(
+        event_name=event_name,
+        distinct_user_id=str(user_id),
+        base_event_fields=base_event_fields,
+        error_name=error_name,
+    )
@@ -1,7 +1,16 @@
 from uuid import UUID
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
 from app.models.course import Course
+from app.models.file import File
 from app.models.video import VideoCourse
+from app.utils.s3_to_cloudfront_url import convert_s3_to_cloudfront_url
+from app.utils.ttl_cache import TTLCache
+
+THUMBNAIL_CACHE_TTL_SECONDS = 300
+
+# course_id -> (thumbnail_url,)  (썸네일이 없는 강의도 None으로 캐시하기 위해 tuple로 감싼다)
+_thumbnail_url_cache = TTLCache(maxsize=4096, ttl_seconds=THUMBNAIL_CACHE_TTL_SECONDS)
 
 class CourseRepository:
     def __init__(self, db: Session):
@@ -44,3 +53,68 @@ class CourseRepository:
             return "not_found", None
 
         return "default", video_course.video_uuid
+
+    def get_thumbnail_urls(self, course_ids: list[int], use_cache: bool = True) -> dict[int, str | None]:
+        """
+        여러 강의의 썸네일 URL을 한 번에 조회한다 (삭제된 강의는 결과에서 빠짐).
+        - custom: 강의에 thumbnail_id가 있으면 COURSE_THUMBNAIL 파일
+        - default: 없으면 강의에 연결된 영상의 기본 썸네일
+        강의+파일 조인 1회, 기본 썸네일이 필요한 강의가 있으면 영상 조회 1회.
+        """
+        result: dict[int, str | None] = {}
+        missing: list[int] = []
+
+        for course_id in dict.fromkeys(course_ids):
+            cached = _thumbnail_url_cache.get(course_id) if use_cache else None
+            if cached is not None:
+                result[course_id] = cached[0]
+            else:
+                missing.append(course_id)
+
+        if not missing:
+            return result
+
+        rows = (
+            self.db.query(Course.id, Course.thumbnail_id, File.container_id, File.name)
+            .outerjoin(
+                File,
+                and_(File.container_id == Course.id, File.container_type == "COURSE_THUMBNAIL"),
+            )
+            .filter(Course.id.in_(missing), Course.is_deleted == False)
+            .all()
+        )
+
+        fetched: dict[int, str | None] = {}
+        default_course_ids: list[int] = []
+        for course_id, thumbnail_id, container_id, file_name in rows:
+            if course_id in fetched:
+                continue
+            if thumbnail_id is None:
+                default_course_ids.append(course_id)
+                fetched[course_id] = None
+            elif file_name:
+                fetched[course_id] = convert_s3_to_cloudfront_url(
+                    f"/file/COURSE_THUMBNAIL/{container_id}/{file_name}"
+                )
+            else:
+                fetched[course_id] = None
+
+        if default_course_ids:
+            videos = (
+                self.db.query(VideoCourse.course_id, VideoCourse.video_uuid)
+                .filter(VideoCourse.course_id.in_(default_course_ids), VideoCourse.is_deleted == False)
+                .order_by(VideoCourse.id)
+                .all()
+            )
+            for course_id, video_uuid in videos:
+                if fetched.get(course_id) is None and video_uuid:
+                    fetched[course_id] = convert_s3_to_cloudfront_url(
+                        f"/file/VIDEO_BASIC_THUMBNAIL/{video_uuid}/basic_thumbnail.jpg"
+                    )
+
+        for course_id, url in fetched.items():
+            if use_cache:
+                _thumbnail_url_cache.set(course_id, (url,))
+            result[course_id] = url
+
+        return result
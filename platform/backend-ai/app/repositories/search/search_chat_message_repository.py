@@ -1,3 +1,6 @@
+from typing import Optional
+
+from sqlalchemy import and_, func
 from sqlalchemy.orm import Session
 from app.models.search import SearchCourseMessage
 from app.models.search import SearchCourseResultLog
@@ -50,53 +53,72 @@ class SearchCourseMessageRepository:
             self.db.refresh(message)
             
 
-    def get_message_history_with_courses(self, user_id: int) -> list[dict]:
-        messages = (
-            self.db.query(SearchCourseMessage)
+    def get_message_history_with_courses(
+        self,
+        user_id: int,
+        before_message_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        """
+        메시지와 추천 강의 id(rank 순)를 한 번의 쿼리로 가져온다.
+        추천 결과 로그는 직전 사용자 메시지 id로 저장되므로, 같은 사용자의 메시지 중 바로 앞 메시지 id(lag)와 조인한다.
+        before_message_id보다 작은 id 중 최신 limit개를 오래된 순으로 반환한다 (keyset 페이지네이션).
+        """
+        previous_message_id = (
+            func.lag(SearchCourseMessage.id)
+            .over(partition_by=SearchCourseMessage.user_id, order_by=SearchCourseMessage.id)
+            .label("previous_message_id")
+        )
+        page_query = (
+            self.db.query(
+                SearchCourseMessage.id.label("id"),
+                SearchCourseMessage.sender_type.label("sender_type"),
+                SearchCourseMessage.message_text.label("message_text"),
+                SearchCourseMessage.has_recommendation.label("has_recommendation"),
+                SearchCourseMessage.created_at.label("created_at"),
+                previous_message_id,
+            )
             .filter(SearchCourseMessage.user_id == user_id)
-            .order_by(SearchCourseMessage.created_at.asc())
+        )
+        if before_message_id is not None:
+            page_query = page_query.filter(SearchCourseMessage.id < before_message_id)
+        page_query = page_query.order_by(SearchCourseMessage.id.desc())
+        if limit is not None:
+            page_query = page_query.limit(limit)
+        page = page_query.subquery()
+
+        rows = (
+            self.db.query(page, SearchCourseResultLog.course_id)
+            .outerjoin(
+                SearchCourseResultLog,
+                and_(
+                    page.c.sender_type == "assistant",
+                    page.c.has_recommendation.is_(True),
+                    SearchCourseResultLog.message_id == page.c.previous_message_id,
+                    SearchCourseResultLog.user_id == user_id,
+                ),
+            )
+            .order_by(page.c.id.asc(), SearchCourseResultLog.rank.asc())
             .all()
         )
 
         result = []
+        for row in rows:
+            if result and result[-1]["message_id"] == row.id:
+                if row.course_id is not None:
+                    result[-1]["course_ids"].append(row.course_id)
+                continue
 
-        for message in messages:
-            base_data = {
-                "message_id": message.id,
-                "sender": message.sender_type,
-                "created_at": message.created_at,
+            item = {
+                "message_id": row.id,
+                "sender": row.sender_type,
+                "created_at": row.created_at,
+                "content": row.message_text,
             }
-
-            if message.sender_type == "user":
-                result.append({
-                    **base_data,
-                    "content": message.message_text,
-                })
-
-            elif message.sender_type == "assistant":
-                # 성공한 추천인 경우 → course_ids 포함
-                if message.has_recommendation:
-                    target_user_message_id = message.id - 1
-                    result_logs = (
-                        self.db.query(SearchCourseResultLog)
-                        .filter(SearchCourseResultLog.message_id == target_user_message_id)
-                        .order_by(SearchCourseResultLog.rank.asc())
-                        .all()
-                    )
-                    course_ids = [log.course_id for log in result_logs]
-
-                    result.append({
-                        **base_data,
-                        "content": message.message_text,
-                        "course_ids": course_ids
-                    })
-                else:
-                    # 실패한 추천도 챗봇 메시지로 포함
-                    result.append({
-                        **base_data,
-                        "content": message.message_text
-                        # course_ids 없음
-                    })
+            # 성공한 추천인 경우 → course_ids 포함 (실패한 추천은 course_ids 없이 챗봇 메시지로 포함)
+            if row.sender_type == "assistant" and row.has_recommendation:
+                item["course_ids"] = [row.course_id] if row.course_id is not None else []
+            result.append(item)
 
         return result
     
@@ -37,6 +37,7 @@ MessageHistoryItem = Union[UserMessageItem, AssistantMessageItem]
 
 class RecommendationHistoryResponse(BaseModel):
     messages: List[MessageHistoryItem]
+    next_before_message_id: Optional[int] = None  # 이전 페이지 조회 시 before_message_id로 전달 (없으면 마지막 페이지)
 
 
 class ExternalAIService(BaseModel):
@@ -23,6 +23,7 @@ from app.repositories.course.creator_recommendation_form_repository import Creat
 from app.repositories.video.video_course_repository import VideoCourseRepository
 
 from app.common.vector_store.course_request.vector_search_service import CourseRequestVectorSearchService, FIELD_WEIGHTS
+from app.common.embedding.embedding_service import EmbeddingService
 from app.utils.prompt_loader import load_prompt
 
 settings = get_settings()
@@ -37,6 +38,7 @@ class CourseRequestRecommendationService:
         self.course_request_repo = CourseRequestRepository(db)
         self.creator_recommendation_repo = CreatorRecommendationRepository(db)  
         self.creator_recommendation_form_repo = CreatorRecommendationFormRepository(db)  
+        self.embedding_service = EmbeddingService()
 
     def recommend_with_base(self, creator_id: int) -> CourseRequestRecommendationResponse:
         video_ids = self.video_course_repo.get_uploaded_video_ids(creator_id)
@@ -332,18 +334,17 @@ class CourseRequestRecommendationService:
             return "추천 이유 생성에 실패했습니다."
 
     def _embed_fields_to_vectors(self, field_key_to_text: Dict[str, str]) -> Dict[str, List[float]]:
-        embedded = {}
-        for field_key, text in field_key_to_text.items():
-            if text.strip(): 
-                try:
-                    response = client.embeddings.create(
-                        model="text-embedding-3-large",
-                        input=text
-                    )
-                    embedded[field_key] = response.data[0].embedding
-                except Exception as e:
-                    raise APIException(ErrorCode.VECTOR_UPSERT_FAILED, details=[f"{field_key} 임베딩 실패: {str(e)}"])
-        return embedded
+        field_keys = [key for key, text in field_key_to_text.items() if text.strip()]
+        if not field_keys:
+            return {}
+
+        try:
+            # 필드별 개별 호출 대신 한 번에 배치 임베딩 (동일 답변은 캐시 적중)
+            vectors = self.embedding_service.embed_texts([field_key_to_text[key] for key in field_keys])
+        except Exception as e:
+            raise APIException(ErrorCode.VECTOR_UPSERT_FAILED, details=[f"{', '.join(field_keys)} 임베딩 실패: {str(e)}"])
+
+        return dict(zip(field_keys, vectors))
 
     def _compute_weighted_scores(self, request_matches: Dict[int, Dict[str, float]]) -> Dict[int, float]:
         total_weight_all = sum(FIELD_WEIGHTS.values())
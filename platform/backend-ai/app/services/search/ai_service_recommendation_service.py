@@ -1,9 +1,8 @@
-from collections import defaultdict
 from typing import List, Dict
 from sqlalchemy.orm import Session
 from openai import OpenAI
-from pinecone import Pinecone
-import requests
+import hashlib
+import logging
 import json
 
 from app.core.config import get_settings
@@ -11,20 +10,23 @@ from app.core.exceptions import APIException
 from app.core.error_codes import ErrorCode
 from app.repositories.video.video_course_repository import VideoCourseRepository
 from app.repositories.course.course_repository import CourseRepository
-from app.repositories.file.file_repository import FileRepository
 from app.utils.prompt_loader import load_prompt
 from app.utils.clean_gpt_text import enforce_html_breaks
-from app.utils.s3_to_cloudfront_url import convert_s3_to_cloudfront_url
-from app.utils.query_expander import expand_queries
+from app.utils.query_expander import expand_queries_many
+from app.common.embedding.embedding_service import EmbeddingService
+from app.common.vector_store.multi_query_retriever import MultiQueryRetriever
+from app.common.vector_store.vector_store import get_vector_store
+from app.common.web_search.external_search_cache import search_llm_cache
+from app.common.web_search.web_search_client import search_google
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 openai_client = OpenAI(api_key=settings.openai.api_key)
-pinecone = Pinecone(api_key=settings.pinecone.api_key)
-index = pinecone.Index(settings.pinecone.index_name)
 
 SIMILARITY_THRESHOLD = 0.3
 RRF_K = 60
 MAX_EXPANSIONS = 5
+SERVICE_FIELDS = ("title", "url", "description")
 
 
 class AIServiceRecommendationService:
@@ -32,7 +34,12 @@ class AIServiceRecommendationService:
         self.db = db
         self.video_repo = VideoCourseRepository(db)
         self.course_repo = CourseRepository(self.db)
-        self.file_repo = FileRepository(db)
+        self.embedding_service = EmbeddingService()
+        self.retriever = MultiQueryRetriever(
+            get_vector_store(settings.pinecone.index_name),
+            rrf_k=RRF_K,
+            similarity_threshold=SIMILARITY_THRESHOLD,
+        )
 
     def recommend_ai_services_with_courses(
         self,
@@ -55,15 +62,14 @@ class AIServiceRecommendationService:
                     "services": []
                 }
             
-            # 2. 각 서비스별로 관련 강의 검색
+            # 2. 각 서비스별로 관련 강의 검색 (서비스 간 검색은 동시에, DB 조회는 한 번에)
+            related_courses_per_service = self._search_related_courses_many(
+                services=external_services,
+                top_k=top_k_courses_per_service
+            )
+
             services_with_courses = []
-            for service in external_services:
-                related_courses = self._search_related_courses(
-                    service_name=service["title"],
-                    service_description=service["description"],
-                    top_k=top_k_courses_per_service
-                )
-                
+            for service, related_courses in zip(external_services, related_courses_per_service):
                 services_with_courses.append({
                     "title": service["title"],
                     "url": service["url"],
@@ -87,29 +93,37 @@ class AIServiceRecommendationService:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
     def _translate_to_english(self, text: str) -> str:
-        """한국어를 영어로 번역"""
+        """한국어를 영어로 번역 (같은 질의의 번역은 캐시에서 재사용)"""
         try:
-            response = openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a translator. Translate the given text to English. Only return the translated text, nothing else."
-                    },
-                    {
-                        "role": "user",
-                        "content": text
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=200
+            translated = search_llm_cache.get_or_fetch(
+                "translate",
+                text,
+                lambda: self._request_translation(text),
+                locale="en",
             )
-            translated = response.choices[0].message.content.strip()
-            return translated
+            return translated or text
         except Exception as e:
             # 번역 실패 시 원본 반환
             return text
 
+    def _request_translation(self, text: str) -> str:
+        response = openai_client.chat.completions.create(
+            model="gpt-4o",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a translator. Translate the given text to English. Only return the translated text, nothing else."
+                },
+                {
+                    "role": "user",
+                    "content": text
+                }
+            ],
+            temperature=0.3,
+            max_tokens=200
+        )
+        return response.choices[0].message.content.strip()
+
     def _search_external_ai_services(self, query: str, limit: int = 5) -> List[Dict]:
         """웹 검색으로 AI 서비스 찾기"""
         # 1. 영어로 번역
@@ -118,20 +132,13 @@ class AIServiceRecommendationService:
         # 2. 검색 쿼리 개선 (공식 사이트/도구 강조)
         search_query = f"{english_query} official website tool service"
         
-        params = {
-            "q": search_query,
-            "num": max(1, min(limit * 3, 15)),  # 더 많이 가져와서 필터링
-            "engine": "google",
-            "gl": "us",  # 북미 지역 검색
-            "hl": "en",  # 영어 결과
-            "api_key": settings.serpapi.api_key,
-        }
-        
         try:
-            resp = requests.get("https://serpapi.com/search", params=params, timeout=15)
-            resp.raise_for_status()
-            data = resp.json() or {}
-            organic = data.get("organic_results", []) or []
+            organic = search_google(
+                search_query,
+                num=max(1, min(limit * 3, 15)),  # 더 많이 가져와서 필터링
+                gl="us",  # 북미 지역 검색
+                hl="en",  # 영어 결과
+            )
             
             # 1차 필터링: 블로그 도메인 제외
             blog_domains = [
@@ -145,9 +152,9 @@ class AIServiceRecommendationService:
             
             filtered_results = []
             for item in organic:
-                url = item.get("link", "").lower()
-                title = item.get("title", "").lower()
-                snippet = item.get("snippet", "").lower()
+                url = (item.get("link") or "").lower()
+                title = (item.get("title") or "").lower()
+                snippet = (item.get("snippet") or "").lower()
                 
                 # 블로그 도메인 제외
                 if any(domain in url for domain in blog_domains):
@@ -178,12 +185,27 @@ class AIServiceRecommendationService:
             return []
 
     def _filter_ai_services_with_gpt(self, results: List[Dict], limit: int) -> List[Dict]:
-        """GPT를 사용해서 실제 AI 서비스인지 필터링"""
+        """GPT를 사용해서 실제 AI 서비스인지 필터링 (같은 검색 결과의 필터링은 캐시에서 재사용)"""
         try:
-            # 검색 결과를 JSON 형식으로 정리
-            results_json = json.dumps(results, ensure_ascii=False, indent=2)
+            results_digest = hashlib.sha256(
+                json.dumps(results, ensure_ascii=False, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+            filtered = search_llm_cache.get_or_fetch(
+                "gpt-filter",
+                results_digest,
+                lambda: self._request_gpt_filter(results),
+            )
+            return filtered[:limit]
             
-            prompt = f"""You are a filter that identifies real AI service/tool official websites from web search results.
+        except Exception as e:
+            # GPT 필터링 실패 시 원본 결과 반환 (상위 limit개만)
+            return results[:limit]
+
+    def _request_gpt_filter(self, results: List[Dict]) -> List[Dict]:
+        # 검색 결과를 JSON 형식으로 정리
+        results_json = json.dumps(results, ensure_ascii=False, indent=2)
+
+        prompt = f"""You are a filter that identifies real AI service/tool official websites from web search results.
 
 Exclude:
 - Blog posts, tutorials, guides, reviews, news articles
@@ -210,88 +232,81 @@ Return a JSON array with only the official AI service websites. Format:
 
 Return ONLY the JSON array, no code blocks, no explanations."""
 
-            response = openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=2000
-            )
-            
-            raw = response.choices[0].message.content.strip()
-            # JSON 블럭 제거
-            if raw.startswith("```"):
-                raw = raw.split("```")[1]
-                if raw.startswith("json"):
-                    raw = raw[4:]
-            raw = raw.strip()
-            
-            filtered = json.loads(raw)
-            return filtered[:limit]
-            
-        except Exception as e:
-            # GPT 필터링 실패 시 원본 결과 반환 (상위 limit개만)
-            return results[:limit]
+        response = openai_client.chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=2000
+        )
+        
+        raw = response.choices[0].message.content.strip()
+        # JSON 블럭 제거
+        if raw.startswith("```"):
+            raw = raw.split("```")[1]
+            if raw.startswith("json"):
+                raw = raw[4:]
+        raw = raw.strip()
 
-    def _search_related_courses(
+        # 캐시에 24시간 남으므로 형식이 맞지 않는 응답은 저장하지 않고 실패로 처리한다
+        return _validate_services(json.loads(raw))
+
+    def _search_related_courses_many(
         self,
-        service_name: str,
-        service_description: str,
+        services: List[Dict],
         top_k: int = 3
-    ) -> List[dict]:
-        """서비스별로 관련 강의 검색 (Pinecone)"""
+    ) -> List[List[dict]]:
+        """
+        서비스별로 관련 강의 검색 (Pinecone). services와 같은 순서로 반환한다.
+        - 질의 확장: 모든 서비스의 질의를 LLM 한 번으로 확장
+        - 임베딩: 모든 질의를 한 번에 배치 임베딩
+        - 검색: 모든 서비스의 질의를 공유 pool에서 동시에 실행하고 서비스별로 RRF 결합
+        - DB: 세션을 스레드 간에 공유하지 않도록 모든 서비스의 영상/강의/썸네일을 한 번에 조회
+        """
+        if not services:
+            return []
+
         # 검색 쿼리 생성
-        search_query = f"{service_name} {service_description}"
-        
-        # 질의 확장
-        expanded = expand_queries(search_query, n=MAX_EXPANSIONS)
-        all_queries = [search_query] + [
-            q for q in expanded 
-            if q.strip().lower() != search_query.strip().lower()
-        ]
-        
+        search_queries = [f"{service['title']} {service['description']}" for service in services]
+
+        # 질의 확장 (실패하면 원본 질의만으로 검색)
+        try:
+            expanded_per_service = expand_queries_many(search_queries, n=MAX_EXPANSIONS)
+        except Exception as e:
+            logger.warning(f"[AIServiceRecommendationService] 질의 확장 실패, 원본 질의만 사용: {e}")
+            expanded_per_service = [[] for _ in search_queries]
+
+        query_groups = []
+        for search_query, expanded in zip(search_queries, expanded_per_service):
+            query_groups.append([search_query] + [
+                q for q in expanded
+                if q.strip().lower() != search_query.strip().lower()
+            ])
+
         # 배치 임베딩
-        query_vectors = self._embed_queries(all_queries)
-        
-        # RRF 점수 결합
-        rrf_scores = defaultdict(float)
-        video_texts = {}
-        
-        per_query_k = max(1, 20 // len(all_queries))
-        
-        for q_vec in query_vectors:
-            resp = index.query(
-                vector=q_vec,
-                top_k=per_query_k,
-                include_metadata=True
-            )
-            
-            for rank, match in enumerate(resp.get("matches", []), start=1):
-                metadata = match.get("metadata") or {}
-                score = match.get("score", 0.0)
-                
-                vid_raw = metadata.get("video_id")
-                try:
-                    vid = int(vid_raw)
-                except (ValueError, TypeError):
-                    continue
-                
-                chunk_text = metadata.get("text")
-                if not chunk_text or score < SIMILARITY_THRESHOLD:
-                    continue
-                
-                rrf_scores[vid] += 1.0 / (RRF_K + rank)
-                if vid not in video_texts:
-                    video_texts[vid] = chunk_text
-        
-        if not rrf_scores:
-            return []
-        
-        # 상위 강의 선택
-        sorted_video_scores = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
-        top_video_ids = [int(vid) for vid, _ in sorted_video_scores[:top_k]]
-        
+        all_queries = [q for queries in query_groups for q in queries]
+        all_vectors = self._embed_queries(all_queries)
+        vector_groups = []
+        offset = 0
+        for queries in query_groups:
+            vector_groups.append(all_vectors[offset:offset + len(queries)])
+            offset += len(queries)
+
+        # 동시 검색 + 서비스별 RRF 점수 결합
+        per_query_ks = [max(1, 20 // len(queries)) for queries in query_groups]
+        retrievals = self.retriever.search_many(vector_groups, per_query_ks)
+
+        # 서비스별 상위 영상 선택
+        top_video_ids_per_service = []
+        for retrieval in retrievals:
+            sorted_video_scores = sorted(retrieval.video_scores.items(), key=lambda x: x[1], reverse=True)
+            top_video_ids_per_service.append([int(vid) for vid, _ in sorted_video_scores[:top_k]])
+
+        all_video_ids = list({vid for top_video_ids in top_video_ids_per_service for vid in top_video_ids})
+        if not all_video_ids:
+            return [[] for _ in services]
+
         # 강의 정보 조회
-        video_objs = self.video_repo.get_by_video_ids(top_video_ids)
+        video_objs = self.video_repo.get_by_video_ids(all_video_ids)
         
         # video.id -> course.id 매핑
         video_id_to_course_id: dict[int, int] = {}
@@ -302,16 +317,10 @@ Return ONLY the JSON array, no code blocks, no explanations."""
             if course_id is None:
                 continue
             video_id_to_course_id[video.id] = int(course_id)
-        
-        # course_id 있는 video만 필터
-        filtered_top_video_ids = [
-            vid for vid in top_video_ids
-            if vid in video_id_to_course_id
-        ]
-        
-        if not filtered_top_video_ids:
-            return []
-        
+
+        if not video_id_to_course_id:
+            return [[] for _ in services]
+
         # 강의 정보 일괄 조회
         course_ids = list(set(video_id_to_course_id.values()))
         course_objs = self.course_repo.get_by_ids(course_ids)
@@ -319,52 +328,32 @@ Return ONLY the JSON array, no code blocks, no explanations."""
             course.id: course.title
             for course in course_objs
         }
+
+        # 썸네일 URL 일괄 조회
+        thumbnail_urls = self.course_repo.get_thumbnail_urls(course_ids)
+
+        courses_per_service = []
+        for top_video_ids in top_video_ids_per_service:
+            courses = []
+            for vid in top_video_ids:
+                # course_id 있는 video만
+                course_id = video_id_to_course_id.get(vid)
+                if course_id is None:
+                    continue
+
+                courses.append({
+                    "course_id": str(course_id),
+                    "course_title": course_id_to_title.get(course_id, "제목 없음"),
+                    "thumbnail_url": thumbnail_urls.get(course_id)
+                })
+            courses_per_service.append(courses)
         
-        video_dict = {
-            video.id: video
-            for video in video_objs
-            if video.id in video_id_to_course_id
-        }
-        
-        courses = []
-        for vid in filtered_top_video_ids:
-            video = video_dict.get(vid)
-            if not video:
-                continue
-            
-            course_id = video_id_to_course_id[vid]
-            
-            # 썸네일 URL 조회
-            status, video_uuid = self.course_repo.get_thumbnail_status(course_id)
-            thumbnail_url = None
-            
-            if status == "custom":
-                file = self.file_repo.get_course_thumbnail_by_course_id(course_id)
-                if file and file.name:
-                    thumbnail_url = convert_s3_to_cloudfront_url(
-                        f"/file/COURSE_THUMBNAIL/{file.container_id}/{file.name}"
-                    )
-            elif status == "default" and video_uuid:
-                thumbnail_url = convert_s3_to_cloudfront_url(
-                    f"/file/VIDEO_BASIC_THUMBNAIL/{video_uuid}/basic_thumbnail.jpg"
-                )
-            
-            courses.append({
-                "course_id": str(course_id),
-                "course_title": course_id_to_title.get(course_id, "제목 없음"),
-                "thumbnail_url": thumbnail_url
-            })
-        
-        return courses
+        return courses_per_service
 
     def _embed_queries(self, queries: List[str]) -> List[List[float]]:
         """배치 임베딩"""
         try:
-            resp = openai_client.embeddings.create(
-                input=queries,
-                model="text-embedding-3-large"
-            )
-            return [item.embedding for item in resp.data]
+            return self.embedding_service.embed_texts(queries)
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
@@ -389,3 +378,15 @@ Return ONLY the JSON array, no code blocks, no explanations."""
             return enforce_html_breaks(raw)
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
+
+
+def _validate_services(parsed) -> List[Dict]:
+    """GPT 필터 응답이 [{"title", "url", "description"}, ...] 형식인지 확인하고 그 필드만 남긴다."""
+    if not isinstance(parsed, list):
+        raise ValueError(f"GPT 필터 응답이 배열이 아닙니다: {type(parsed).__name__}")
+    services = []
+    for item in parsed:
+        if not isinstance(item, dict) or not all(isinstance(item.get(key), str) for key in SERVICE_FIELDS):
+            raise ValueError(f"GPT 필터 응답 항목 형식이 올바르지 않습니다: {str(item)[:200]}")
+        services.append({key: item[key] for key in SERVICE_FIELDS})
+    return services
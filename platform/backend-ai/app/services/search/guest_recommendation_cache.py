@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from app.core.cache import get_cache_redis
+from app.common.embedding.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "guest_rec:v1"
+GENERATION_KEY = f"{REDIS_KEY_PREFIX}:generation"  # 강의/영상 삭제 시 증가 → 이전 세대 응답은 모두 무효
+
+FRESH_SECONDS = 10 * 60       # 이 시간 동안은 그대로 응답
+STALE_SECONDS = 60 * 60       # 이후 이 시간까지는 stale 응답을 주고 백그라운드에서 갱신
+REFRESH_LOCK_SECONDS = 60     # 같은 질의의 갱신이 동시에 여러 번 돌지 않도록
+
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="guest-rec-refresh")
+
+
+class GuestRecommendationCache:
+    """
+    게스트 강의 추천 응답 캐시 (Redis, stale-while-revalidate).
+    값에는 저장 시점의 generation을 함께 넣고, 조회 시 현재 generation과 다르면 miss로 처리한다.
+    삭제된 강의가 stale 응답으로라도 노출되지 않게 하기 위함이다.
+    """
+
+    def __init__(self, redis_client=None):
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_cache_redis()
+        return self._redis
+
+    @staticmethod
+    def make_key(query: str, top_k: int, search_k: int) -> str:
+        normalized = normalize_text(query).casefold()
+        digest = hashlib.sha256(f"{top_k}\n{search_k}\n{normalized}".encode("utf-8")).hexdigest()
+        return f"{REDIS_KEY_PREFIX}:{digest}"
+
+    def get(self, key: str) -> Tuple[Optional[dict], bool, Optional[int]]:
+        """
+        (응답, stale 여부, 현재 generation). 없거나 무효면 응답은 None.
+        generation은 새로 계산한 응답을 set할 때 그대로 넘긴다 (계산 도중 삭제가 일어나면 저장 값이 무효가 되도록).
+        Redis를 읽을 수 없으면 generation도 None이고, 이때는 저장하지 않는다.
+        """
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(GENERATION_KEY)
+            pipe.get(key)
+            raw_generation, raw_entry = pipe.execute()
+        except Exception as e:
+            logger.warning(f"[GuestRecommendationCache] 조회 실패: {e}")
+            return None, False, None
+
+        generation = int(raw_generation or 0)
+        if not raw_entry:
+            return None, False, generation
+
+        entry = json.loads(raw_entry)
+        if entry.get("generation") != generation:
+            return None, False, generation
+
+        stale = time.time() - entry.get("created_at", 0) > FRESH_SECONDS
+        return entry["response"], stale, generation
+
+    def set(self, key: str, response: dict, generation: Optional[int]):
+        if generation is None:
+            return
+        try:
+            entry = {"generation": generation, "created_at": time.time(), "response": response}
+            self.redis.set(key, json.dumps(entry, ensure_ascii=False), ex=FRESH_SECONDS + STALE_SECONDS)
+        except Exception as e:
+            logger.warning(f"[GuestRecommendationCache] 저장 실패: {e}")
+
+    def refresh_in_background(self, key: str, generation: int, compute: Callable[[], dict]):
+        """같은 키의 갱신이 이미 진행 중이면 건너뛴다."""
+        try:
+            acquired = self.redis.set(f"{key}:refresh", 1, nx=True, ex=REFRESH_LOCK_SECONDS)
+        except Exception as e:
+            logger.warning(f"[GuestRecommendationCache] 갱신 잠금 실패: {e}")
+            return
+        if not acquired:
+            return
+
+        def _refresh():
+            try:
+                response = compute()
+                if response.get("courses"):
+                    self.set(key, response, generation)
+            except Exception as e:
+                logger.warning(f"[GuestRecommendationCache] 백그라운드 갱신 실패: {e}")
+            finally:
+                try:
+                    self.redis.delete(f"{key}:refresh")
+                except Exception:
+                    pass
+
+        _refresh_executor.submit(_refresh)
+
+    def invalidate(self):
+        """강의/영상이 삭제되면 호출. 이전 응답들은 TTL로 자연 소멸한다."""
+        try:
+            self.redis.incr(GENERATION_KEY)
+        except Exception as e:
+            logger.warning(f"[GuestRecommendationCache] 무효화 실패: {e}")
+
+
+guest_recommendation_cache = GuestRecommendationCache()
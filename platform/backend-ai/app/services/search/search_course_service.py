@@ -1,15 +1,15 @@
-from collections import defaultdict
-from typing import Dict, List, Tuple
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 from openai import OpenAI
-from pinecone import Pinecone
 
 from app.repositories.search.search_chat_message_repository import SearchCourseMessageRepository
 from app.repositories.search.search_course_result_log_repository import SearchCourseResultLogRepository
 from app.repositories.video.video_course_repository import VideoCourseRepository
 from app.repositories.course.course_repository import CourseRepository
-from app.repositories.file.file_repository import FileRepository
 
 from app.schemas.search import (
     RecommendedCourse,
@@ -19,25 +19,50 @@ from app.schemas.search import (
 )
 
 from app.core.config import get_settings
+from app.core.db import get_db_session
 from app.core.exceptions import APIException
 from app.core.error_codes import ErrorCode
 
 from app.utils.prompt_loader import load_prompt
 from app.utils.clean_gpt_text import enforce_html_breaks
-from app.utils.s3_to_cloudfront_url import convert_s3_to_cloudfront_url
 from app.utils.query_expander import expand_queries
+from app.common.embedding.embedding_service import EmbeddingService
+from app.common.vector_store.multi_query_retriever import MultiQueryRetriever
+from app.common.vector_store.vector_store import get_vector_store
+from app.common.vector_store.video.lexical_index import LexicalSearchResult, get_lexical_index
+from app.common.vector_store.video.course_vector_index import CourseVectorIndex, get_course_vector_index
+from app.services.search.guest_recommendation_cache import guest_recommendation_cache
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 openai_client = OpenAI(api_key=settings.openai.api_key)
-pinecone = Pinecone(api_key=settings.pinecone.api_key)
-index = pinecone.Index(settings.pinecone.index_name)
 
 SIMILARITY_THRESHOLD = 0.3
 
 # RRF 결합 상수
 RRF_K = 60
 MAX_EXPANSIONS = 5  # query_expander가 생성할 최대 확장 수
+EXPANSION_LATENCY_BUDGET_SECONDS = 1.5  # 이 시간 안에 확장이 끝나지 않으면 원본 질의 결과만 사용
+COURSE_CANDIDATE_FACTOR = 3  # 강의 단위 검색 시 top_k의 몇 배까지 후보로 받을지
+LEXICAL_RRF_WEIGHT = 1.0  # BM25 결과를 벡터 질의 하나와 같은 비중으로 합친다
+HISTORY_PAGE_SIZE = 50  # 추천 이력 한 페이지의 메시지 수
+MAX_HISTORY_PAGE_SIZE = 200
+
+
+@dataclass
+class CourseSelection:
+    courses: List[Dict] = field(default_factory=list)          # 응답용 강의 카드 (rank 순)
+    course_ids: List[int] = field(default_factory=list)        # rank 순 course_id (결과 로그 저장용)
+    video_texts: Dict[int, str] = field(default_factory=dict)  # 대표 video_id -> 청크 텍스트 (메시지 생성용)
+    not_found_message: Optional[str] = None                    # 추천할 강의가 없을 때의 안내 메시지
+
+
+@dataclass
+class RecommendStreamOutcome:
+    """스트리밍 추천의 결과. 라우트가 스트림이 끝난 뒤 Mixpanel 성공/실패 이벤트를 보낼 때 쓴다."""
+    finished: bool = False       # done 또는 error 이벤트까지 보냈는지 (중간에 연결이 끊기면 False)
+    error: Optional[str] = None  # 실패한 경우 예외 타입명
 
 
 class SearchCourseService:
@@ -47,21 +72,44 @@ class SearchCourseService:
         self.result_repo = SearchCourseResultLogRepository(db)
         self.video_repo = VideoCourseRepository(db)
         self.course_repo = CourseRepository(self.db)
-        self.file_repo = FileRepository(db)
+        self.embedding_service = EmbeddingService()
+        self.retriever = MultiQueryRetriever(
+            get_vector_store(settings.pinecone.index_name),
+            rrf_k=RRF_K,
+            similarity_threshold=SIMILARITY_THRESHOLD,
+        )
 
     def recommend_for_guest(self, query: str, top_k: int = 3, search_k: int = 20) -> dict:
         try:
-            recommendation_message, courses, _ = self._build_recommendation_result(
-                query=query,
-                top_k=top_k,
-                search_k=search_k
-            )
-            return {"message": recommendation_message, "courses": courses}
+            cache_key = guest_recommendation_cache.make_key(query, top_k, search_k)
+            cached, stale, generation = guest_recommendation_cache.get(cache_key)
+            if cached is not None:
+                if stale:
+                    guest_recommendation_cache.refresh_in_background(
+                        cache_key,
+                        generation,
+                        lambda: _recommend_for_guest_with_new_session(query, top_k, search_k),
+                    )
+                return cached
+
+            result = self._recommend_for_guest_uncached(query, top_k, search_k)
+            # 결과 없음 응답은 새 강의가 올라오면 바로 바뀌어야 하므로 캐시하지 않는다
+            if result["courses"]:
+                guest_recommendation_cache.set(cache_key, result, generation)
+            return result
         except APIException:
             raise
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
+    def _recommend_for_guest_uncached(self, query: str, top_k: int, search_k: int) -> dict:
+        recommendation_message, courses, _ = self._build_recommendation_result(
+            query=query,
+            top_k=top_k,
+            search_k=search_k
+        )
+        return {"message": recommendation_message, "courses": courses}
+
     def recommend(self, user_id: int, query: str, top_k: int = 3, search_k: int = 20) -> dict:
         try:
             user_message = self.chat_repo.create(
@@ -100,58 +148,157 @@ class SearchCourseService:
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
-    def _build_recommendation_result(
+    def recommend_stream(
         self,
+        user_id: Optional[int],
         query: str,
         top_k: int = 3,
-        search_k: int = 20
-    ) -> Tuple[str, List[Dict], List[int]]:
-        # 확장 질의 생성
-        expanded = expand_queries(query, n=MAX_EXPANSIONS)
-        all_queries = [query] + [q for q in expanded if q.strip().lower() != query.strip().lower()]
-
-        # 배치 임베딩
-        query_vectors = self._embed_queries(all_queries)
-
-        # per-query top_k 예산 분배
-        per_query_k = max(1, search_k // len(all_queries))
+        search_k: int = 20,
+        outcome: Optional[RecommendStreamOutcome] = None,
+    ) -> Iterator[str]:
+        """
+        추천 결과를 SSE 이벤트로 나눠 보낸다. 검색이 끝나는 즉시 강의 카드를 보내고, 메시지는 생성되는 대로 흘려보낸다.
+        - courses: {"courses": [...]} 로그인 사용자는 이 이벤트 전에 사용자 메시지와 결과 로그를 저장한다
+        - message: {"delta": "..."} (줄바꿈은 <br>로 변환된 조각)
+        - done:    {"message": "..."} 최종 메시지. 로그인 사용자는 이 시점에 챗봇 메시지를 저장한다
+        - error:   {"code", "message"}
+        user_id가 None이면 게스트로 보고 저장 대신 게스트 추천 캐시를 사용한다.
+        outcome을 넘기면 스트림이 끝났는지와 실패 사유를 기록한다.
+        """
+        try:
+            cache_key = generation = None
+            if user_id is None:
+                cache_key = guest_recommendation_cache.make_key(query, top_k, search_k)
+                cached, stale, generation = guest_recommendation_cache.get(cache_key)
+                if cached is not None:
+                    if stale:
+                        guest_recommendation_cache.refresh_in_background(
+                            cache_key,
+                            generation,
+                            lambda: _recommend_for_guest_with_new_session(query, top_k, search_k),
+                        )
+                    yield _sse("courses", {"courses": cached["courses"]})
+                    yield _sse("message", {"delta": cached["message"]})
+                    yield _sse("done", {"message": cached["message"]})
+                    if outcome is not None:
+                        outcome.finished = True
+                    return
+
+            selection = self._select_courses(query, top_k=top_k, search_k=search_k)
+
+            user_message_id = None
+            if user_id is not None:
+                # 클라이언트가 카드를 받고 연결을 끊으면 제너레이터가 yield 지점에서 닫히므로, 보내기 전에 저장한다
+                user_message_id = self._save_user_message(user_id, query, selection.course_ids)
+            yield _sse("courses", {"courses": selection.courses})
+
+            if selection.not_found_message is not None:
+                recommendation_message = selection.not_found_message
+                yield _sse("message", {"delta": recommendation_message})
+            else:
+                pieces: List[str] = []
+                for piece in self._stream_recommendation_message(query, selection.video_texts):
+                    pieces.append(piece)
+                    yield _sse("message", {"delta": enforce_html_breaks(piece)})
+                recommendation_message = enforce_html_breaks("".join(pieces).strip())
+
+            if user_id is not None:
+                self._save_assistant_message(user_id, user_message_id, recommendation_message)
+            elif selection.courses:
+                guest_recommendation_cache.set(
+                    cache_key,
+                    {"message": recommendation_message, "courses": selection.courses},
+                    generation,
+                )
 
-        # RRF 점수 결합 구조
-        rrf_scores = defaultdict(float)  # video_id -> fused score
-        video_texts: Dict[int, str] = {}  # video_id -> 대표 텍스트
+            yield _sse("done", {"message": recommendation_message})
+            if outcome is not None:
+                outcome.finished = True
 
-        for q_vec in query_vectors:
-            resp = index.query(
-                vector=q_vec,
-                top_k=per_query_k,
-                include_metadata=True
+        except Exception as e:
+            # 응답 헤더가 이미 나갔으므로 전역 예외 처리기와 같은 code/message를 error 이벤트로 보낸다
+            error = e.error if isinstance(e, APIException) else ErrorCode.INTERNAL_ERROR
+            logger.error(f"[SearchCourseService] 스트리밍 추천 실패: {e}", exc_info=True)
+            if outcome is not None:
+                outcome.finished = True
+                outcome.error = type(e).__name__
+            yield _sse("error", {"code": error.code, "message": error.message})
+
+    def _save_user_message(self, user_id: int, query: str, course_ids: List[int]) -> int:
+        """recommend()와 같은 순서로 사용자 메시지(has_recommendation=False) → 결과 로그를 저장하고 메시지 id를 반환한다."""
+        user_message = self.chat_repo.create(
+            user_id=user_id,
+            sender_type="user",
+            message_text=query,
+            has_recommendation=False
+        )
+
+        for rank, course_id in enumerate(course_ids, start=1):
+            self.result_repo.create(
+                message_id=user_message.id,
+                user_id=user_id,
+                course_id=course_id,
+                rank=rank
             )
+        return user_message.id
+
+    def _save_assistant_message(self, user_id: int, user_message_id: int, recommendation_message: str):
+        """메시지 생성이 끝난 뒤 사용자 메시지를 추천 완료로 표시하고 챗봇 메시지를 저장한다."""
+        self.chat_repo.update_has_recommendation(user_message_id, True)
+        self.chat_repo.create(
+            user_id=user_id,
+            sender_type="assistant",
+            message_text=recommendation_message,
+            has_recommendation=True
+        )
 
-            for rank, match in enumerate(resp.get("matches", []), start=1):
-                metadata = match.get("metadata") or {}
-                score = match.get("score", 0.0)
-
-                vid_raw = metadata.get("video_id")
-                try:
-                    vid = int(vid_raw)
-                except (ValueError, TypeError):
-                    continue
-
-                chunk_text = metadata.get("text")
-                if not chunk_text or score < SIMILARITY_THRESHOLD:
-                    continue
+    def _build_recommendation_result(
+        self,
+        query: str,
+        top_k: int = 3,
+        search_k: int = 20
+    ) -> Tuple[str, List[Dict], List[int]]:
+        selection = self._select_courses(query, top_k=top_k, search_k=search_k)
+        if selection.not_found_message is not None:
+            return selection.not_found_message, [], []
+
+        recommendation_message = self._generate_recommendation_message(query, selection.video_texts)
+        return recommendation_message, selection.courses, selection.course_ids
+
+    def _select_courses(self, query: str, top_k: int, search_k: int) -> CourseSelection:
+        """추천할 강의 카드와 추천 메시지 생성에 쓸 대표 텍스트까지 (LLM 메시지 생성 전 단계)"""
+        course_vector_index = get_course_vector_index()
+        if course_vector_index is not None:
+            return self._select_courses_by_course_index(course_vector_index, query, top_k, search_k)
+
+        lexical = self._search_lexical(query, search_k=search_k, top_k=top_k)
+
+        if lexical is not None and lexical.strong:
+            # 도구 이름 같은 희귀 키워드가 그대로 들어 있는 영상이 충분하면 질의 확장(LLM 호출)을 건너뛴다
+            retrieval = self.retriever.search(self._embed_queries([query]), top_k=search_k)
+        else:
+            # 원본 질의 검색과 질의 확장을 동시에 시작하고, 확장 질의 결과를 RRF로 합친다
+            retrieval = self.retriever.search_speculative(
+                query,
+                expand_fn=self._expand_query,
+                embed_fn=self._embed_queries,
+                search_k=search_k,
+                latency_budget_seconds=EXPANSION_LATENCY_BUDGET_SECONDS,
+            )
 
-                rrf_scores[vid] += 1.0 / (RRF_K + rank)
+        if lexical is not None:
+            # BM25 결과도 하나의 질의 결과로 보고 같은 RRF 점수에 합친다
+            self.retriever.fuse(retrieval, lexical.matches, weight=LEXICAL_RRF_WEIGHT, apply_threshold=False)
 
-                if vid not in video_texts:
-                    video_texts[vid] = chunk_text
+        rrf_scores = retrieval.video_scores  # video_id -> fused score
+        video_texts = retrieval.video_texts  # video_id -> 대표 텍스트
 
         if not rrf_scores:
             not_found_message = (
                 "관련된 영상을 찾을 수 없습니다.<br>"
                 "[강의 요청을 하시겠습니까? 여기를 클릭해주세요.](https://docs.google.com/forms/d/e/1FAIpQLSdfy0jpk-zmcQoNgzI_H76TcPZjCVU9CkBDMCEl1Mb9uqzIdQ/viewform)"
             )
-            return not_found_message, [], []
+            return CourseSelection(not_found_message=not_found_message)
 
         sorted_video_scores = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
 
@@ -176,7 +323,7 @@ class SearchCourseService:
                 "관련된 강의를 찾을 수 없습니다.<br>"
                 "강의 등록 상태를 확인한 뒤 다시 시도해주세요."
             )
-            return not_found_message, [], []
+            return CourseSelection(not_found_message=not_found_message)
 
         # course 단위로 순서 유지 dedupe (top_k 보장)
         course_ids_in_rank_order: List[int] = []
@@ -202,7 +349,7 @@ class SearchCourseService:
                 "관련된 강의를 찾을 수 없습니다.<br>"
                 "강의 등록 상태를 확인한 뒤 다시 시도해주세요."
             )
-            return not_found_message, [], []
+            return CourseSelection(not_found_message=not_found_message)
 
         # 추천 메시지 생성에 사용할 텍스트: video_id 기준으로 대표 video 텍스트 모으기
         filtered_video_texts: Dict[int, str] = {}
@@ -210,55 +357,126 @@ class SearchCourseService:
             if representative_vid in video_texts:
                 filtered_video_texts[representative_vid] = video_texts[representative_vid]
 
-        recommendation_message = self._generate_recommendation_message(query, filtered_video_texts)
-
         # course 정보 조회 및 썸네일 조립
         course_objs = self.course_repo.get_by_ids(course_ids_in_rank_order)
         course_id_to_title = {course.id: course.title for course in course_objs}
 
+        thumbnail_urls = self.course_repo.get_thumbnail_urls(course_ids_in_rank_order)
+
         courses: List[Dict] = []
         for course_id in course_ids_in_rank_order:
-            status, video_uuid = self.course_repo.get_thumbnail_status(course_id)
-
-            if status == "custom":
-                file = self.file_repo.get_course_thumbnail_by_course_id(course_id)
-                if not file or not file.name:
-                    raise Exception(f"Missing thumbnail file for course_id={course_id}")
-                thumbnail_url = convert_s3_to_cloudfront_url(
-                    f"/file/COURSE_THUMBNAIL/{file.container_id}/{file.name}"
-                )
-            elif status == "default" and video_uuid:
-                thumbnail_url = convert_s3_to_cloudfront_url(
-                    f"/file/VIDEO_BASIC_THUMBNAIL/{video_uuid}/basic_thumbnail.jpg"
-                )
-            else:
-                thumbnail_url = None
+            courses.append({
+                "course_id": str(course_id),
+                "course_title": course_id_to_title.get(course_id, "제목 없음"),
+                "thumbnail_url": thumbnail_urls.get(course_id)
+            })
+
+        return CourseSelection(
+            courses=courses,
+            course_ids=course_ids_in_rank_order,
+            video_texts=filtered_video_texts,
+        )
+
+    def _select_courses_by_course_index(
+        self,
+        course_vector_index: CourseVectorIndex,
+        query: str,
+        top_k: int,
+        search_k: int
+    ) -> CourseSelection:
+        """
+        강의 대표 벡터 인덱스에서 강의를 바로 고르고, 청크 검색은 대표 스니펫을 위해 한 번만 한다.
+        대표 스니펫(유사도 threshold 이상 청크)이 없는 강의는 청크 검색과 같은 기준으로 제외한다.
+        """
+        query_vector = self._embed_query(query)
+
+        # 삭제된 강의나 스니펫이 없는 강의를 걸러도 top_k를 채우도록 여유 있게 받는다
+        candidates = course_vector_index.query_courses(query_vector, top_k=top_k * COURSE_CANDIDATE_FACTOR)
+        video_id_to_course_id = {
+            video_id: course_id
+            for course_id, _, video_ids in candidates
+            for video_id in video_ids
+        }
+
+        course_id_to_text: Dict[int, Tuple[int, str]] = {}  # course_id -> (대표 video_id, 청크 텍스트)
+        if video_id_to_course_id:
+            response = self.retriever.index.query(
+                vector=query_vector,
+                top_k=search_k,
+                filter={"video_id": {"$in": [str(video_id) for video_id in video_id_to_course_id]}},
+                include_metadata=True,
+            )
+            for match in response.get("matches", []):
+                metadata = match.get("metadata") or {}
+                try:
+                    video_id = int(metadata.get("video_id"))
+                except (ValueError, TypeError):
+                    continue
+                course_id = video_id_to_course_id.get(video_id)
+                if course_id is None or course_id in course_id_to_text:
+                    continue
+                if metadata.get("text") and match.get("score", 0.0) >= SIMILARITY_THRESHOLD:
+                    course_id_to_text[course_id] = (video_id, metadata["text"])
 
+        course_objs = self.course_repo.get_by_ids(list(course_id_to_text))
+        course_id_to_title = {course.id: course.title for course in course_objs}
+
+        course_ids_in_rank_order = [
+            course_id for course_id, _, _ in candidates
+            if course_id in course_id_to_text and course_id in course_id_to_title
+        ][:top_k]
+
+        if not course_ids_in_rank_order:
+            not_found_message = (
+                "관련된 영상을 찾을 수 없습니다.<br>"
+                "[강의 요청을 하시겠습니까? 여기를 클릭해주세요.](https://docs.google.com/forms/d/e/1FAIpQLSdfy0jpk-zmcQoNgzI_H76TcPZjCVU9CkBDMCEl1Mb9uqzIdQ/viewform)"
+            )
+            return CourseSelection(not_found_message=not_found_message)
+
+        filtered_video_texts: Dict[int, str] = dict(
+            course_id_to_text[course_id] for course_id in course_ids_in_rank_order
+        )
+        thumbnail_urls = self.course_repo.get_thumbnail_urls(course_ids_in_rank_order)
+
+        courses: List[Dict] = []
+        for course_id in course_ids_in_rank_order:
             courses.append({
                 "course_id": str(course_id),
                 "course_title": course_id_to_title.get(course_id, "제목 없음"),
-                "thumbnail_url": thumbnail_url
+                "thumbnail_url": thumbnail_urls.get(course_id)
             })
 
-        return recommendation_message, courses, course_ids_in_rank_order
+        return CourseSelection(
+            courses=courses,
+            course_ids=course_ids_in_rank_order,
+            video_texts=filtered_video_texts,
+        )
+
+    @staticmethod
+    def _search_lexical(query: str, search_k: int, top_k: int) -> Optional[LexicalSearchResult]:
+        lexical_index = get_lexical_index()
+        if lexical_index is None:
+            return None
+        try:
+            return lexical_index.search(query, top_k=search_k, min_videos_for_strong=top_k)
+        except Exception as e:
+            logger.warning(f"[SearchCourseService] BM25 검색 실패, 벡터 검색만 사용: {e}")
+            return None
+
+    @staticmethod
+    def _expand_query(query: str) -> List[str]:
+        expanded = expand_queries(query, n=MAX_EXPANSIONS)
+        return [q for q in expanded if q.strip().lower() != query.strip().lower()]
 
     def _embed_queries(self, queries: List[str]) -> List[List[float]]:
         try:
-            resp = openai_client.embeddings.create(
-                input=queries,
-                model="text-embedding-3-large"
-            )
-            return [item.embedding for item in resp.data]
+            return self.embedding_service.embed_texts(queries)
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
     def _embed_query(self, query: str) -> List[float]:
         try:
-            response = openai_client.embeddings.create(
-                input=[query],
-                model="text-embedding-3-large"
-            )
-            return response.data[0].embedding
+            return self.embedding_service.embed_text(query)
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
@@ -279,9 +497,40 @@ class SearchCourseService:
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
-    def get_recommend_courses(self, user_id: int) -> RecommendationHistoryResponse:
+    def _stream_recommendation_message(self, query: str, video_texts: Dict[int, str]) -> Iterator[str]:
         try:
-            raw_messages = self.chat_repo.get_message_history_with_courses(user_id)
+            prompt = load_prompt("recommendation_prompt.j2", {
+                "query": query,
+                "video_texts": video_texts
+            })
+
+            response = openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=[{"role": "user", "content": prompt}],
+                stream=True
+            )
+
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta and delta.content:
+                    yield delta.content
+        except Exception as e:
+            raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
+
+    def get_recommend_courses(
+        self,
+        user_id: int,
+        before_message_id: Optional[int] = None,
+        limit: Optional[int] = HISTORY_PAGE_SIZE,
+    ) -> RecommendationHistoryResponse:
+        try:
+            raw_messages = self.chat_repo.get_message_history_with_courses(
+                user_id,
+                before_message_id=before_message_id,
+                limit=limit,
+            )
 
             all_course_ids = {
                 course_id
@@ -296,28 +545,13 @@ class SearchCourseService:
             course_objs = self.course_repo.get_by_ids(list(all_course_ids))
             course_id_to_title = {course.id: course.title for course in course_objs}
 
+            thumbnail_urls = self.course_repo.get_thumbnail_urls(list(video_dict.keys()))
+
             thumbnail_map = {}
             for course_id, video in video_dict.items():
-                status, video_uuid = self.course_repo.get_thumbnail_status(course_id)
-
-                if status == "custom":
-                    file = self.file_repo.get_course_thumbnail_by_course_id(course_id)
-                    if file and file.name:
-                        url = convert_s3_to_cloudfront_url(
-                            f"/file/COURSE_THUMBNAIL/{file.container_id}/{file.name}"
-                        )
-                    else:
-                        url = None
-                elif status == "default" and video_uuid:
-                    url = convert_s3_to_cloudfront_url(
-                        f"/file/VIDEO_BASIC_THUMBNAIL/{video_uuid}/basic_thumbnail.jpg"
-                    )
-                else:
-                    url = None
-
                 thumbnail_map[str(course_id)] = {
                     "course_title": course_id_to_title.get(course_id, "제목 없음"),
-                    "thumbnail_url": url
+                    "thumbnail_url": thumbnail_urls.get(course_id)
                 }
 
             messages = []
@@ -352,7 +586,44 @@ class SearchCourseService:
                         created_at=msg["created_at"]
                     ))
 
-            return RecommendationHistoryResponse(messages=messages)
+            next_before_message_id = None
+            if limit is not None and len(raw_messages) == limit:
+                next_before_message_id = raw_messages[0]["message_id"]
+
+            return RecommendationHistoryResponse(
+                messages=messages,
+                next_before_message_id=next_before_message_id,
+            )
 
         except Exception as e:
             raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def recommend_stream_with_new_session(
+    user_id: Optional[int],
+    query: str,
+    top_k: int = 3,
+    search_k: int = 20,
+    outcome: Optional[RecommendStreamOutcome] = None,
+) -> Iterator[str]:
+    """StreamingResponse용 (응답을 흘려보내는 동안 쓸 DB 세션을 직접 열고 닫는다)"""
+    db = get_db_session()
+    try:
+        yield from SearchCourseService(db).recommend_stream(
+            user_id, query, top_k=top_k, search_k=search_k, outcome=outcome
+        )
+    finally:
+        db.close()
+
+
+def _recommend_for_guest_with_new_session(query: str, top_k: int, search_k: int) -> dict:
+    """stale 응답 백그라운드 갱신용 (요청의 DB 세션은 응답 후 닫히므로 새 세션을 연다)"""
+    db = get_db_session()
+    try:
+        return SearchCourseService(db)._recommend_for_guest_uncached(query, top_k, search_k)
+    finally:
+        db.close()
@@ -10,7 +10,11 @@ from app.repositories.search.search_course_result_log_repository import SearchCo
 from app.repositories.video.video_speech_text_repository import VideoSpeechTextRepository
 from app.common.vector_store.video.vector_delete_service import VectorDeleteService
 from app.utils.s3_utils import delete_file_from_s3
-from app.common.vector_store.video.vector_storage_service import index
+from app.common.vector_store.vector_store import get_vector_store
+from app.services.search.guest_recommendation_cache import guest_recommendation_cache
+from app.core.config import get_settings
+
+settings = get_settings()
 
 
 class UserDataPurgeService:
@@ -28,7 +32,7 @@ class UserDataPurgeService:
         self.search_result_log_repo = SearchCourseResultLogRepository(db)
 
         self.speech_text_repo = VideoSpeechTextRepository(db)
-        self.vector_delete_service = VectorDeleteService(index)
+        self.vector_delete_service = VectorDeleteService(get_vector_store(settings.pinecone.index_name))
 
     def delete_all_ai_data_for_user(self, user_id: int) -> dict:
         deleted_counts = {
@@ -74,6 +78,8 @@ class UserDataPurgeService:
             deleted_counts["vectors_deleted"] = self.vector_delete_service.delete_by_video_ids(video_ids)
 
             self.db.commit()
+            if video_ids:
+                guest_recommendation_cache.invalidate()
 
         except Exception as e:
             self.db.rollback()
@@ -10,7 +10,8 @@ from app.utils.s3_utils import delete_file_from_s3
 from app.core.exceptions import APIException
 from app.core.error_codes import ErrorCode
 from app.core.db import get_db_session
-from app.common.vector_store.video.vector_storage_service import index
+from app.common.vector_store.vector_store import get_vector_store
+from app.services.search.guest_recommendation_cache import guest_recommendation_cache
 from app.core.config import get_settings
 
 from app.repositories.chat.course_chat_attachment_repository import CourseChatMessageAttachmentRepository
@@ -27,7 +28,7 @@ class DeleteVideoService:
         self.db: Session = get_db_session()
         self.course_repo = VideoCourseRepository(self.db)
         self.speech_repo = VideoSpeechTextRepository(self.db)
-        self.vector_service = VectorDeleteService(index)
+        self.vector_service = VectorDeleteService(get_vector_store(settings.pinecone.index_name))
 
         self.attachment_repo = CourseChatMessageAttachmentRepository(self.db)
         self.chat_message_repo = CourseChatMessageRepository(self.db)
@@ -46,6 +47,7 @@ class DeleteVideoService:
 
             self._delete_video_by_id(video.id)
             self.db.commit()
+            guest_recommendation_cache.invalidate()
         except Exception:
             self.db.rollback()
             raise
@@ -84,6 +86,8 @@ class DeleteVideoService:
                     speech.is_deleted = True
 
             self.db.commit()
+            if video_ids:
+                guest_recommendation_cache.invalidate()
         except Exception:
             self.db.rollback()
             raise
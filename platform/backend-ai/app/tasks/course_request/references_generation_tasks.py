@@ -2,7 +2,6 @@ import json
 import logging
 from typing import List, Dict
 
-import requests
 from celery import shared_task
 from openai import OpenAI
 
@@ -10,6 +9,7 @@ from app.core.config import get_settings
 from app.core.db import get_db_session
 from app.repositories.course.course_request_repository import CourseRequestRepository
 from app.utils.prompt_loader import load_prompt
+from app.common.web_search.web_search_client import search_google, search_wikipedia
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -23,17 +23,8 @@ def search_reference_api(func_name: str, query: str, limit: int = 5) -> List[Dic
         return []
 
     if func_name == "search_web":
-        params = {
-            "q": query,
-            "num": max(1, min(limit, 10)),
-            "engine": "google",
-            "api_key": settings.serpapi.api_key,
-        }
         try:
-            resp = requests.get("https://serpapi.com/search", params=params, timeout=15)
-            resp.raise_for_status()
-            data = resp.json() or {}
-            organic = data.get("organic_results", []) or []
+            organic = search_google(query, num=max(1, min(limit, 10)))
             results = []
             for item in organic[:limit]:
                 results.append(
@@ -51,21 +42,8 @@ def search_reference_api(func_name: str, query: str, limit: int = 5) -> List[Dic
 
     if func_name == "search_wikipedia":
         try:
-            search_resp = requests.get(
-                "https://en.wikipedia.org/w/api.php",
-                params={
-                    "action": "query",
-                    "list": "search",
-                    "srsearch": query,
-                    "format": "json",
-                    "srlimit": max(1, min(limit, 10)),
-                },
-                timeout=15,
-            )
-            search_resp.raise_for_status()
-            search_data = search_resp.json() or {}
             results = []
-            for item in (search_data.get("query", {}) or {}).get("search", []) or []:
+            for item in search_wikipedia(query, limit=max(1, min(limit, 10))):
                 title = item.get("title") or ""
                 snippet = (item.get("snippet") or "").replace('<span class="searchmatch">', "").replace("</span>", "")
                 page_url = f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}" if title else ""
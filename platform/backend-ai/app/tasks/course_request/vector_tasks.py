@@ -3,9 +3,13 @@ from celery import shared_task
 from fastapi import HTTPException
 from app.repositories.course.course_request_repository import CourseRequestRepository
 from app.common.vector_store.course_request.vector_storage_service import CourseRequestVectorStorageService
+from app.common.vector_store.course_request.request_vector_mirror import course_request_vector_mirror
+from app.common.vector_store.vector_store import get_vector_store
+from app.core.config import get_settings
 from app.core.db import get_db_session
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 OTHER_OPTION_MAPPING = {
     1: 4,   # 예: field_id 1의 기타 옵션 ID
@@ -60,3 +64,15 @@ def run_answer_vector_task(self, request_id: int, package_status_id: int, field_
 
     finally:
         db.close()
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def run_request_vector_mirror_backfill_task(self):
+    """강의 요청 벡터 로컬 복제본(Redis) 전체 백필. 복제가 준비되지 않았거나 어긋나면 mirror가 자동으로 요청한다"""
+    try:
+        total = course_request_vector_mirror.backfill_from_index(get_vector_store(settings.pinecone.index_name_course_request))
+        logger.info(f"[Request vector mirror backfill] {total}개 복제 완료")
+        return total
+    except Exception as e:
+        logger.error(f"[Request vector mirror backfill failed] {e}", exc_info=True)
+        raise self.retry(exc=e)
@@ -61,7 +61,7 @@ def run_vector_upsert_task(self, video_uuid: str):
 
         # 벡터 임베딩 업서트
         vector_service = VectorStorageService()
-        vector_service.upsert_text(video.id, text, progress_callback=progress)
+        vector_service.upsert_text(video.id, text, progress_callback=progress, course_id=video.course_id)
         
         # 임베딩 완료 상태 알림 추가
         publish_video_task_status(video.id, step="벡터 임베딩 완료", progress=100, status="COMPLETED", prefix="vector")
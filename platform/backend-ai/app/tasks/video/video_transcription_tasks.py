@@ -3,7 +3,8 @@ import os
 import tempfile
 
 from app.common.whisper.whisper_service import WhisperService
-from app.utils.s3_utils import download_file_from_s3, upload_file_to_s3, delete_file_from_s3
+from app.common.whisper.transcript_checkpoint import transcript_checkpoint_store
+from app.utils.s3_utils import generate_presigned_url, upload_file_to_s3, delete_file_from_s3
 from app.utils.progress_notifier import publish_video_task_status
 from app.repositories.video.video_speech_text_repository import VideoSpeechTextRepository
 from app.repositories.video.video_course_repository import VideoCourseRepository
@@ -15,6 +16,9 @@ from app.core.config import get_settings
 
 settings = get_settings()
 
+# 무음 분석과 오디오 추출이 끝날 때까지 유효해야 한다 (시도마다 새로 발급)
+PRESIGNED_URL_EXPIRES_SECONDS = 2 * 3600
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=10)
 def transcribe_video_task(self, file_url: str, video_id: int):
     db = get_db_session()
@@ -22,7 +26,6 @@ def transcribe_video_task(self, file_url: str, video_id: int):
     course_repo = VideoCourseRepository(db)
     whisper = WhisperService()
     speech_text_url = None
-    temp_path = None
 
     # Whisper 진행 콜백도 내부적으로 publish_video_task_status만 사용
     def progress_cb(step: str, percent: int):
@@ -30,19 +33,20 @@ def transcribe_video_task(self, file_url: str, video_id: int):
 
     try:
         course_repo.update_analysis_status_by_video_id(video_id, "PROCESSING")
-        publish_video_task_status(video_id, step="영상 다운로드 중", progress=10)
+        publish_video_task_status(video_id, step="영상 정보 확인 중", progress=10)
         course_repo.initialize_analysis_time_by_video_id(video_id)
 
         if repo.get_by_video_id(video_id):
             publish_video_task_status(video_id, step="이미 전사된 영상", progress=100)
             raise APIException(ErrorCode.CONFLICT)
 
-        temp_path = download_file_from_s3(file_url)  
+        # 영상을 내려받지 않고 presigned URL을 ffprobe/ffmpeg에 바로 넘긴다 (길이 초과 영상은 전송 없이 거절)
+        source_url = generate_presigned_url(file_url, expires_in=PRESIGNED_URL_EXPIRES_SECONDS)
 
         max_seconds = 900 if settings.ENVIRONMENT == "prod" else 1800
 
         try:
-            is_ok, seconds = validate_video_length(temp_path, max_seconds=max_seconds) 
+            is_ok, seconds = validate_video_length(source_url, max_seconds=max_seconds)
         except VideoDurationError as ve:
             raise Exception(f"영상 길이 확인 실패: {ve}")
 
@@ -56,13 +60,12 @@ def transcribe_video_task(self, file_url: str, video_id: int):
                 status="FAILED_INVALID_VIDEO_LENGTH",
                 reason=reason
             )
-            if temp_path and os.path.exists(temp_path):
-                os.remove(temp_path)
             return
 
         publish_video_task_status(video_id, step="Whisper 전사 시작", progress=20)
 
-        transcription = whisper.transcribe_video(temp_path, progress_callback=progress_cb)
+        # 재시도 시에는 이전 시도에서 전사한 청크를 체크포인트에서 재사용한다
+        transcription = whisper.transcribe_video(source_url, progress_callback=progress_cb, video_id=video_id)
 
         with tempfile.NamedTemporaryFile(delete=False, suffix=".txt") as tmp:
             tmp.write(transcription["text"].encode("utf-8"))
@@ -79,6 +82,7 @@ def transcribe_video_task(self, file_url: str, video_id: int):
             model_version=transcription["model_version"],
             language_code=transcription["language_code"]
         )
+        transcript_checkpoint_store.clear(video_id)
 
         course_repo.update_analysis_status_by_video_id(video_id, "COMPLETED")
         publish_video_task_status(video_id, step="완료", progress=100)
@@ -107,6 +111,7 @@ def transcribe_video_task(self, file_url: str, video_id: int):
                 pass
 
         if ae.error == ErrorCode.AUDIO_NO_SPEECH_DETECTED:
+            transcript_checkpoint_store.clear(video_id)
             return
 
         raise self.retry(exc=ae)
@@ -135,5 +140,3 @@ def transcribe_video_task(self, file_url: str, video_id: int):
 
     finally:
         db.close()
-        if 'temp_path' in locals() and temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
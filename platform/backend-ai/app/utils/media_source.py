@@ -0,0 +1,31 @@
+import os
+from typing import List
+from urllib.parse import urlparse
+
+REMOTE_SCHEMES = ("http", "https")
+
+# HTTP 입력 읽기 타임아웃 (마이크로초). presigned URL이 응답하지 않을 때 ffmpeg가 멈춰 있지 않도록
+REMOTE_RW_TIMEOUT_US = 30 * 1000 * 1000
+
+
+def is_remote_source(source: str) -> bool:
+    return urlparse(source).scheme in REMOTE_SCHEMES
+
+
+def source_extension(source: str) -> str:
+    """로컬 경로나 URL(쿼리 스트링 제외)의 확장자 (소문자, 점 포함)"""
+    path = urlparse(source).path if is_remote_source(source) else source
+    return os.path.splitext(path)[1].lower()
+
+
+def ffmpeg_input_args(source: str, reconnect: bool = True) -> List[str]:
+    """
+    ffmpeg/ffprobe 입력 인자. URL이면 읽기 타임아웃과 (ffmpeg의 경우) 끊김 시 재연결을 켠다.
+    HTTP 입력은 Range 요청으로 seek할 수 있으므로 moov atom이 파일 끝에 있는 mp4도 내려받지 않고 읽는다.
+    """
+    if not is_remote_source(source):
+        return ["-i", source]
+    args = ["-rw_timeout", str(REMOTE_RW_TIMEOUT_US)]
+    if reconnect:
+        args += ["-reconnect", "1", "-reconnect_delay_max", "5"]
+    return args + ["-i", source]
@@ -2,17 +2,185 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
-from typing import List
+import logging
+import threading
+from typing import List, Optional, Tuple
 
+import numpy as np
 from openai import OpenAI
+from app.core.cache import get_cache_redis
 from app.core.config import get_settings
 from app.core.exceptions import APIException
 from app.core.error_codes import ErrorCode
+from app.common.embedding.embedding_cache import normalize_text
+from app.common.embedding.embedding_service import EmbeddingService
 from app.utils.prompt_loader import load_prompt
+from app.utils.ttl_cache import TTLCache
 
 settings = get_settings()
 client = OpenAI(api_key=settings.openai.api_key)
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "qexp:v1"
+EXPANSION_CACHE_TTL_SECONDS = 24 * 3600
+EXPANSION_CACHE_MAX_ITEMS = 2048
+# text-embedding-3-large 기준, 조사/어미만 다른 질의가 묶이는 정도의 유사도
+APPROX_SIMILARITY_THRESHOLD = 0.95
+
+
+class QueryExpansionCache:
+    """
+    질의 확장 결과 캐시.
+    - 정확 일치: (model, n, 정규화된 질의) 키로 프로세스 내 LRU → Redis 순으로 조회
+    - 근사 일치: 질의 임베딩과 최근 질의들의 cosine 유사도가 threshold 이상이면 그 결과를 재사용
+    Redis나 임베딩 호출이 실패하면 해당 단계만 건너뛴다.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = EXPANSION_CACHE_MAX_ITEMS,
+        ttl_seconds: int = EXPANSION_CACHE_TTL_SECONDS,
+        similarity_threshold: float = APPROX_SIMILARITY_THRESHOLD,
+        embedding_service: Optional[EmbeddingService] = None,
+        redis_client=None,
+    ):
+        self.exact = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self.vectors = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)  # key -> (정규화 벡터, 확장 결과)
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._embedding_service = embedding_service
+        self._redis = redis_client
+
+        self.exact_hits = 0
+        self.approx_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_cache_redis()
+        return self._redis
+
+    @property
+    def embedding_service(self) -> EmbeddingService:
+        if self._embedding_service is None:
+            self._embedding_service = EmbeddingService()
+        return self._embedding_service
+
+    @staticmethod
+    def make_key(query: str, model: str, n: int) -> str:
+        digest = hashlib.sha256(f"{model}\n{n}\n{normalize_text(query).casefold()}".encode("utf-8")).hexdigest()
+        return f"{REDIS_KEY_PREFIX}:{digest}"
+
+    def get(self, query: str, model: str, n: int) -> Optional[List[str]]:
+        return self.get_many([query], model, n)[0]
+
+    def get_many(self, queries: List[str], model: str, n: int) -> List[Optional[List[str]]]:
+        """
+        queries와 같은 순서로 캐시된 확장 결과 (없으면 None).
+        정확 일치는 Redis를 한 번에(mget) 조회하고, 근사 일치용 임베딩도 남은 질의를 모아 한 번에 요청한다.
+        """
+        keys = [self.make_key(query, model, n) for query in queries]
+        results: List[Optional[List[str]]] = [None] * len(queries)
+
+        for i, key in enumerate(keys):
+            cached = self.exact.get(key)
+            if cached is not None:
+                results[i] = list(cached)
+
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        for i, cached in zip(missing, self._get_redis_many([keys[i] for i in missing])):
+            if cached is not None:
+                self.exact.set(keys[i], cached)
+                results[i] = list(cached)
+
+        for cached in results:
+            if cached is not None:
+                self._count("exact_hits")
+
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        entries = [value for (m, k, _), value in self.vectors.items() if m == model and k == n] if missing else []
+        if entries:
+            matrix = np.vstack([entry_vector for entry_vector, _ in entries])
+            vectors = self._embed_many([queries[i] for i in missing])
+            for i, vector in zip(missing, vectors):
+                if vector is None:
+                    continue
+                similarities = matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    results[i] = list(entries[best][1])
+                    self._count("approx_hits")
+                    logger.info(f"[QueryExpansionCache] 근사 일치 similarity={float(similarities[best]):.3f} {self.stats()}")
+
+        for cached in results:
+            if cached is None:
+                self._count("misses")
+        return results
+
+    def set(self, query: str, model: str, n: int, expansions: List[str]):
+        # 빈 결과(응답 누락, 형식 오류)는 저장하지 않는다. 근사 일치로 비슷한 질의까지 확장을 잃게 되므로
+        if not expansions:
+            return
+
+        key = self.make_key(query, model, n)
+        self.exact.set(key, tuple(expansions))
+
+        try:
+            self.redis.set(key, json.dumps(expansions, ensure_ascii=False), ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"[QueryExpansionCache] Redis 저장 실패: {e}")
+
+        vector = self._embed_many([query])[0]
+        if vector is not None:
+            self.vectors.set((model, n, key), (vector, tuple(expansions)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.exact_hits + self.approx_hits + self.misses
+            return {
+                "size": len(self.exact),
+                "exact_hits": self.exact_hits,
+                "approx_hits": self.approx_hits,
+                "misses": self.misses,
+                "hit_rate": ((self.exact_hits + self.approx_hits) / total) if total else 0.0,
+            }
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _get_redis_many(self, keys: List[str]) -> List[Optional[Tuple[str, ...]]]:
+        if not keys:
+            return []
+        try:
+            raws = self.redis.mget(keys)
+        except Exception as e:
+            logger.warning(f"[QueryExpansionCache] Redis 조회 실패: {e}")
+            return [None] * len(keys)
+        return [tuple(json.loads(raw)) if raw else None for raw in raws]
+
+    def _embed_many(self, queries: List[str]) -> List[Optional[np.ndarray]]:
+        # 검색 단계에서도 같은 질의를 임베딩하므로 EmbeddingCache에 적재되어 재사용된다
+        try:
+            raw_vectors = self.embedding_service.embed_texts([normalize_text(query) for query in queries])
+        except Exception as e:
+            logger.warning(f"[QueryExpansionCache] 질의 임베딩 실패: {e}")
+            return [None] * len(queries)
+
+        vectors: List[Optional[np.ndarray]] = []
+        for raw in raw_vectors:
+            vector = np.asarray(raw, dtype=np.float32)
+            norm = float(np.linalg.norm(vector))
+            vectors.append(vector / norm if norm > 0 else None)
+        return vectors
+
+
+expansion_cache = QueryExpansionCache()
+
 
 def expand_queries(
     user_query: str,
@@ -21,6 +189,29 @@ def expand_queries(
     n: int = 5,
     temperature: float = 0.2,
     max_tokens: int = 512,
+    use_cache: bool = True,
+) -> List[str]:
+    if use_cache:
+        cached = expansion_cache.get(user_query, model, n)
+        if cached is not None:
+            return cached
+
+    expansions = _request_expansions(
+        user_query, model=model, n=n, temperature=temperature, max_tokens=max_tokens
+    )
+
+    if use_cache:
+        expansion_cache.set(user_query, model, n, expansions)
+    return expansions
+
+
+def _request_expansions(
+    user_query: str,
+    *,
+    model: str,
+    n: int,
+    temperature: float,
+    max_tokens: int,
 ) -> List[str]:
     try:
         system_prompt = load_prompt("query_expander_system_prompt.j2", context={})
@@ -39,18 +230,105 @@ def expand_queries(
 
         content = resp.choices[0].message.content or "{}"
         data = json.loads(content)
+        return _clean_queries(data.get("queries", []), n)
 
-        seen, cleaned = set(), []
-        for q in data.get("queries", []):
-            cq = " ".join(q.split()).strip()
-            key = cq.lower()
-            if cq and key not in seen:
-                seen.add(key)
-                cleaned.append(cq)
-            if len(cleaned) >= n:
-                break
+    except Exception as e:
+        raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
 
-        return cleaned
+
+def expand_queries_many(
+    user_queries: List[str],
+    *,
+    model: str = "gpt-4o-mini",
+    n: int = 5,
+    temperature: float = 0.2,
+    max_tokens: int = 512,
+    use_cache: bool = True,
+) -> List[List[str]]:
+    """
+    여러 질의의 확장을 user_queries와 같은 순서로 반환한다.
+    캐시에 없는 질의들만 모아 LLM을 한 번 호출한다 (max_tokens는 질의당 기준).
+    """
+    results: List[Optional[List[str]]] = [None] * len(user_queries)
+    if use_cache:
+        results = expansion_cache.get_many(user_queries, model, n)
+
+    missing = [i for i, cached in enumerate(results) if cached is None]
+    if missing:
+        expansions = _request_expansions_many(
+            [user_queries[i] for i in missing],
+            model=model, n=n, temperature=temperature, max_tokens=max_tokens * len(missing),
+        )
+        for i, expanded in zip(missing, expansions):
+            if expanded:
+                results[i] = expanded
+                if use_cache:
+                    expansion_cache.set(user_queries[i], model, n, expanded)
+                continue
+
+            # 배치 응답에서 빠졌거나 형식이 잘못된 질의는 단건 확장으로 다시 요청한다
+            try:
+                results[i] = expand_queries(
+                    user_queries[i], model=model, n=n, temperature=temperature,
+                    max_tokens=max_tokens, use_cache=use_cache,
+                )
+            except Exception as e:
+                logger.warning(f"[QueryExpander] 단건 확장 실패, 원본 질의만 사용: {e}")
+                results[i] = []
+
+    return results
+
+
+def _request_expansions_many(
+    user_queries: List[str],
+    *,
+    model: str,
+    n: int,
+    temperature: float,
+    max_tokens: int,
+) -> List[List[str]]:
+    try:
+        system_prompt = load_prompt("query_expander_batch_system_prompt.j2", context={})
+        user_prompt = load_prompt("query_expander_batch_user_prompt.j2", context={"queries": user_queries})
+
+        resp = client.chat.completions.create(
+            model=model,
+            temperature=temperature,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+        )
+
+        content = resp.choices[0].message.content or "{}"
+        data = json.loads(content)
+
+        # 응답에서 빠졌거나 queries가 목록이 아닌 질의는 빈 목록 → 호출 측이 단건으로 다시 요청한다
+        by_id = {}
+        for item in data.get("results", []):
+            try:
+                queries = item.get("queries")
+                by_id[int(item.get("id"))] = queries if isinstance(queries, list) else []
+            except (AttributeError, TypeError, ValueError):
+                continue
+        return [_clean_queries(by_id.get(i, []), n) for i in range(len(user_queries))]
 
     except Exception as e:
         raise APIException(ErrorCode.INTERNAL_ERROR, details=[str(e)])
+
+
+def _clean_queries(queries: List[str], n: int) -> List[str]:
+    seen, cleaned = set(), []
+    for q in queries:
+        if not isinstance(q, str):
+            continue
+        cq = " ".join(q.split()).strip()
+        key = cq.lower()
+        if cq and key not in seen:
+            seen.add(key)
+            cleaned.append(cq)
+        if len(cleaned) >= n:
+            break
+    return cleaned
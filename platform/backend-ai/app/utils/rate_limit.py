@@ -0,0 +1,132 @@
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD 방식의 동시성 제한기.
+    - 성공이 success_window번 연속되면 한도를 1 늘리고
+    - 429(rate limit)를 받으면 한도를 절반으로 줄인다.
+    같은 인스턴스를 여러 스레드가 공유해야 프로세스 단위로 제한된다.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16, success_window: int = 8):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self._limit = min(max(initial, self.minimum), self.maximum)
+        self._in_flight = 0
+        self._successes = 0
+        self._success_window = success_window
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self._limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self._success_window and self._limit < self.maximum:
+                self._limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def on_throttled(self):
+        with self._cond:
+            new_limit = max(self.minimum, self._limit // 2)
+            if new_limit != self._limit:
+                logger.warning(f"[RateLimit] 동시성 한도 축소 {self._limit} -> {new_limit}")
+            self._limit = new_limit
+            self._successes = 0
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    return isinstance(e, openai.RateLimitError) or getattr(e, "status_code", None) == 429
+
+
+def is_retryable_error(e: Exception) -> bool:
+    if isinstance(e, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)):
+        return True
+    return getattr(e, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def _retry_after_seconds(e: Exception) -> Optional[float]:
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+) -> T:
+    """
+    fn을 limiter 슬롯 안에서 실행하고, 429/5xx/네트워크 오류는 지수 백오프로 재시도한다.
+    재시도할 수 없는 오류이거나 재시도 횟수를 넘기면 마지막 예외를 그대로 올린다.
+    """
+    attempt = 0
+    while True:
+        if limiter:
+            limiter.acquire()
+        try:
+            result = fn()
+        except Exception as e:
+            if limiter:
+                limiter.release()
+                if is_rate_limit_error(e):
+                    limiter.on_throttled()
+
+            if attempt >= max_retries or not is_retryable_error(e):
+                raise
+
+            delay = _retry_after_seconds(e)
+            if delay is None:
+                delay = min(max_delay, base_delay * (2 ** attempt))
+                delay = delay / 2 + random.uniform(0, delay / 2)
+
+            attempt += 1
+            logger.warning(f"[Retry] {type(e).__name__} → {delay:.1f}초 후 재시도 ({attempt}/{max_retries})")
+            time.sleep(delay)
+            continue
+
+        if limiter:
+            limiter.release()
+            limiter.on_success()
+        return result
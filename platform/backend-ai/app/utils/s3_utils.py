@@ -47,6 +47,18 @@ def download_file_from_s3(s3_url: str) -> str:
         return tmp.name
 
 
+def generate_presigned_url(s3_url: str, expires_in: int = 3600) -> str:
+    """S3 객체 URL을 내려받지 않고 ffmpeg/ffprobe가 HTTP(Range 요청)로 바로 읽을 수 있는 presigned GET URL로 바꾼다."""
+    parsed = urlparse(s3_url)
+    bucket = parsed.netloc.split(".")[0]
+    key = parsed.path.lstrip("/")
+    return s3_client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": bucket, "Key": key},
+        ExpiresIn=expires_in,
+    )
+
+
 def delete_file_from_s3(s3_url: str):
     parsed = urlparse(s3_url)
     bucket = parsed.netloc.split(".")[0]
@@ -1,10 +1,13 @@
 import json
 import subprocess
 
+from app.utils.media_source import ffmpeg_input_args
+
 class VideoDurationError(Exception):
     pass
 
 def get_video_duration_seconds(file_path: str) -> float:
+    """file_path는 로컬 경로 또는 presigned URL (URL이면 헤더와 moov atom만 Range 요청으로 읽는다)"""
     try:
         # ffprobe 출력 포맷을 JSON으로 받아서 format.duration 읽기
         result = subprocess.run(
@@ -13,7 +16,7 @@ def get_video_duration_seconds(file_path: str) -> float:
                 "-v", "error",
                 "-print_format", "json",
                 "-show_format",
-                file_path,
+                *ffmpeg_input_args(file_path, reconnect=False),
             ],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -0,0 +1,102 @@
+# 실행: poetry run python -m benchmarks.text_chunker_benchmark [--max-words 32000] [--legacy-max-words 8000]
+#
+# 전사 텍스트 길이에 따른 청크 분할 wall-clock 시간을 비교한다.
+#  - legacy: 단어를 하나씩 붙이며 매번 전체 청크를 다시 인코딩 (O(n^2))
+#  - token : 전체를 한 번만 인코딩하고 토큰 오프셋으로 분할 (O(n))
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+import tiktoken
+
+from app.common.vector_store.video.text_chunker import TokenTextChunker
+
+SAMPLE_SENTENCES = [
+    "오늘은 n8n으로 업무 자동화 워크플로우를 만들어 보겠습니다.",
+    "먼저 트리거 노드를 추가하고 웹훅 주소를 복사합니다.",
+    "Make.com과 비교하면 셀프 호스팅이 가능하다는 장점이 있어요.",
+    "Next, we connect the OpenAI node and write a short prompt.",
+    "결과가 구글 시트에 잘 들어갔는지 확인해 봅시다!",
+    "If the request fails, check the API key and retry the execution.",
+    "이 부분이 가장 많이 질문하시는 내용인데요, 천천히 다시 보겠습니다.",
+]
+
+
+def build_transcript(num_words: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    words: List[str] = []
+    while len(words) < num_words:
+        words.extend(rng.choice(SAMPLE_SENTENCES).split())
+    return " ".join(words[:num_words])
+
+
+def legacy_chunk_text(encoding: tiktoken.Encoding, text: str, max_tokens: int = 1000) -> List[str]:
+    words = text.split()
+    chunks = []
+    current_chunk = []
+
+    for word in words:
+        current_chunk.append(word)
+        if len(encoding.encode(" ".join(current_chunk))) > max_tokens:
+            current_chunk.pop()
+            chunks.append(" ".join(current_chunk))
+            current_chunk = [word]
+
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+
+    return chunks
+
+
+def measure(fn: Callable[[], List[str]], repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = len(fn())
+        best = min(best, time.perf_counter() - started)
+    return best, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TokenTextChunker 성능 벤치마크")
+    parser.add_argument("--max-words", type=int, default=32000)
+    parser.add_argument("--legacy-max-words", type=int, default=8000)
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    parser.add_argument("--overlap-tokens", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    encoding = tiktoken.encoding_for_model("text-embedding-3-large")
+    chunker = TokenTextChunker(
+        encoding=encoding,
+        max_tokens=args.max_tokens,
+        overlap_tokens=args.overlap_tokens,
+    )
+
+    print(f"{'words':>8} | {'tokens':>8} | {'legacy(s)':>10} | {'token(s)':>10} | {'chunks':>7} | {'speedup':>8}")
+    print("-" * 66)
+
+    num_words = 1000
+    while num_words <= args.max_words:
+        text = build_transcript(num_words)
+        num_tokens = len(encoding.encode(text))
+
+        token_sec, token_chunks = measure(lambda: chunker.chunk(text), args.repeat)
+
+        if num_words <= args.legacy_max_words:
+            legacy_sec, _ = measure(lambda: legacy_chunk_text(encoding, text, args.max_tokens), 1)
+            legacy_col = f"{legacy_sec:10.4f}"
+            speedup_col = f"{legacy_sec / token_sec:7.1f}x" if token_sec > 0 else "-"
+        else:
+            legacy_col = f"{'skip':>10}"
+            speedup_col = f"{'-':>8}"
+
+        print(f"{num_words:8d} | {num_tokens:8d} | {legacy_col} | {token_sec:10.4f} | {token_chunks:7d} | {speedup_col}")
+        num_words *= 2
+
+
+if __name__ == "__main__":
+    main()
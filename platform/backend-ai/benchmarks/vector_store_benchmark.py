@@ -0,0 +1,76 @@
+# 실행: poetry run python -m benchmarks.vector_store_benchmark [--num-vectors 20000] [--dim 3072] [--queries 200]
+#
+# 네트워크 없이 LocalVectorStore의 검색 지연 시간을 측정한다.
+#  - 영상 청크 인덱스와 같은 id/metadata 형식({video_id}-{i}, video_id/chunk_index/text)으로 무작위 벡터를 채운다
+#  - 필터 없는 질의와 video_id $in 필터 질의의 p50/p95 지연 시간을 비교한다
+
+import argparse
+import tempfile
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from app.common.vector_store.vector_store import LocalVectorStore
+
+CHUNKS_PER_VIDEO = 20
+UPSERT_BATCH_SIZE = 1000
+
+
+def fill(store: LocalVectorStore, num_vectors: int, dim: int, rng: np.random.Generator):
+    for start in range(0, num_vectors, UPSERT_BATCH_SIZE):
+        count = min(UPSERT_BATCH_SIZE, num_vectors - start)
+        matrix = rng.standard_normal((count, dim), dtype=np.float32)
+        items = []
+        for offset, vector in enumerate(matrix):
+            n = start + offset
+            video_id, chunk_index = divmod(n, CHUNKS_PER_VIDEO)
+            items.append({
+                "id": f"{video_id}-{chunk_index}",
+                "values": vector,
+                "metadata": {"video_id": str(video_id), "chunk_index": chunk_index, "text": f"chunk {n}"},
+            })
+        store.upsert(items)
+
+
+def measure(store: LocalVectorStore, queries: np.ndarray, top_k: int, filter: Optional[dict]) -> List[float]:
+    latencies = []
+    for vector in queries:
+        started = time.perf_counter()
+        store.query(vector=vector, top_k=top_k, filter=filter)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LocalVectorStore 검색 벤치마크")
+    parser.add_argument("--num-vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    num_videos = max(1, args.num_vectors // CHUNKS_PER_VIDEO)
+
+    with tempfile.TemporaryDirectory() as path:
+        store = LocalVectorStore(path)
+
+        started = time.perf_counter()
+        fill(store, args.num_vectors, args.dim, rng)
+        print(f"upsert {args.num_vectors} x {args.dim}: {time.perf_counter() - started:.2f}s")
+
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        in_filter = {"video_id": {"$in": [str(v) for v in rng.choice(num_videos, size=min(50, num_videos), replace=False)]}}
+
+        print(f"{'filter':>10} | {'p50(ms)':>8} | {'p95(ms)':>8} | {'max(ms)':>8}")
+        print("-" * 44)
+        for name, query_filter in [("none", None), ("$in 50", in_filter)]:
+            latencies = measure(store, queries, args.top_k, query_filter)
+            p50, p95 = np.percentile(latencies, [50, 95])
+            print(f"{name:>10} | {p50:8.2f} | {p95:8.2f} | {max(latencies):8.2f}")
+
+
+if __name__ == "__main__":
+    main()